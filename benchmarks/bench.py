@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+
+#
+# Copyright (c) 2017 SUSE Linux GmbH
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+
+"""Runs benchmarks of the style checker of this checkout on generated books
+and compares them with an earlier run.
+
+Benchmarks:
+
+* checkOneFile/docbook4, checkOneFile/docbook5: all check modules
+* module/NAME: a single check module (including parsing the book)
+* helper/NAME: termcheck, dupecheck, sentencesegmenter, and highlight on
+  all paragraphs of the book
+
+Caching is disabled and the paragraph analyses of sdsc.analysis are
+forgotten before each run, so all work is done each time. Timings are the
+fastest and the median of several runs, in seconds.
+"""
+
+import argparse
+import fnmatch
+import json
+import os.path
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+
+from lxml import etree  # noqa: E402
+
+import sdsc  # noqa: E402
+from corpus import (addcorpusarguments,  # noqa: E402
+                    collectmaterial,
+                    corpusparameters,
+                    generatedocument,
+                    )
+
+# Version of the format of the JSON output
+RESULTFORMAT = 1
+
+
+def measure(function, repeat, setup=None):
+    """Runs a function once to warm up and then repeat times.
+
+    :param function: function without arguments
+    :param int repeat: number of timed runs
+    :param setup: function without arguments to run before each run, it is
+        not timed
+    :return: dict with the fastest and the median time and the number of runs
+    """
+    function()
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {'min': min(timings), 'median': statistics.median(timings),
+            'runs': repeat}
+
+
+def documentparagraphs(path):
+    """Returns the paragraph records of a document, see
+    sdsc.extractparagraphs().
+    """
+    sdsc.extractparagraphs(etree.parse(path, sdsc.parser))
+    records = list(sdsc.paragraphs.values())
+    sdsc.paragraphs.clear()
+    sdsc.termmatches.clear()
+    return records
+
+
+def helperbenchmarks(paragraphs):
+    """Returns the benchmarks of the helper functions.
+
+    :param list paragraphs: paragraph records to run the helpers on
+    :return: dict of functions without arguments by benchmark name
+    """
+    termsetids = sdsc.loadtermfiles(sdsc.selectchecks(None, []))
+    contents = [paragraph for paragraph in paragraphs if paragraph[0]]
+    tokens = [sdsc.tokenizer(paragraph[1]) for paragraph in contents
+              if paragraph[1]]
+
+    def termcheck():
+        for termsetid in termsetids:
+            for paragraph in contents:
+                sdsc.paragraphtermcheck([termsetid], paragraph, 'error')
+
+    def dupecheck():
+        for paragraph in contents:
+            sdsc.paragraphdupecheck(paragraph)
+
+    def sentencesegmenter():
+        for paragraph in contents:
+            sdsc.sentencesegmenter(paragraph[0])
+
+    def highlight():
+        # Like a message for every few words
+        for words in tokens:
+            for start in range(0, len(words), 5):
+                sdsc.highlight(words, start, start + 2)
+
+    return {'helper/termcheck': termcheck,
+            'helper/dupecheck': dupecheck,
+            'helper/sentencesegmenter': sentencesegmenter,
+            'helper/highlight': highlight}
+
+
+def runbenchmarks(parameters, repeat=3, patterns=None, log=None):
+    """Generates books and runs all benchmarks on them.
+
+    :param dict parameters: parameters for corpus.generatedocument()
+    :param int repeat: number of timed runs per benchmark
+    :param list patterns: glob patterns of the benchmarks to run (default:
+        all)
+    :param log: function to call with the name of each benchmark
+    :return: results as a dict that can be stored as JSON
+    """
+    sdsc.initialize()
+    sdsc.cachedir = None
+    sdsc.jobs = 1
+
+    def wanted(name):
+        return not patterns or \
+            any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+    material = collectmaterial()
+    results = {}
+    with tempfile.TemporaryDirectory() as tempdir:
+        paths = {}
+        for docbook in (4, 5):
+            paths[docbook] = os.path.join(tempdir, 'book{0}.xml'.format(docbook))
+            with open(paths[docbook], 'wb') as bookfh:
+                bookfh.write(generatedocument(
+                    material=material, **dict(parameters, docbook=docbook)))
+        path = paths[parameters['docbook']]
+
+        benchmarks = {}
+        for docbook in (4, 5):
+            benchmarks['checkOneFile/docbook{0}'.format(docbook)] = \
+                lambda docbook=docbook: sdsc.checkOneFile(paths[docbook], None, [])
+        for check in sdsc.selectchecks(None, []):
+            benchmarks['module/' + check['name']] = \
+                lambda name=check['name']: sdsc.checkOneFile(path, [name], [])
+        if any(wanted(name) for name in helperbenchmarks([])):
+            benchmarks.update(helperbenchmarks(documentparagraphs(path)))
+
+        for name in sorted(benchmarks):
+            if not wanted(name):
+                continue
+            if log:
+                log(name)
+            results[name] = measure(benchmarks[name], repeat,
+                                    setup=sdsc.analysis.clearanalysiscache)
+
+    return {'format': RESULTFORMAT,
+            'sdsc': sdsc.__version__,
+            'python': platform.python_version(),
+            'lxml': etree.__version__,
+            'corpus': parameters,
+            'benchmarks': results}
+
+
+def compareresults(results, baseline, tolerance):
+    """Compares the fastest times of benchmarks with those of a baseline.
+
+    :param dict results: results of runbenchmarks()
+    :param dict baseline: earlier results of runbenchmarks()
+    :param float tolerance: how much slower a benchmark may be without
+        counting as a regression, 0.1 means 10%
+    :return: list of tuples of benchmark name, time in baseline, time now,
+        ratio, and whether it is a regression; for benchmarks that are only
+        in one of them, the missing time and the ratio are None
+    """
+    comparison = []
+    old = baseline.get('benchmarks', {})
+    new = results.get('benchmarks', {})
+    for name in sorted(set(old) | set(new)):
+        oldtime = old[name]['min'] if name in old else None
+        newtime = new[name]['min'] if name in new else None
+        if oldtime is None or newtime is None:
+            comparison.append((name, oldtime, newtime, None, False))
+            continue
+        ratio = newtime / oldtime if oldtime else float('inf')
+        comparison.append((name, oldtime, newtime, ratio,
+                           ratio > 1 + tolerance))
+    return comparison
+
+
+def formatcomparison(comparison):
+    """Returns a comparison as a table."""
+
+    def seconds(value):
+        return "{0:10.4f}s".format(value) if value is not None else " " * 11
+
+    lines = ["{0:40} {1:>11} {2:>11} {3:>7}".format(
+        "benchmark", "baseline", "now", "ratio")]
+    for name, oldtime, newtime, ratio, regression in comparison:
+        lines.append("{0:40} {1} {2} {3}{4}".format(
+            name, seconds(oldtime), seconds(newtime),
+            "{0:6.2f}x".format(ratio) if ratio is not None else "      -",
+            "  REGRESSION" if regression else ""))
+    return "\n".join(lines)
+
+
+def main(cliargs=None):
+    """Runs the benchmarks, writes the results, and compares them.
+
+    :return: exit code, 1 if there are regressions
+    """
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[0],
+        epilog="The book is generated with the parameters below, see "
+               "corpus.py.")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="timed runs per benchmark (default: %(default)s)")
+    parser.add_argument('--only', nargs='+', metavar='PATTERN',
+                        help="only run benchmarks that match one of these "
+                             "glob patterns, like 'helper/*'")
+    parser.add_argument('--output', metavar='FILE',
+                        help="write the results as JSON to FILE")
+    parser.add_argument('--baseline', metavar='FILE',
+                        help="compare the results with those in FILE")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="""how much slower than the baseline a benchmark may
+                        be, 0.1 means 10%% (default: %(default)s)""")
+    addcorpusarguments(parser)
+    args = parser.parse_args(cliargs)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baselinefh:
+            baseline = json.load(baselinefh)
+
+    parameters = corpusparameters(args)
+    results = runbenchmarks(
+        parameters, args.repeat, args.only,
+        log=lambda name: print("Running {0}...".format(name), file=sys.stderr))
+
+    if args.output:
+        with open(args.output, 'w') as outputfh:
+            json.dump(results, outputfh, indent=2, sort_keys=True)
+            outputfh.write("\n")
+
+    if baseline is None:
+        for name, timing in sorted(results['benchmarks'].items()):
+            print("{0:40} {1:10.4f}s (median {2:.4f}s)".format(
+                name, timing['min'], timing['median']))
+        return 0
+
+    if baseline.get('corpus') != parameters:
+        print("! The baseline was measured with other corpus parameters: "
+              "{0}".format(baseline.get('corpus')), file=sys.stderr)
+    comparison = compareresults(results, baseline, args.tolerance)
+    print(formatcomparison(comparison))
+    return 1 if any(regression for *_, regression in comparison) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
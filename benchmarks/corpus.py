@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+
+#
+# Copyright (c) 2017 SUSE Linux GmbH
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+
+"""Creates synthetic DocBook 4 or 5 books for benchmarking, using the text
+of the test cases in tests/cases.
+
+Paragraphs of the test cases that a check module is expected to complain
+about (their ID contains "sdsc.expect") are "hits", all other paragraphs
+are clean filler text. The same parameters and seed always create the same
+document.
+"""
+
+import argparse
+import glob
+import os.path
+import random
+import sys
+
+from lxml import etree
+
+CASESDIR = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                        '..', 'tests', 'cases')
+
+DOCBOOK5NS = 'http://docbook.org/ns/docbook'
+XMLID = '{http://www.w3.org/XML/1998/namespace}id'
+
+# Inline elements to wrap words in, they exist in DocBook 4 and 5 alike
+INLINES = ('emphasis', 'command', 'filename', 'literal', 'replaceable',
+           'option', 'systemitem')
+
+# Default values of generatedocument()
+DEFAULTS = dict(docbook=5, chapters=4, sections=5, paragraphs=10,
+                paragraphlength=40, markupdensity=0.05, hitrate=0.2, seed=1)
+
+
+def collectmaterial(casesdir=CASESDIR):
+    """Collects the text of all paragraphs of the test cases.
+
+    :param str casesdir: directory with test cases
+    :return: tuple of the hit paragraphs and the clean paragraphs, both lists
+        of strings
+    """
+    hits = []
+    clean = []
+    for case in sorted(glob.glob(os.path.join(casesdir, '*.xml'))):
+        try:
+            tree = etree.parse(case)
+        except etree.XMLSyntaxError:
+            continue
+        for para in tree.xpath('//*[local-name() = "para"]'):
+            text = " ".join(para.xpath('string()').split())
+            if not text:
+                continue
+            paraid = para.get(XMLID) or para.get('id') or ''
+            (hits if 'sdsc.expect' in paraid else clean).append(text)
+    return (hits, clean)
+
+
+def fillersentence(rng, vocabulary):
+    """Returns a sentence of 6 to 20 random words."""
+    words = [rng.choice(vocabulary) for _ in range(rng.randint(6, 20))]
+    return " ".join(words).capitalize() + "."
+
+
+def materialvocabulary(material):
+    """Returns all words of the clean paragraphs, without punctuation."""
+    vocabulary = [word.strip('.,;:!?()"\'') for text in material[1]
+                  for word in text.split()]
+    return [word for word in vocabulary if word] or ['word']
+
+
+def paragraphwords(rng, material, vocabulary, paragraphlength, hitrate):
+    """Returns the words of a paragraph of about paragraphlength words. With
+    a probability of hitrate, the paragraph contains a hit paragraph.
+    """
+    hits, clean = material
+    sentences = []
+    if hits and rng.random() < hitrate:
+        sentences.append(rng.choice(hits))
+    length = sum(len(sentence.split()) for sentence in sentences)
+    while length < paragraphlength:
+        if clean and rng.random() < 0.3:
+            sentence = rng.choice(clean)
+        else:
+            sentence = fillersentence(rng, vocabulary)
+        sentences.append(sentence)
+        length += len(sentence.split())
+    rng.shuffle(sentences)
+    return " ".join(sentences).split()
+
+
+def buildparagraph(parent, tag, rng, words, markupdensity):
+    """Adds a paragraph to parent, some words are wrapped in inline
+    elements."""
+    para = etree.SubElement(parent, tag('para'))
+    # Element whose text or tail the words are added to
+    last = None
+    chunk = []
+
+    def addtext(text):
+        if last is None:
+            para.text = text
+        else:
+            last.tail = " " + text
+
+    for word in words:
+        if rng.random() < markupdensity:
+            addtext(" ".join(chunk + ['']))
+            last = etree.SubElement(para, tag(rng.choice(INLINES)))
+            last.text = word
+            chunk = []
+        else:
+            chunk.append(word)
+    addtext(" ".join(chunk))
+    return para
+
+
+def generatedocument(docbook=DEFAULTS['docbook'],
+                     chapters=DEFAULTS['chapters'],
+                     sections=DEFAULTS['sections'],
+                     paragraphs=DEFAULTS['paragraphs'],
+                     paragraphlength=DEFAULTS['paragraphlength'],
+                     markupdensity=DEFAULTS['markupdensity'],
+                     hitrate=DEFAULTS['hitrate'],
+                     seed=DEFAULTS['seed'],
+                     material=None):
+    """Creates a book.
+
+    :param int docbook: DocBook version, 4 or 5
+    :param int chapters: number of chapters
+    :param int sections: number of sections per chapter
+    :param int paragraphs: number of paragraphs per section
+    :param int paragraphlength: approximate number of words per paragraph
+    :param float markupdensity: share of words in inline elements (0 to 1)
+    :param float hitrate: share of paragraphs with a hit (0 to 1)
+    :param int seed: seed for the random numbers
+    :param tuple material: result of collectmaterial() (default: collect
+        it now)
+    :return: the book as serialized XML (bytes)
+    """
+    if docbook not in (4, 5):
+        raise ValueError("Unknown DocBook version: {0}".format(docbook))
+
+    rng = random.Random(seed)
+    if material is None:
+        material = collectmaterial()
+    vocabulary = materialvocabulary(material)
+
+    if docbook == 5:
+        def tag(name):
+            return '{%s}%s' % (DOCBOOK5NS, name)
+        idattribute = XMLID
+        book = etree.Element(tag('book'), nsmap={None: DOCBOOK5NS},
+                             version='5.0')
+        info = etree.SubElement(book, tag('info'))
+    else:
+        def tag(name):
+            return name
+        idattribute = 'id'
+        book = etree.Element('book')
+        info = etree.SubElement(book, 'bookinfo')
+
+    book.set(idattribute, 'book.benchmark')
+    etree.SubElement(info, tag('title')).text = "Benchmark"
+    etree.SubElement(info, tag('productname')).text = "Benchmark Product"
+    etree.SubElement(info, tag('productnumber')).text = "1"
+    etree.SubElement(info, tag('date')).text = "2017-01-01"
+
+    sectiontag = tag('section' if docbook == 5 else 'sect1')
+    for chapternumber in range(chapters):
+        chapter = etree.SubElement(book, tag('chapter'))
+        chapter.set(idattribute, 'cha.benchmark.{0}'.format(chapternumber))
+        etree.SubElement(chapter, tag('title')).text = \
+            "Chapter {0}".format(chapternumber)
+        buildparagraph(chapter, tag, rng, paragraphwords(
+            rng, material, vocabulary, paragraphlength, hitrate), markupdensity)
+
+        for sectionnumber in range(sections):
+            section = etree.SubElement(chapter, sectiontag)
+            section.set(idattribute, 'sec.benchmark.{0}.{1}'.format(
+                chapternumber, sectionnumber))
+            etree.SubElement(section, tag('title')).text = \
+                "Section {0}.{1}".format(chapternumber, sectionnumber)
+            for _ in range(paragraphs):
+                buildparagraph(section, tag, rng, paragraphwords(
+                    rng, material, vocabulary, paragraphlength, hitrate), markupdensity)
+
+    return etree.tostring(book, encoding='utf-8', xml_declaration=True,
+                          pretty_print=True)
+
+
+def addcorpusarguments(parser):
+    """Adds the parameters of generatedocument() to an argument parser."""
+    parser.add_argument('--docbook', type=int, choices=(4, 5),
+                        default=DEFAULTS['docbook'],
+                        help="DocBook version (default: %(default)s)")
+    parser.add_argument('--chapters', type=int, default=DEFAULTS['chapters'],
+                        help="number of chapters (default: %(default)s)")
+    parser.add_argument('--sections', type=int, default=DEFAULTS['sections'],
+                        help="sections per chapter (default: %(default)s)")
+    parser.add_argument('--paragraphs', type=int,
+                        default=DEFAULTS['paragraphs'],
+                        help="paragraphs per section (default: %(default)s)")
+    parser.add_argument('--paragraph-length', dest='paragraphlength',
+                        type=int, default=DEFAULTS['paragraphlength'],
+                        help="words per paragraph (default: %(default)s)")
+    parser.add_argument('--markup-density', dest='markupdensity',
+                        type=float, default=DEFAULTS['markupdensity'],
+                        help="""share of words in inline elements
+                        (default: %(default)s)""")
+    parser.add_argument('--hit-rate', dest='hitrate', type=float,
+                        default=DEFAULTS['hitrate'],
+                        help="""share of paragraphs with something to
+                        complain about (default: %(default)s)""")
+    parser.add_argument('--seed', type=int, default=DEFAULTS['seed'],
+                        help="seed for random numbers (default: %(default)s)")
+
+
+def corpusparameters(args):
+    """Returns the parameters of generatedocument() from parsed arguments."""
+    return {name: getattr(args, name) for name in DEFAULTS}
+
+
+def main(cliargs=None):
+    """Writes a generated book to a file or standard output."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    addcorpusarguments(parser)
+    parser.add_argument('outputfile', nargs='?',
+                        help="file to write to (default: standard output)")
+    args = parser.parse_args(cliargs)
+
+    document = generatedocument(**corpusparameters(args))
+    if args.outputfile:
+        with open(args.outputfile, 'wb') as outputfh:
+            outputfh.write(document)
+    else:
+        sys.stdout.buffer.write(document)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
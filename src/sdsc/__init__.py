@@ -22,12 +22,16 @@ __author__ = "Stefan Knorr, Thomas Schraitle, Fabian Vogt"
 __license__ = "LGPL-2.1+"
 __description__ = "checks a given DocBook XML file for stylistic errors"
 
+import concurrent.futures
+import contextlib
 import glob
+import io
+import itertools
 import os.path
 import re
 import sys
+import tempfile
 import time
-import random
 import webbrowser
 
 from lxml import etree
@@ -36,37 +40,220 @@ from .cli import printcolor, parseargs
 from .generic import (linenumber,
                       re_compile,
                       )
-from .const import PARENTHESES, SENTENCEENDS, LASTSENTENCEENDS, EMPTYSUBPATTERN
+from .const import PARENTHESES, EMPTYSUBPATTERN, GROUPREFERENCE
 from .textutil import (counttokens,
                        findtagreplacement,
+                       findtagreplacements,
                        removepunctuation,
                        sanitizepunctuation,
+                       sentencesegmenter,
                        tokenizer,
                        xmlescape,
                        )
+from .termindex import buildtokenindex, indexcandidates, literalprefixes
+from .prefilter import buildautomaton, patterngroupliterals, scan
+from .chapters import iterpieces
+from .server import defaultsocketpath, sendrequest, serve
+from .cache import (cachekey,
+                    contentkey,
+                    defaultcachedir,
+                    prunecache,
+                    readcache,
+                    sourcedigest,
+                    touchcache,
+                    writecache,
+                    )
+from .analysis import analyzecontent, analyzepretty
+from .termcompiler import COMPILEDTERMSFILE, generatemodule, loadcompiledterms
+from . import generic, profiling
+from .patternlint import lintpattern, sampletokens
 
 
 # Global flags
 flag_performance = False
 flag_checkpatterns = False
 flag_module = False
+flag_chapters = False
 
+# Directory to cache data in between runs, None to disable caching
+cachedir = None
 
-def sentencesegmenter(text):
-    """Splits a paragraph into a list of sentences. Removes
-    final punctuation from all sentences.
 
-    :param str text: text to split into sentences
+def makeparagraph(context, content, contentpretty, contextid, basefile):
+    """ Create a paragraph record from the values an XSLT check file passes
+    to us. Paragraph records are tuples of:
+    (content, contentpretty, contextid, basefile, line)
+
+    :param ??? context: information about the context node
+    :param str content: content, as formatted for text-level checks
+    :param str contentpretty: content, as formatted for display in a message
+    :param str contextid: next element with id attribute around the content
+    :param str basefile: file in which content appears
+    """
+
+    # I get these as lists with one lxml.etree._ElementUnicodeResult.
+    # I need single strings.
+    # For whatever reason, this made termcheckmessage() crash
+    # happily and semi-randomly.
+    return (str(content[0]) if content else None,
+            str(contentpretty[0]) if contentpretty else None,
+            str(contextid[0]) if contextid else None,
+            str(basefile[0]) if basefile else None,
+            linenumber(context))
+
+
+# Paragraph records of the document that is currently checked, by element.
+# This is filled by extractparagraphs() before the check modules run, such
+# that the content of each paragraph only needs to be created once, instead
+# of once per check module.
+paragraphs = {}
+
+
+def storeparagraph(context, content, contentpretty, contextid, basefile):
+    """ Store the paragraph record of the context node (called from the
+    extraction stylesheet)
+
+    :param ??? context: information about the context node
+    :param str content: content, as formatted for text-level checks
+    :param str contentpretty: content, as formatted for display in a message
+    :param str contextid: next element with id attribute around the content
+    :param str basefile: file in which content appears
     """
-    sentences = SENTENCEENDS.split(text)
-    # The last sentence's final punctuation has not yet been cut off, do that
-    # now.
-    sentences[-1] = LASTSENTENCEENDS.sub('', sentences[-1])
+    paragraphs[context.context_node] = makeparagraph(context, content,
+                                                     contentpretty, contextid,
+                                                     basefile)
+    return ""
 
-    # We also need to cut off parentheses etc. from the first word of the first
-    # sentence, as that has not been done so far either.
-    sentences[0] = removepunctuation(sentences[0], start=True)
-    return sentences
+
+def isextracted(context):
+    """ Find out whether there is a paragraph record for the context node.
+
+    :param ??? context: information about the context node
+    """
+    return context.context_node in paragraphs
+
+
+# Version of the format of the findings stored in the paragraph cache,
+# increase whenever it changes. Changes to the way findings are created are
+# covered by sourcedigest().
+PARAGRAPHCACHEVERSION = 1
+
+# Maximum number of paragraph cache files (one per document and kind of
+# check) to keep, see savefindings()
+MAXPARAGRAPHCACHEFILES = 1000
+
+# Findings of checks per paragraph of the current document, by kind of check:
+# paragraphcache = { 'dupes': [ { <key>: <findings>, ... }, { <key>: <findings>, ... } ], ... }
+#                               findings read from the cache, findings of this run
+# Only the findings of this run are written back, so findings of paragraphs
+# that do not exist anymore disappear from the cache.
+paragraphcache = {}
+
+# Absolute path of the document that is currently checked, set by
+# preparedocument(). Paragraph cache files are per document.
+currentdocument = None
+
+# Prefix of the temporary directories of documents sent along with requests
+# to sdsc --serve. These documents only exist for one request, so their
+# findings are not cached (see preparedocument()).
+REQUESTDIRPREFIX = 'sdsc-request-'
+
+
+def paragraphcachekey(kind):
+    """ Returns the key of the paragraph cache file of the current document
+    for a kind of check. It changes with the code and the check files of
+    sdsc, so findings are never reused by a different sdsc.
+
+    :param str kind: kind of check
+    """
+    return cachekey('paragraphs-%d' % PARAGRAPHCACHEVERSION, sourcedigest(),
+                    currentdocument, kind)
+
+
+def findingsofkind(kind):
+    """ Returns the paragraph cache entry for a kind of check, reading the
+    cache file of the current document if necessary.
+
+    :param str kind: kind of check
+    """
+
+    if kind not in paragraphcache:
+        key = paragraphcachekey(kind)
+        stored = readcache(cachedir, 'paragraphs', key)
+        if stored is not None:
+            touchcache(cachedir, 'paragraphs', key)
+        paragraphcache[kind] = [stored or {}, {}]
+    return paragraphcache[kind]
+
+
+def lookupfindings(kind, *parts):
+    """ Looks up the findings of a check for a paragraph in the paragraph
+    cache. Findings do not contain any location data (ID, file, line), so
+    they stay valid if the paragraph moves.
+
+    :param str kind: kind of check; for checks with rules from a file, this
+        needs to contain a hash of the rules
+    :param parts: everything the findings depend on, usually the content of
+        the paragraph and the parameters of the check
+    :return: findings or None if there are none in the cache
+    """
+
+    if not cachedir or currentdocument is None:
+        return None
+
+    stored, used = findingsofkind(kind)
+    key = contentkey(*parts)
+    findings = used.get(key)
+    if findings is None:
+        findings = stored.get(key)
+        if findings is not None:
+            used[key] = findings
+    return findings
+
+
+def storefindings(findings, kind, *parts):
+    """ Stores the findings of a check for a paragraph in the paragraph
+    cache, see lookupfindings().
+
+    :param list findings: findings, must be a list of lists of simple values
+        that are the same after a round trip through JSON
+    :param str kind: kind of check
+    :param parts: everything the findings depend on
+    """
+
+    if not cachedir or currentdocument is None:
+        return
+
+    findingsofkind(kind)[1][contentkey(*parts)] = findings
+
+
+def savefindings():
+    """ Writes the findings of the current document that changed back to the
+    cache. Files of documents that were not checked for a while are removed
+    once there are more than MAXPARAGRAPHCACHEFILES.
+    """
+
+    written = False
+    for kind, (stored, used) in paragraphcache.items():
+        if used == stored:
+            continue
+        written = writecache(cachedir, 'paragraphs', paragraphcachekey(kind),
+                             used) or written
+        paragraphcache[kind][0] = dict(used)
+
+    if written:
+        prunecache(cachedir, 'paragraphs', MAXPARAGRAPHCACHEFILES)
+
+
+def extractparagraphs(inputfile):
+    """ Create the paragraph records of a document for all checks.
+
+    :param inputfile: parsed document
+    """
+    paragraphs.clear()
+    termmatches.clear()
+    if extraction is not None:
+        extraction(inputfile)
 
 
 def termcheck(context, termfileid, content, contentpretty, contextid, basefile,
@@ -74,9 +261,8 @@ def termcheck(context, termfileid, content, contentpretty, contextid, basefile,
     """ Check a paragraph using text-level checks involving regular
     expressions. If there is a match, issue a message.
 
-    :param ??? text: information about the context node
-    :param int termfileid: the expected ID of the terminology data; this is
-        used to check whether terminology was correctly initialized via
+    :param ??? context: information about the context node
+    :param int termfileid: ID of the term set to use, as returned by
         buildtermdata()
     :param str content: content, as formatted for the terminology check itself
     :param str contentpretty: content, as formatted for display in a message
@@ -84,74 +270,219 @@ def termcheck(context, termfileid, content, contentpretty, contextid, basefile,
     :param str basefile: file in which content appears
     :param str messagetype: print a 'warning', 'info', or 'error' message?
     """
+    return paragraphtermcheck(
+        termfileid,
+        makeparagraph(context, content, contentpretty, contextid, basefile),
+        messagetype)
 
-    # FIXME: Modes: para, title?
 
-    if not content:
-        return []
+def extractedtermcheck(context, termfileid, messagetype):
+    """ Same as termcheck() but uses the paragraph record of the context node
+    created by extractparagraphs().
+
+    The first term module that asks for a paragraph runs the term sets of all
+    term modules on it at once, see fusedtermcheck(). All other term modules then only
+    pick up their results.
+
+    :param ??? context: information about the context node
+    :param int termfileid: ID of the term set to use
+    :param str messagetype: print a 'warning', 'info', or 'error' message?
+    """
+
+    node = context.context_node
+    paragraph = paragraphs[node]
+    termset, termdataid = findtermset(termfileid)
+
+    matchesoftermsets = termmatches.setdefault(node, {})
+    if termdataid not in matchesoftermsets:
+        termsetids = [termdataid]
+        if fuseterms:
+            termsetids += [termsetid for termsetid in activetermsetids
+                           if termsetid not in matchesoftermsets and
+                           termsetid != termdataid]
+        matchesoftermsets.update(cachedtermcheck(paragraph, termsetids))
+
+    return termcheckmessages(termset, matchesoftermsets[termdataid],
+                             paragraph, messagetype)
+
 
-    if int(termfileid[0]) != int(termdataid):
+def findtermset(termfileid):
+    """ Find a term set in termsets.
+
+    :param int termfileid: ID of the term set, as returned by buildtermdata()
+    :return: term set, ID of the term set
+    """
+
+    termdataid = int(termfileid[0]) if termfileid else None
+    termset = termsets.get(termdataid)
+    if termset is None:
         raise ValueError('Terminology data was not correctly initialized.')
+    return termset, termdataid
 
-    # I get this as a list with one lxml.etree._ElementUnicodeResult.
-    # I need a single string.
-    # For whatever reason, this made termcheckmessage() crash
-    # happily and semi-randomly.
-    content = sanitizepunctuation(str(content[0]), quotes=False, apostrophes=True)
 
-    basefile = basefile[0] if basefile else None
-    contextid = contextid[0] if contextid else None
+def paragraphtermcheck(termfileid, paragraph, messagetype):
+    """ Check a paragraph record using text-level checks involving regular
+    expressions. If there is a match, issue a message.
 
-    # sanitize this...
-    if messagetype not in ('warning', 'info'):
-        messagetype = 'error'
+    :param int termfileid: ID of the term set to use, as returned by
+        buildtermdata()
+    :param tuple paragraph: paragraph record, see makeparagraph()
+    :param str messagetype: print a 'warning', 'info', or 'error' message?
+    """
 
-    # onepattern is a concatenated list of all patterns of the terminology
-    # file which are within a pattern1 element
-    # how useful is onepattern?
-    #   + the overhead for onepattern is (currently) akin to adding 1 word
-    #     to every paragraph
-    #   + 30-40 % of paragraphs are skipped because of onepattern
-    #   + the paragraphs skipped because of onepattern average at
-    #     5-10 words
-    #   = worst case: similar time, best case: slight win,
-    #     more compliant documentation will tip the scale in our favour
-    if onepattern and not onepattern.search(content):
-        if flag_performance:
-            printcolor("skipped entire paragraph\n", 'debug')
+    # FIXME: Modes: para, title?
+
+    if not paragraph[0]:
         return []
 
-    # This if/else block should not be necessary (if there is content,
-    # there should always also be pretty content, but that depends on the
-    # XSLT used for checking). It hopefully won't hurt either.
-    contentpretty = str(contentpretty[0]) if contentpretty else content
+    termset, termdataid = findtermset(termfileid)
+    matches = cachedtermcheck(paragraph, [termdataid])[termdataid]
 
-    # This should get us far enough for now
-    sentences = sentencesegmenter(content)
+    return termcheckmessages(termset, matches, paragraph, messagetype)
 
-    # HACK: the counter goes up for the first word already, i.e. token[0],
-    # thus we just start at -1, so the first word gets to be 0.
-    currenttokeninparagraph = -1
 
-    messages = []
-    for sentence in sentences:
-        # FIXME: Get something better than s.split. Some
-        # existing tokenisers are overzealous, such as the default one from
-        # NLTK.
-        words = tokenizer(sentence)
-        totalwords = len(words)
+def cachedtermcheck(paragraph, termsetids):
+    """ Same as fusedtermcheck(), but reuses matches from the paragraph cache
+    and only checks the paragraph with the term sets that have none.
 
-        if flag_performance:
-            timestartmatch = time.time()
+    :param tuple paragraph: paragraph record, see makeparagraph()
+    :param list termsetids: IDs of term sets in termsets
+    :return: dict of matches (see matchtermset()) by term set ID
+    """
+
+    content = paragraph[0]
+    result = {}
+    missingtermsetids = []
+    for termsetid in termsetids:
+        matches = lookupfindings('terms-' + termsets[termsetid]['key'], content)
+        if matches is None:
+            missingtermsetids.append(termsetid)
+        else:
+            result[termsetid] = matches
+
+    if missingtermsetids:
+        for termsetid, matches in fusedtermcheck(paragraph, missingtermsetids).items():
+            matches = [list(match) for match in matches]
+            storefindings(matches, 'terms-' + termsets[termsetid]['key'],
+                          content)
+            result[termsetid] = matches
+
+    return result
+
+
+# IDs of the term sets of the check modules that run on the current
+# document, set by preparedocument()
+activetermsetids = []
+
+# Matches of term sets by paragraph, filled by extractedtermcheck():
+# termmatches = { <element>: { <term set ID>: [ match, match, ... ], ... }, ... }
+termmatches = {}
 
-        skipcount = 0
-        for wordposition, word in enumerate(words):
-            # If we hit a placeholder, e.g. ##@key-1##, the number
-            # (here: 1) signifies the number of tokens this placeholder
-            # replaces. If no placeholder found, tagtokens is 1.
-            _, _, tagtokens = findtagreplacement(word)
-            currenttokeninparagraph += tagtokens
 
+def fusedtermcheck(paragraph, termsetids):
+    """ Check a paragraph record with several term sets at once. The paragraph
+    is only split into sentences and tokens once for all of them.
+
+    :param tuple paragraph: paragraph record, see makeparagraph()
+    :param list termsetids: IDs of term sets in termsets
+    :return: dict of matches (see matchtermset()) by term set ID
+    """
+
+    content = paragraph[0]
+    if not content:
+        return {termsetid: [] for termsetid in termsetids}
+
+    # Usually, sanitizing does not change anything, so this is the same
+    # analysis as that of the content itself.
+    analysis = analyzecontent(sanitizepunctuation(content, quotes=False,
+                                                  apostrophes=True))
+    foldedcontent = analysis['folded']
+
+    profile = profiling.profile
+    if profile is not None:
+        instrumented = {termsetid: profiling.instrumenttermset(
+            termsetid, termsets[termsetid]) for termsetid in termsetids}
+        timestartmatch = time.perf_counter()
+
+    result = {}
+    tokens = None
+    totalwords = 0
+    # Results of patterns on tokens, shared by all term sets, see
+    # matchtermset()
+    matchmemo = {}
+    for termsetid in termsetids:
+        termset = termsets[termsetid]
+        if profile is not None:
+            termset = instrumented[termsetid]
+        # Find out which patterngroups can match anywhere in this paragraph
+        # at all. Usually, that is only a handful of them and often none at
+        # all.
+        possiblepatterngroups = scan(termset['prefilterautomaton'],
+                                     foldedcontent, folded=True)
+        if not possiblepatterngroups:
+            result[termsetid] = []
+            continue
+
+        if tokens is None:
+            tokens = analysis['sentences']
+            totalwords = sum(len(sentence[0]) for sentence in tokens)
+        result[termsetid] = matchtermset(termset, tokens,
+                                         possiblepatterngroups, matchmemo)
+        if profile is not None:
+            profiling.addmatches(termset, result[termsetid])
+
+    if profile is not None and tokens is not None:
+        profiling.addparagraph(time.perf_counter() - timestartmatch,
+                               totalwords, 'terms',
+                               profiling.paragraphlocation(paragraph))
+
+    return result
+
+
+def matchtermset(termset, tokens, possiblepatterngroups, matchmemo=None):
+    """ Find all matches of a term set in a paragraph.
+
+    Many terms share patterns, within a term set and across them. Each
+    pattern only runs once per token: results are kept in matchmemo by
+    pattern ID (see internpattern()) and token, and patternmatchstats counts
+    how often they could be reused.
+
+    :param dict termset: term set, see loadtermdata()
+    :param list tokens: sentences of the paragraph, see analyzecontent()
+    :param set possiblepatterngroups: IDs of patterngroups that can match
+        anywhere in the paragraph
+    :param dict matchmemo: results of patterns on tokens of the same
+        paragraph, by pattern ID and token (default: a new one)
+    :return: list of matches, each of them a tuple of the position of the
+        term, the matched words and the first and last token to highlight
+    """
+
+    ignoredpattern = termset['ignoredpattern']
+    contextpatterns = termset['contextpatterns']
+    patterngroups = termset['patterngroups']
+    patterngroupterms = termset['patterngroupterms']
+    termindex = termset['termindex']
+    patterngroupids = termset['patterngroupids']
+    # generated match functions per patterngroup, see termcompiler
+    matchers = termset.get('matchers')
+    # whether the patterns are timed, see profiling.instrumenttermset()
+    profiled = 'terms' in termset
+
+    if matchmemo is None:
+        matchmemo = {}
+    memosize = len(matchmemo)
+    # number of results taken from matchmemo
+    memohits = [0]
+
+    termmatchesofparagraph = []
+    for words, positions, strippedwords, foldedwords, _ in tokens:
+        totalwords = len(words)
+        # Context of the sentence for contextpatterns (see searchcontext())
+        # and for generated match functions
+        context = [words, None, {}, matchmemo, memohits]
+
+        skipcount = 0
+        for wordposition, word in enumerate(strippedwords):
             # Idea of skipcount: if we previously matched a multi-word pattern,
             # we can simply skip the next few words since they were matched
             # already.
@@ -159,155 +490,236 @@ def termcheck(context, termfileid, content, contentpretty, contextid, basefile,
                 skipcount -= 1
                 continue
 
-            word = removepunctuation(word, start=True)
-
             # don't burn time on checking small words like "the," "a," "of" etc.
             # (configurable from within terminology file)
             if ignoredpattern and ignoredpattern.match(word):
                 continue
 
-            # When a pattern already matches on a word, don't try to find more
-            # problems with it.
-            trynextterm = True
-
-            # Use the *patterns variables defined above to match all patterns
-            # over everything that is left.
-            # Don't use enumerate with patterngroupposition, its value
-            # depends on being defined in this scope.
-            patterngroupposition = 0
-
-            for accept, patterngroups in zip(accepts, patterns):
-                if trynextterm:
-                    acceptword = accept[0]
-                    acceptcontext = accept[1]
-
-                    # FIXME: variable names are a bit of a mouthful
-                    for patterngrouppatterns in patterngroups:
-                        if not trynextterm:
-                            break
-                        if (wordposition + len(patterngrouppatterns)) > totalwords:
-                            patterngroupposition += 1
-                            continue
-                        trycontextpatterns = True
-                        matchwords = ""
-                        # Don't use enumerate for patterngrouppatternposition,
-                        # its value depends on breaks.
-                        patterngrouppatternposition = 0
-                        skipcounttemporary = 0
-                        for patterngrouppattern in patterngrouppatterns:
-                            patternposition = wordposition + patterngrouppatternposition
-                            if patternposition > (totalwords - 1):
-                                trycontextpatterns = False
-                                break
-                            matchword = None
-
-                            # This if/else is a bit dumb, but we already did
-                            # removepunctuation() on word, so it is not
-                            # the same as words[ patternposition ] any more.
-                            if patterngrouppatternposition == 0:
-                                matchword = patterngrouppattern.match(word)
-                            else:
-                                matchword = patterngrouppattern.match(words[patternposition])
-                            if matchword:
-                                if patterngrouppatternposition != 0:
-                                    # The first matched pattern should not make
-                                    # us skip a word ahead.
-                                    skipcounttemporary += 1
-                                    matchwords += " "
-                                matchwords += matchword.group(0)
-                            else:
-                                trycontextpatterns = False
-                                break
-                            patterngrouppatternposition += 1
-
-                        contextpatternstopatterngroup = contextpatterns[patterngroupposition]
-                        highlightstart = currenttokeninparagraph
-                        highlightend = highlightstart + skipcounttemporary
-                        patterngroupposition += 1
-                        if not trycontextpatterns:
-                            continue
-
+            # Only try the patterngroups whose first pattern can match the
+            # current word at all. The IDs we get back are ascending, so
+            # patterngroups are tried in the order of the terminology file
+            # and the first match wins, as before.
+            for patterngroupposition in indexcandidates(termindex,
+                                                        foldedwords[wordposition],
+                                                        folded=True):
+                if patterngroupposition not in possiblepatterngroups:
+                    continue
+                patterngrouppatterns = patterngroups[patterngroupposition]
+                patterncount = len(patterngrouppatterns)
+                if (wordposition + patterncount) > totalwords:
+                    continue
+
+                if matchers is not None:
+                    matchwords = matchers[patterngroupposition](
+                        word, words, wordposition, totalwords, context)
+                    if matchwords is not None:
+                        skipcount = patterncount - 1
+                        highlightstart = positions[wordposition]
+                        termmatchesofparagraph.append(
+                            (patterngroupterms[patterngroupposition],
+                             matchwords, highlightstart,
+                             highlightstart + skipcount))
+                        break
+                    continue
+
+                # We already did removepunctuation() on word, so it is not
+                # the same as words[wordposition] any more.
+                patternids = patterngroupids[patterngroupposition]
+                key = (patternids[0], word)
+                matchword = matchmemo.get(key, False)
+                if matchword is False:
+                    matchword = matchmemo[key] = \
+                        patterngrouppatterns[0].match(word)
+                else:
+                    memohits[0] += 1
+                    if profiled:
+                        patterngrouppatterns[0].memohit()
+                if not matchword:
+                    continue
+                matchwords = matchword.group(0)
+                for patternposition in range(1, patterncount):
+                    key = (patternids[patternposition],
+                           words[wordposition + patternposition])
+                    matchword = matchmemo.get(key, False)
+                    if matchword is False:
+                        matchword = matchmemo[key] = \
+                            patterngrouppatterns[patternposition].match(key[1])
+                    else:
+                        memohits[0] += 1
+                        if profiled:
+                            patterngrouppatterns[patternposition].memohit()
+                    if not matchword:
+                        break
+                    matchwords += " " + matchword.group(0)
+                if not matchword:
+                    continue
+
+                # The first matched pattern should not make us skip a word
+                # ahead.
+                skipcounttemporary = patterncount - 1
+                highlightstart = positions[wordposition]
+                highlightend = highlightstart + skipcounttemporary
+
+                matches = True
+                for contextpattern in contextpatterns[patterngroupposition]:
+                    if not matchcontextpattern(context, wordposition,
+                                               totalwords, patterncount,
+                                               contextpattern):
                         matches = False
-                        if contextpatternstopatterngroup[0][0] is None:
-                            # easy positive
-                            matches = True
-                        else:
-                            matches = True
-                            for contextpattern in contextpatternstopatterngroup:
-                                if not contextpattern[0] or not matchcontextpattern(words,
-                                                        wordposition, totalwords,
-                                                        patterngrouppatternposition,
-                                                        contextpattern):
-                                    matches = False
-                                    break
-
-                        if matches:
-                            skipcount = skipcounttemporary
-                            trynextterm = False
-                            line = linenumber(context)
-                            contenthighlighted = highlight(xmlescape(contentpretty), highlightstart, highlightend)
-                            messages.append(termcheckmessage(
-                                acceptword, acceptcontext, matchwords, line,
-                                contenthighlighted, contextid, basefile,
-                                messagetype))
+                        break
 
-    if flag_performance:
-        timeendmatch = time.time()
-        timediffmatch = timeendmatch - timestartmatch
-        timeperword = 0 if totalwords < 1 else timediffmatch / totalwords
+                if matches:
+                    # When a pattern already matches on a word, don't try to
+                    # find more problems with it.
+                    skipcount = skipcounttemporary
+                    termmatchesofparagraph.append(
+                        (patterngroupterms[patterngroupposition], matchwords,
+                         highlightstart, highlightend))
+                    break
 
-        printcolor("""words: %s
-time for this para: %s
-average time per word: %s\n"""
-            % (str(totalwords), str(timediffmatch),
-                str(timeperword)), 'debug')
+    patternmatchstats['hits'] += memohits[0]
+    patternmatchstats['misses'] += len(matchmemo) - memosize
+    return termmatchesofparagraph
+
+
+def termcheckmessages(termset, matches, paragraph, messagetype):
+    """ Create messages for the matches of a term set in a paragraph.
+
+    :param dict termset: term set, see loadtermdata()
+    :param list matches: matches, see matchtermset()
+    :param tuple paragraph: paragraph record, see makeparagraph()
+    :param str messagetype: print a 'warning', 'info', or 'error' message?
+    """
+
+    if not matches:
+        return []
+
+    content, contentpretty, contextid, basefile, line = paragraph
+
+    # sanitize this...
+    if messagetype not in ('warning', 'info'):
+        messagetype = 'error'
+
+    # This if/else block should not be necessary (if there is content,
+    # there should always also be pretty content, but that depends on the
+    # XSLT used for checking). It hopefully won't hurt either.
+    contentpretty = contentpretty or \
+        sanitizepunctuation(content, quotes=False, apostrophes=True)
+    pretty = analyzepretty(contentpretty)
+
+    messages = []
+    for termposition, matchwords, highlightstart, highlightend in matches:
+        acceptword, acceptcontext = termset['accepts'][termposition]
+        contenthighlighted = highlightpretty(pretty, highlightstart,
+                                             highlightend)
+        messages.append(termcheckmessage(
+            acceptword, acceptcontext, matchwords, line,
+            contenthighlighted, contextid, basefile,
+            messagetype))
 
     return messages
 
 
-def matchcontextpattern(words, wordposition, totalwords,
-                        patterngrouppatternposition, contextpattern):
-    contextstring = ""
-    for contextwhere in contextpattern[1]:
+def sentencewindows(words):
+    """ Join the tokens of a sentence for searchcontext(), such that the
+    context string of any run of tokens is a slice.
+
+    :param list words: tokens of the sentence
+    :return: tuple of the tokens, each followed by a space, and the offset
+        of each token in it (plus the length of the text)
+    """
+    offsets = [0]
+    for word in words:
+        offsets.append(offsets[-1] + len(word) + 1)
+    return ("".join(word + " " for word in words), offsets)
+
+
+def matchcontextpattern(context, wordposition, totalwords, patterncount,
+                        contextpattern):
+    """ Check a contextpattern around a match of a patterngroup.
+
+    :param list context: context of the sentence, see searchcontext()
+    :param int wordposition: position of the first matched token
+    :param int totalwords: number of tokens of the sentence
+    :param int patterncount: number of patterns of the patterngroup
+    :param tuple contextpattern: contextpattern, see loadtermdata()
+    """
+    pattern, locations, positive = contextpattern
+
+    contextpositions = []
+    for contextwhere in locations:
         contextposition = wordposition + contextwhere
         if contextwhere > 0:
-            # patterngrouppatternposition is at 1,
-            # even if there was just one pattern
-            contextposition += patterngrouppatternposition - 1
+            # Positions after the match are relative to its last token.
+            contextposition += patterncount - 1
         if contextposition >= 0 and contextposition <= (totalwords - 1):
-            contextstring += str(words[contextposition]) + " "
+            contextpositions.append(contextposition)
+
+    return searchcontext(context, pattern, contextpositions, positive)
+
+
+def searchcontext(context, pattern, contextpositions, positive):
+    """ Search a contextpattern in the tokens at some positions of a
+    sentence.
+
+    The tokens of the sentence are joined into one string once, such that
+    the context string of any run of tokens is a slice. Positive and
+    negative contextpatterns share the results of searches, and
+    overlapping windows (like location="2" for neighboring matches) are only
+    searched once.
+
+    :param list context: context of the sentence: its tokens, the result of
+        sentencewindows() for them or None if not made yet, and a dict of
+        earlier search results by pattern and positions
+    :param pattern: compiled contextpattern
+    :param list contextpositions: positions of the tokens, ascending and
+        within the sentence
+    :param bool positive: whether the pattern has to appear (True) or must
+        not appear (False)
+    """
 
     # We could check for an empty context
     # here and then not run any check,
     # but that would lead to wrong
     # results when doing negative
     # matching.
+    if not contextpositions:
+        return not positive
+
+    key = (id(pattern), tuple(contextpositions))
+    contextmatches = context[2]
+    match = contextmatches.get(key)
+    if match is None:
+        if context[1] is None:
+            context[1] = sentencewindows(context[0])
+        text, offsets = context[1]
+        first = contextpositions[0]
+        last = contextpositions[-1]
+        if contextpositions == list(range(first, last + 1)):
+            contextstring = text[offsets[first]:offsets[last + 1]]
+        else:
+            contextstring = "".join(text[offsets[position]:offsets[position + 1]]
+                                    for position in contextpositions)
+        match = bool(pattern.search(contextstring))
+        contextmatches[key] = match
+
+    return positive == match
 
-    match = bool(contextstring) and bool(contextpattern[0].search(contextstring))
-    return bool(contextpattern[2]) == match
 
-def preparetermpatterns(term, useonepattern):
+def preparetermpatterns(term):
     """ Prepare regular expression patterns contained in the <term/> elements
     of an XML source by extracting their main pattern and context patterns
-    and appending the main pattern to onepattern (if use of onepattern is
-    enabled)
 
     :param ??? term: XML source of one <term/> element
-    :param bool useonepattern: use onepattern?
+    :return: list of patterns (per patterngroup), list of contextpatterns
+        (per patterngroup)
     """
 
-    global onepattern
     patternsofterm = []
+    contextpatternsofterm = []
     patterngroupxpaths = term.xpath('patterngroup')
     for patterngroupxpath in patterngroupxpaths:
-        preparedpatterns = preparepatterns(patterngroupxpath, useonepattern)
-        if useonepattern:
-            # use (?: to create non-capturing groups: the re module's
-            # implementation only supports up to 100 named groups per
-            # expression
-            onepattern += '|(?:%s)' % (preparedpatterns[1])
-
-        patternsofterm.append(preparedpatterns[0])
+        patternsofterm.append(preparepatterns(patterngroupxpath))
 
         contextpatternsofpatterngroup = []
         contextpatternxpaths = patterngroupxpath.xpath('contextpattern')
@@ -317,96 +729,268 @@ def preparetermpatterns(term, useonepattern):
                     preparecontextpatterns(contextpatternxpath))
         else:
             contextpatternsofpatterngroup.append([None])
-        contextpatterns.append(contextpatternsofpatterngroup)
+        contextpatternsofterm.append(contextpatternsofpatterngroup)
 
-    return patternsofterm
+    return [patternsofterm, contextpatternsofterm]
 
 
-def buildtermdata(context, terms, ignoredwords, useonepattern):
+# Version of the data format created by preparetermdata(), increase whenever
+# it changes, so old cached data is not used anymore. Changes to the code
+# that prepares the data are covered by sourcedigest().
+TERMDATAVERSION = 2
+
+
+def preparetermdata(terms, ignoredwords):
     """ From XML definitions containing regular expressions to check for
-    terminology/wording, create Python data structures. While we could also
-    read the XML definitions ad-hoc when checking terminology, that would be
-    significantly slower.
+    terminology/wording, create the data that loadtermdata() needs. Regular
+    expression patterns are returned in their final (mangled) form but are
+    not compiled, such that the result can be serialized as JSON.
 
-    :param ??? context: information about context node
     :param list terms: <term/> elements from terminology file
-    :param str ignoredwords: regular expression containing words that should be ignored globally
-    :param bool onepattern: should onepattern be used? (onepattern is a large
-        regular expression pattern that combines all the main search patterns
-        into one)
+    :param list ignoredwords: regular expression containing words that should
+        be ignored globally (list with a single string or empty)
     """
 
-    del context  # not used
+    termdata = {}
 
-    # random ID to find out if the termdata is still up-to-date
-    global termdataid
+    termdata['ignoredpattern'] = None
+    if ignoredwords:
+        trypattern(ignoredwords[0])
+        termdata['ignoredpattern'] = [manglepattern(ignoredwords[0], 0), re.I]
+
+    termdata['accepts'] = [prepareaccept(term) for term in terms]
+
+    preparedterms = [preparetermpatterns(term) for term in terms]
+    termdata['patterns'] = [patternsofterm
+                            for patternsofterm, _ in preparedterms]
+    termdata['contextpatterns'] = [contextpatternsofpatterngroup
+                                   for _, contextpatternsofterm in preparedterms
+                                   for contextpatternsofpatterngroup in contextpatternsofterm]
+
+    # Which literal strings can matches of the first pattern of each
+    # patterngroup start with? See termindex.buildtokenindex().
+    termdata['prefixes'] = [
+        literalprefixes(re_compile(*patternsofpatterngroup[0]))
+        for patternsofterm in termdata['patterns']
+        for patternsofpatterngroup in patternsofterm]
+    termdata['prefixes'] = [sorted(prefixes) if prefixes is not None else None
+                            for prefixes in termdata['prefixes']]
+
+    # Literal strings of which at least one must appear in a paragraph for
+    # each patterngroup to match, see prefilter.buildautomaton().
+    termdata['literals'] = [
+        patterngroupliterals([re_compile(*pattern)
+                              for pattern in patternsofpatterngroup])
+        for patternsofterm in termdata['patterns']
+        for patternsofpatterngroup in patternsofterm]
+    termdata['literals'] = [sorted(literals) if literals is not None else None
+                            for literals in termdata['literals']]
+
+    return termdata
+
+
+def loadtermdata(termdata):
+    """ Compile the data created by preparetermdata() into a term set that
+    termcheck() can use.
+
+    :param dict termdata: data created by preparetermdata()
+    :return: term set (dict)
+    """
+
+    termset = {}
 
     # pattern of words that can be ignored right away
-    global ignoredpattern
-
-    # list of accepted terms:
-    # accepts = [ [ 'proposal', 'context' ], [ 'proposal without context', None ], [ None, None ], ... ]
-    #             <accept/> #1,              <accept/> #2,                         <accept/> #3
-    global accepts
-    accepts = []
-
-    # list of main search patterns, per accepted term:
-    # patterns = [ [ [ pattern, pattern, pattern ], [ pattern, pattern ] ], [ [ pattern, pattern ], ... ], ... ]
-    #              <accept/> #1,                                            <accept/> #1
-    #                <patterngroup/> #1,            <patterngroup/> #2,       <patterngroup/> #1
-    global patterns
-    patterns = []
-
-    # list of contextpatterns, per patterngroup:
-    # patterns = [ [ [ contextpattern, [-2,-1], True ], [ contextpattern, [1], False ], ... ], [], ... ]
-    #              <patterngroup/> #1,                                                         <patterngroup/> #2
-    #                <contextpattern/> #1
-    #                                  position(s) of tokens to check relative to pattern1 [negative numbers => before]
-    #                                           matching mode [True => positive, pattern has to appear at least once]
-    #                                                   <contextpattern/> #2
-    #                                                                     position(s) of tokens to check relative to last [positive numbers => after]
-    #                                                                          matching mode [False => negative, pattern must not appear in any of given places]
-    global contextpatterns
-    contextpatterns = []
-
-    # one long regular expression pattern is cheaper than many short ones,
-    # onepattern tries to account for that, with varying degrees of success
-    global onepattern
-
-    # Not much use, but ... let's make this a real boolean.
-    if useonepattern and useonepattern[0] == 'no':
-        useonepattern = False
-    else:
-        useonepattern = True
+    ignoredpattern = False
+    if termdata['ignoredpattern']:
+        ignoredpattern = re_compile(*termdata['ignoredpattern'])
+    termset['ignoredpattern'] = ignoredpattern
+
+    # tuple of accepted terms:
+    # accepts = ( ( 'proposal', 'context' ), ( 'proposal', None ),
+    #             <accept/> #1,              <accept/> #2 (without context)
+    #             ( None, None ), ... )
+    #             <accept/> #3 (without proposal)
+    termset['accepts'] = tuple(tuple(accept) for accept in termdata['accepts'])
+
+    # main search patterns, per accepted term:
+    # patterns = [ [ ( pattern, pattern, pattern ), ( pattern, pattern ) ],
+    #              <accept/> #1,
+    #                <patterngroup/> #1,            <patterngroup/> #2
+    #              [ ( pattern, pattern ), ... ], ... ]
+    #              <accept/> #2,
+    #                <patterngroup/> #1
+    patterns = [[tuple(re_compile(*pattern) for pattern in patternsofpatterngroup)
+                 for patternsofpatterngroup in patternsofterm]
+                for patternsofterm in termdata['patterns']]
+
+    # tuple of contextpatterns, per patterngroup; patterngroups without
+    # contextpatterns have an empty tuple:
+    # contextpatterns = ( ( ( contextpattern, (-2, -1), True ),
+    #                     <patterngroup/> #1,
+    #                       <contextpattern/> #1,
+    #                                         (1)       (2)
+    #                         ( contextpattern, (1,), False ), ... ), (), ... )
+    #                         <contextpattern/> #2,               <patterngroup/> #2
+    #                                           (3)   (4)
+    # (1) position(s) of tokens to check relative to pattern1 [negative
+    #     numbers => before]
+    # (2) matching mode [True => positive, pattern has to appear at least once]
+    # (3) position(s) of tokens to check relative to the last pattern
+    #     [positive numbers => after]
+    # (4) matching mode [False => negative, pattern must not appear in any of
+    #     given places]
+    termset['contextpatterns'] = tuple(
+        tuple((re_compile(contextpattern[0], contextpattern[1]),
+               tuple(contextpattern[2]), bool(contextpattern[3]))
+              for contextpattern in contextpatternsofpatterngroup
+              if contextpattern[0] is not None)
+        for contextpatternsofpatterngroup in termdata['contextpatterns'])
+
+    # flat tuple of all patterngroups, indexed by patterngroup ID (same order
+    # as contextpatterns), and the position of the term that each
+    # patterngroup belongs to:
+    # patterngroups = ( ( pattern, pattern, pattern ), ( pattern, pattern ),
+    #                   <accept/> #1, <patterngroup/> #1
+    #                                                  <accept/> #1,
+    #                                                  <patterngroup/> #2
+    #                   ( pattern ), ... )
+    #                   <accept/> #2, <patterngroup/> #1
+    # patterngroupterms = ( 0, 0, 1, ... )
+    termset['patterngroups'] = tuple(patterngrouppatterns
+                                     for patternsofterm in patterns
+                                     for patterngrouppatterns in patternsofterm)
+    termset['patterngroupterms'] = tuple(
+        termposition for termposition, patternsofterm in enumerate(patterns)
+        for _ in patternsofterm)
+    # IDs of the patterns of each patterngroup, see internpattern()
+    termset['patterngroupids'] = tuple(
+        tuple(internpattern(pattern) for pattern in patterngrouppatterns)
+        for patterngrouppatterns in termset['patterngroups'])
+
+    # index to find the patterngroups that can match a given word, see
+    # termindex.buildtokenindex()
+    termset['termindex'] = buildtokenindex(termdata['prefixes'])
+
+    # automaton to find the patterngroups that can match anywhere in a
+    # paragraph, see prefilter.buildautomaton()
+    termset['prefilterautomaton'] = buildautomaton(termdata['literals'])
+
+    return termset
+
+
+# Registry of all term sets loaded in this process, by ID:
+# termsets = { 0: <term set of terminology.xml>, 1: <term set of typos.xml>, ... }
+termsets = {}
+
+# IDs of the term sets in termsets, by cache key of their XML definitions, so
+# each term file is only compiled once per process.
+termsetids = {}
+
+# Functions that return the generated match functions of term sets, by cache
+# key, see termcompiler.loadcompiledterms(); None until loaded
+compiledterms = None
+
+# IDs of the distinct patterns of all term sets, by pattern and flags, see
+# internpattern()
+patternids = {}
+
+# How often matchtermset() could reuse the result of a pattern on a token
+# (hits) and how often it had to run a pattern (misses)
+patternmatchstats = {'hits': 0, 'misses': 0}
+profiling.cachestats['pattern matches'] = patternmatchstats
+
+
+def internpattern(pattern):
+    """ Returns the ID of a compiled pattern. Patterns with the same
+    expression and flags get the same ID, in all term sets.
+
+    :param pattern: compiled regular expression
+    """
+    return patternids.setdefault((pattern.pattern, pattern.flags),
+                                 len(patternids))
 
-    onepattern = "" if useonepattern else None
 
-    if flag_performance:
-        timestartbuild = time.time()
+def termdatakey(terms, ignoredwords):
+    """ Returns the cache key of the term set for XML definitions. Besides
+    the terms, the prepared data depends on the code that prepares it (like
+    manglepattern(), termindex, and prefilter), so the key changes with the
+    code of sdsc, see sourcedigest().
 
-    # FIXME: Obviously this needs to be done in a better way,
-    # like an incrementing counter
-    termdataid = random.randint(0, 999999999)
+    :param list terms: <term/> elements from terminology file
+    :param list ignoredwords: regular expression containing words that should
+        be ignored globally (list with a single string or empty)
+    """
+    return cachekey('termdata-%d' % TERMDATAVERSION, sourcedigest(),
+                    str(ignoredwords[0]) if ignoredwords else '',
+                    *[etree.tostring(term, with_tail=False) for term in terms])
 
-    if ignoredwords:
-        trypattern(ignoredwords[0])
-        ignoredpattern = re_compile(manglepattern(ignoredwords[0], 0),
-                                    flags=re.I)
-    else:
-        ignoredpattern = False
 
-    accepts = [prepareaccept(term) for term in terms]
-    patterns = [preparetermpatterns(term, useonepattern) for term in terms]
+def compiledmatchers(key):
+    """ Returns the generated match functions of a term set (see
+    termcompiler), if sdsc --compile-terms has created them.
 
-    if useonepattern:
-        onepattern = onepattern[1:]
+    :param str key: cache key of the term set, see termdatakey()
+    :return: tuple of match functions by patterngroup ID or None
+    """
+    global compiledterms
+    if compiledterms is None:
+        compiledterms = loadcompiledterms(COMPILEDTERMSFILE)
+    build = compiledterms.get(key)
+    return build() if build is not None else None
 
-    if useonepattern:
-        onepattern = re_compile(manglepattern(onepattern, 'one'), flags=re.I)
 
-    if flag_performance:
-        timeendbuild = time.time()
-        printcolor("time to build: %s" % str(timeendbuild - timestartbuild), 'debug')
+def buildtermdata(context, terms, ignoredwords, useonepattern):
+    """ From XML definitions containing regular expressions to check for
+    terminology/wording, create Python data structures. While we could also
+    read the XML definitions ad-hoc when checking terminology, that would be
+    significantly slower.
+
+    The result is registered in termsets. If the same definitions were
+    already registered before, e.g. for a previous document, the existing term
+    set is reused.
+
+    If a cache directory is set, the prepared (but uncompiled) data is stored
+    there and reused as long as the terms, sdsc and Python's re module stay
+    the same.
+
+    :param ??? context: information about context node
+    :param list terms: <term/> elements from terminology file
+    :param str ignoredwords: regular expression containing words that should be ignored globally
+    :param str useonepattern: ignored; onepattern (a large regular expression
+        pattern that combined all the main search patterns into one) has been
+        replaced by the prefilter which is always used
+    :return: ID of the term set in termsets
+    """
+
+    del context  # not used
+    del useonepattern  # not used
+
+    key = termdatakey(terms, ignoredwords)
+
+    termdataid = termsetids.get(key)
+    # When checking patterns, we need to go through all of them anyway.
+    if termdataid is None or flag_checkpatterns:
+        termdata = None
+        usecache = cachedir and not flag_checkpatterns
+        if usecache:
+            termdata = readcache(cachedir, 'termdata', key)
+
+        if termdata is None:
+            termdata = preparetermdata(terms, ignoredwords)
+            if usecache:
+                writecache(cachedir, 'termdata', key, termdata)
+
+        if termdataid is None:
+            termdataid = len(termsets)
+        termsets[termdataid] = loadtermdata(termdata)
+        # identifies the rules of the term set in the paragraph cache
+        termsets[termdataid]['key'] = key
+        if not flag_checkpatterns:
+            matchers = compiledmatchers(key)
+            if matchers is not None:
+                termsets[termdataid]['matchers'] = matchers
+        termsetids[key] = termdataid
+
     return termdataid
 
 
@@ -458,13 +1042,16 @@ def expressionerror(message, expression="muschebubu"):
     sys.exit(1)
 
 
-def manglepattern(pattern, mode):
+def manglepattern(pattern, mode, optimize=True):
     """ Modify regular expression patterns to work within our various
     pattern matching modes. (Potentially fraught with errors. Beware when writing patterns.)
 
     :param str pattern: the regular expression pattern
     :param str mode: 'context' for context pattern treatment, 'one' for
         onepattern treatment, anything else for regular treatment
+    :param bool optimize: whether the pattern may be put into the result only
+        once; False always gives the original version, which has the pattern
+        three times (it finds the same matches, but is slower)
     """
 
     # Use (?: to create non-capturing groups: the re module's
@@ -484,7 +1071,14 @@ def manglepattern(pattern, mode):
         # of the string, have a space before them and optionally can also
         # have a non-word character directly before them, e.g. (.
         # The character class [\s^] does not work, thus we use (?:\s|^).
-        pattern = r'((?<=^)(?:{0})|(?<=\s|^\W)(?:{0})|(?<=\s\W)(?:{0}))'.format(pattern)
+        # All three places are tried before the pattern itself, so the
+        # pattern is only there once. That finds the same matches as
+        # trying the pattern after each of the lookbehinds, as the
+        # lookbehinds do not change what the pattern matches.
+        if optimize and not GROUPREFERENCE.search(pattern):
+            pattern = r'((?:(?<=^)|(?<=\s|^\W)|(?<=\s\W))(?:{0}))'.format(pattern)
+        else:
+            pattern = r'((?<=^)(?:{0})|(?<=\s|^\W)(?:{0})|(?<=\s\W)(?:{0}))'.format(pattern)
 
     # And finally, let's see if there is any punctuation at the end. Looking
     # for the end of the string or a space makes sure we don't match e.g.
@@ -517,15 +1111,15 @@ def prepareaccept(term):
     return [proposal, context]
 
 
-def preparepatterns(patterngroupxpath, useonepattern):
-    """ Create a list of main patterns from a <patterngroup/> XML source.
+def preparepatterns(patterngroupxpath):
+    """ Create a list of main patterns from a <patterngroup/> XML source. Each
+    pattern is returned as a list of the mangled pattern and the flags to
+    compile it with.
 
     :param ??? patterngroupxpath: XML source of a <patterngroup/>
-    :param bool useonepattern: use onepattern?
     """
 
     patternsofpatterngroup = []
-    patternforonepattern = None
 
     lengthpatterngroupxpath = len(patterngroupxpath.xpath('pattern'))
     for i in range(1, lengthpatterngroupxpath + 1):
@@ -541,18 +1135,14 @@ def preparepatterns(patterngroupxpath, useonepattern):
                 break
         else:
             trypattern(patternxpathcontent)
-            if i == 1 and useonepattern:
-                patternforonepattern = patternxpathcontent
             patternxpathcontent = manglepattern(patternxpathcontent, 'default')
 
-        pattern = None
         if patternxpath[0].get('case') == 'keep':
-            pattern = re_compile(patternxpathcontent)
+            patternsofpatterngroup.append([patternxpathcontent, 0])
         else:
-            pattern = re_compile(patternxpathcontent, flags=re.I)
-        patternsofpatterngroup.append(pattern)
+            patternsofpatterngroup.append([patternxpathcontent, re.I])
 
-    return [patternsofpatterngroup, patternforonepattern]
+    return patternsofpatterngroup
 
 
 def contextpatternlocations(locations, factors, fuzzymode=False):
@@ -584,10 +1174,7 @@ def preparecontextpatterns(contextpatternxpath):
     # searching for e.g. "mail" in "e-mail".
     contextpatternxpathcontent = manglepattern(contextpatternxpathcontent, 'context')
 
-    if contextpatternxpath.get('case') == 'keep':
-        contextpattern = re_compile(contextpatternxpathcontent)
-    else:
-        contextpattern = re_compile(contextpatternxpathcontent, flags=re.I)
+    flags = 0 if contextpatternxpath.get('case') == 'keep' else re.I
 
     factors = [1]
     if contextpatternxpath.get('look') == 'before':
@@ -602,7 +1189,7 @@ def preparecontextpatterns(contextpatternxpath):
     locations = [int(locationxpath)] if locationxpath else [1]
     locations = contextpatternlocations(locations, factors, fuzzymode)
 
-    return [contextpattern, locations, positivematch]
+    return [contextpatternxpathcontent, flags, locations, positivematch]
 
 
 def emptypatternmessage(element):
@@ -693,11 +1280,65 @@ def highlight(tokens, highlightstart, highlightend):
     return " ".join(tokens)
 
 
+def highlightpretty(pretty, highlightstart, highlightend):
+    """Same as highlight() but for pretty content analyzed by
+    analyzepretty(), so the content does not need to be tokenized again for
+    each message.
+
+    :param dict pretty: analysis of the pretty content, see analyzepretty()
+    :param int highlightstart: start highlighting before this token (starting from zero)
+    :param int highlightend: stop highlighting after this token (starting from zero)
+    :return: string with <highlight> tags at appropriate places"""
+
+    starts = pretty['starts']
+    highlightstart = max(highlightstart, 0)
+    highlightend = max(highlightend, 0)
+    highlightend = min(highlightend, len(starts) - 1)
+
+    if highlightstart >= len(starts) or highlightend < highlightstart:
+        return ""  # Nothing to highlight
+
+    text = pretty['text']
+    start = starts[highlightstart]
+    end = pretty['ends'][highlightend]
+    return (text[:start] + "<highlight>" + text[start:end] + "</highlight>" +
+            text[end:])
+
+
+def prettyslice(pretty, slicestart, sliceend):
+    """Returns the tokens slicestart to sliceend (excluding) of pretty
+    content analyzed by analyzepretty(), joined by single spaces."""
+
+    slicestart = max(slicestart, 0)
+    sliceend = min(sliceend, len(pretty['starts']))
+    if sliceend <= slicestart:
+        return ""
+    return pretty['text'][pretty['starts'][slicestart]:
+                          pretty['ends'][sliceend - 1]]
+
+
 def sentencelengthcheck(context, content, contentpretty, contextid, basefile,
                         lengthwarning, lengtherror):
     """Takes a paragraph, splits up sentences and checks whether the number
     of words in the sentences is longer than a defined maximum.
     """
+    return paragraphsentencelengthcheck(
+        makeparagraph(context, content, contentpretty, contextid, basefile),
+        lengthwarning, lengtherror)
+
+
+def extractedsentencelengthcheck(context, lengthwarning, lengtherror):
+    """Same as sentencelengthcheck() but uses the paragraph record of the
+    context node created by extractparagraphs().
+    """
+    return paragraphsentencelengthcheck(paragraphs[context.context_node],
+                                        lengthwarning, lengtherror)
+
+
+def paragraphsentencelengthcheck(paragraph, lengthwarning, lengtherror):
+    """Takes a paragraph record, splits up sentences and checks whether the
+    number of words in the sentences is longer than a defined maximum.
+    """
 
     # Try to use sensible defaults. The following seems like better advice than
     # the SUSE Documentation Style Guide has to offer:
@@ -726,23 +1367,56 @@ def sentencelengthcheck(context, content, contentpretty, contextid, basefile,
         except ValueError:
             printcolor('Sentence length check: Wrong type. Using default.', 'error')
 
+    content, contentpretty, contextid, basefile, line = paragraph
+
     if not content:
         return []
 
+    findings = lookupfindings('sentencelength', content, contentpretty,
+                              *maximumlengths)
+    if findings is None:
+        findings = sentencelengthfindings(content, contentpretty,
+                                          maximumlengths)
+        storefindings(findings, 'sentencelength', content, contentpretty,
+                      *maximumlengths)
+
+    filename = "<file>{0}</file>".format(basefile) if basefile else ""
+    withinid = "<withinid>{0}</withinid>".format(contextid) if contextid else ""
+
     messages = []
-    # I get this as a list with one lxml.etree._ElementUnicodeResult, not
-    # as a list with a string.
-    content = str(content[0])
+    for messagetype, wordcount, highlightedcontent in findings:
+        messages.append(etree.XML("""<result type="%s">
+                            <location>%s%s<line>%s</line></location>
+                            <message>Sentence with %s words:
+                            <quote>%s</quote>
+                        </message>
+                        <suggestion>Remove unnecessary words.</suggestion>
+                        <suggestion>Split the sentence.</suggestion>
+                    </result>""" % (messagetype, filename, withinid, str(line),
+                                    str(wordcount), highlightedcontent)))
+
+    return messages
+
+
+def sentencelengthfindings(content, contentpretty, maximumlengths):
+    """Finds the sentences of a paragraph that are too long.
 
-    basefile = basefile[0] if basefile else None
-    contextid = contextid[0] if contextid else None
+    :param str content: content, as formatted for text-level checks
+    :param str contentpretty: content, as formatted for display in a message
+    :param list maximumlengths: number of words from which on there is a
+        warning and an error
+    :return: list of message type, number of words and highlighted content
+        per sentence that is too long
+    """
+
+    findings = []
 
     # This if/else block should not be necessary (if there is content,
     # there should always also be pretty content, but that depends on the
     # XSLT used for checking). It hopefully won't hurt either.
-    contentpretty = str(contentpretty[0]) if contentpretty else content
+    contentpretty = contentpretty or content
 
-    sentences = sentencesegmenter(content)
+    sentences = analyzecontent(content)['sentences']
     # We need to find the current sentence inside of contentpretty by counting tokens.
     # In content, some tags like <command/> are replaced by
     # "##@command-<nr tokens>##" so we need to count that as well.
@@ -750,42 +1424,26 @@ def sentencelengthcheck(context, content, contentpretty, contextid, basefile,
     sentenceend = 0
 
     for sentence in sentences:
-        words = tokenizer(sentence)
-
         # Count tag replacements
         wordcount = 0
-        for token in words:
-            _, _, tagtokens = findtagreplacement(token)
-
+        for tagtokens in sentence[4]:
             sentenceend += tagtokens
             # Tag placeholders count as max. 1 word.
             wordcount += min(1, tagtokens)
 
         if wordcount >= maximumlengths[0]:
-            filename = "<file>{0}</file>".format(basefile) if basefile else ""
-            withinid = "<withinid>{0}</withinid>".format(contextid) if contextid else ""
             messagetype = "error" if wordcount >= maximumlengths[1] else "warning"
 
-            contentpretty = xmlescape(contentpretty)
-            prettytokens = tokenizer(contentpretty)
-            line = linenumber(context)
-            highlightedcontent = highlight(prettytokens, sentencestart, sentenceend - 1)
-            messages.append(etree.XML("""<result type="%s">
-                            <location>%s%s<line>%s</line></location>
-                            <message>Sentence with %s words:
-                            <quote>%s</quote>
-                        </message>
-                        <suggestion>Remove unnecessary words.</suggestion>
-                        <suggestion>Split the sentence.</suggestion>
-                    </result>""" % (messagetype, filename, withinid, str(line),
-                                    str(wordcount), highlightedcontent)))
+            highlightedcontent = highlightpretty(analyzepretty(contentpretty),
+                                                 sentencestart, sentenceend - 1)
+            findings.append([messagetype, wordcount, highlightedcontent])
 
         sentencestart = sentenceend
 
-    return messages
+    return findings
 
 
-def canBeDupe(word):
+def canBeDupe(word, tagfound=None):
     """Checks if a word is eligible to be a duplicated word or if
     it should be ignored because it is actually a tag replacement.
 
@@ -794,11 +1452,18 @@ def canBeDupe(word):
        ##@lowercase##
     The second form is counted as one token, the first one is counted as as many
     tokens as the number given after the dash.
+
+    :param str word: token without punctuation
+    :param bool tagfound: whether word contains a tag replacement, if already
+        known (see findtagreplacements())
     """
 
+    if tagfound is None:
+        tagfound = findtagreplacement(word)[0]
+
     numberignore = re_compile(r'[[{(\'"\s]*[-+]?[0-9]+(?:[.,][0-9]+)*[]})\'";:.\s]*')
 
-    return len(word) > 0 and not numberignore.match(word) and not findtagreplacement(word)[0]
+    return len(word) > 0 and not numberignore.match(word) and not tagfound
 
 
 def isDupe(tokens, pos):
@@ -808,25 +1473,58 @@ def isDupe(tokens, pos):
     pos = 2
     return 1
     """
+    return dupelength(tokens, dupetokens(tokens), pos)
+
+
+def dupetokens(tokens):
+    """Prepares the tokens of a paragraph for dupelength().
+
+    :param list tokens: tokens of the paragraph
+    :return: tuple of lists with one entry per token: whether the token can
+        be a duplicate at all (see canBeDupe()), the token without leading
+        punctuation, and the token without trailing punctuation
+    """
+    stripped = [removepunctuation(token, start=True, end=True)
+                for token in tokens]
+    return ([canBeDupe(word, replacement[0]) for word, replacement
+             in zip(stripped, findtagreplacements(stripped))],
+            [removepunctuation(token, start=True) for token in tokens],
+            [removepunctuation(token, end=True) for token in tokens])
+
+
+def dupelength(tokens, normalized, pos):
+    """Returns how many tokens at pos are duplicated, like isDupe(), but
+    with the tokens already prepared by dupetokens(), so checking all
+    positions of a paragraph takes linear time.
+
+    :param list tokens: tokens of the paragraph
+    :param tuple normalized: return value of dupetokens() for tokens
+    :param int pos: position of the token to check
+    """
     # FIXME: Find a clever way to be able to check for variants of the same
     # word, such as: a/an, singular/plural, verb tenses. It should ideally
     # not be hardcoded here.
+    candidates, startstripped, endstripped = normalized
     maxlen = min(3, pos, len(tokens) - pos)
-    tokens = tokens[:]
     for l in range(1, maxlen + 1):
-        if not canBeDupe(removepunctuation(tokens[pos + l - 1], start=True, end=True)):
+        if not candidates[pos + l - 1]:
             return 0
 
-        if removepunctuation(tokens[pos - l:pos], start=True) == removepunctuation(tokens[pos:pos + l], end=True):
+        # Like comparing tokens[pos - l:pos] and tokens[pos:pos + l], but
+        # without punctuation at the beginning of the first and at the end of
+        # the second phrase
+        if startstripped[pos - l] == (endstripped[pos] if l == 1 else tokens[pos]) and \
+                tokens[pos - l + 1:pos - 1] == tokens[pos + 1:pos + l - 1] and \
+                (l == 1 or tokens[pos - 1] == endstripped[pos + l - 1]):
             return l
 
     return 0
 
 
-def dupecheckmessage(context, quote, duplicate, contextid, basefile):
+def dupecheckmessage(line, quote, duplicate, contextid, basefile):
     """Creates messages about duplicate words
 
-    :param context:
+    :param line: line number
     :param quote:
     :param duplicate:
     :param contextid: ID of the context
@@ -847,7 +1545,7 @@ def dupecheckmessage(context, quote, duplicate, contextid, basefile):
                 <quote>%s</quote>
             </message>
             <suggestion>Remove one instance of <quote>%s</quote>.</suggestion>
-        </result>""" % (filename, withinid, str(linenumber(context)), duplicate, quote, duplicate))
+        </result>""" % (filename, withinid, str(line), duplicate, quote, duplicate))
 
 
 def dupecheck(context, content, contentpretty, contextid, basefile):
@@ -861,56 +1559,78 @@ def dupecheck(context, content, contentpretty, contextid, basefile):
     :param basefile:
     :return:
      """
+    return paragraphdupecheck(
+        makeparagraph(context, content, contentpretty, contextid, basefile))
+
+
+def extracteddupecheck(context):
+    """Same as dupecheck() but uses the paragraph record of the context node
+    created by extractparagraphs().
+    """
+    return paragraphdupecheck(paragraphs[context.context_node])
+
+
+def paragraphdupecheck(paragraph):
+    """Takes a paragraph record and checks it for duplicated words and phrases
+    of up to three words in length.
+
+    :param tuple paragraph: paragraph record, see makeparagraph()
+    :return: list of results
+    """
+
+    content, contentpretty, contextid, basefile, line = paragraph
 
     if not content:
         return []
 
-    # I get this as a list with one lxml.etree._ElementUnicodeResult, not
-    # as a list with a string.
-    content = str(content[0])
-    basefile = basefile[0] if basefile else None
-    contextid = contextid[0] if contextid else None
+    findings = lookupfindings('dupes', content, contentpretty)
+    if findings is None:
+        if profiling.profile is not None:
+            timestartmatch = time.perf_counter()
+        findings = dupefindings(content, contentpretty)
+        if profiling.profile is not None:
+            profiling.addparagraph(time.perf_counter() - timestartmatch,
+                                   len(content.split()), 'duplicates',
+                                   profiling.paragraphlocation(paragraph))
+        storefindings(findings, 'dupes', content, contentpretty)
+
+    return [dupecheckmessage(line, quote, duplicate, contextid, basefile)
+            for quote, duplicate in findings]
+
+
+def dupefindings(content, contentpretty):
+    """Finds duplicated words and phrases of up to three words in length.
+
+    :param str content: content, as formatted for text-level checks
+    :param str contentpretty: content, as formatted for display in a message
+    :return: list of highlighted content and duplicated words per duplicate
+    """
 
     # This if/else block should not be necessary (if there is content,
     # there should always also be pretty content, but that depends on the
     # XSLT used for checking). It hopefully won't hurt either.
-    contentpretty = str(contentpretty[0]) if contentpretty else content
+    contentpretty = contentpretty or content
 
-    tokens = tokenizer(content.lower())
+    analysis = analyzecontent(content)
+    words = [word.lower() for word in analysis['tokens']]
     # Get pretty indices
-    wordtuples = []
-    currentIndex = 0
-    for word in tokens:
-        wordtuples.append((currentIndex, word))
-        _, _, tagtokens = findtagreplacement(word)
-        currentIndex += tagtokens
+    indices = analysis['prettypositions']
 
-    words = [word for index, word in wordtuples]
-    indices = [index for index, word in wordtuples]
-
-    if flag_performance:
-        timestartmatch = time.time()
-
-    messages = []
+    normalized = dupetokens(words)
+    findings = []
     for wordposition, word in enumerate(words):
-        dupeLen = isDupe(words, wordposition)
+        dupeLen = dupelength(words, normalized, wordposition)
         if dupeLen == 0:
             continue  # No dupes found
 
-        prettyTokens = tokenizer(xmlescape(contentpretty))
-        quote = highlight(prettyTokens, indices[wordposition - dupeLen], indices[wordposition + dupeLen - 1])
-        duplicate = xmlescape(" ".join(prettyTokens[indices[wordposition - dupeLen]:indices[wordposition]]))
-        messages.append(dupecheckmessage(context, quote, duplicate, contextid, basefile))
+        pretty = analyzepretty(contentpretty)
+        quote = highlightpretty(pretty, indices[wordposition - dupeLen],
+                                indices[wordposition + dupeLen - 1])
+        duplicate = xmlescape(prettyslice(pretty, indices[wordposition - dupeLen],
+                                          indices[wordposition]))
+        findings.append([quote, duplicate])
 
-    if flag_performance and len(words) > 0:
-        timediffmatch = time.time() - timestartmatch
-        printcolor("""words: %s
-time for this para: %s
-average time per word: %s\n"""
-            % (str(len(words)), str(timediffmatch),
-                str(timediffmatch / len(words))), 'debug')
-
-    return messages
+    return findings
 
 
 def splitpath(context, path, wantedsegment='filename'):
@@ -983,60 +1703,564 @@ def splitvalueunit(context, value, part='value'):
 
 
 # This list is filled by initialize() with the following entries:
-# { 'name': 'typos', 'transform': <function> }
+# { 'name': 'typos', 'checkfile': '/path/typos.xslc', 'transform': <function>,
+#   'termfile': '/path/typos.xml', 'extracted': True, 'broken': False }
+# Check files are only parsed and compiled by compilecheck(), when they are
+# needed, until then 'transform' and 'termfile' are None and 'extracted' is
+# False.
 prepared_checks = []
 
-# Global parser instance. Initialized by initialize()
-parser = None
+# Names of the check modules to run and to leave out by default, set by
+# main(), see selectchecks()
+selectedmodules = None
+skippedmodules = []
 
+# Term sets of the terminology files that loadtermfiles() has already
+# loaded, by path of the terminology file: { path: ( ID, term set ) }
+loadedtermfiles = {}
 
-def checkOneFile(inputfilepath):
-    """Checks one XML file and returns the result as XML.
+
+def findtermfile(checkfile, checkxml):
+    """Finds the terminology file that a check file uses, if any.
+
+    :param str checkfile: path to the check file
+    :param checkxml: parsed check file
+    :return: path to the terminology file or None
     """
 
-    location = os.path.dirname(os.path.realpath(__file__))
-    inputfilename = os.path.basename(inputfilepath)
-    output = etree.XML("""<?xml-stylesheet type="text/css" href="%s"?>
-                            <results/>"""
-                      % os.path.join(location, 'check.css'))
+    termfile = checkxml.xpath("/xsl:stylesheet/xsl:param[@name='terminologyfile']/@select",
+                              namespaces={'xsl': 'http://www.w3.org/1999/XSL/Transform'})
+    if not termfile:
+        return None
+    return os.path.join(os.path.dirname(checkfile), termfile[0].strip("'\""))
 
-    resultstitle = etree.Element('results-title')
-    resultstitle.text = "Style Checker Results for %s" % inputfilename
-    output.append(resultstitle)
 
-    # Checking via XSLT
-    inputfile = etree.parse(inputfilepath, parser)
+def usesextraction(termfile, checkxml):
+    """Finds out whether a check file reads the paragraph records created by
+    extractparagraphs(). Terminology checks do that through library.xsl.
+
+    :param str termfile: path to the terminology file of the check file or None
+    :param checkxml: parsed check file
+    :return: bool
+    """
 
-    for check in prepared_checks:
-        if flag_module or flag_performance:
-            print("Running module {0!r}...".format(check["name"]))
+    return bool(termfile) or bool(checkxml.xpath("//@*[contains(., 'py:isextracted(')]"))
 
+
+def compilecheck(check):
+    """Parses and compiles the check file of a check module, unless that has
+    already happened.
+
+    :param dict check: entry of prepared_checks
+    :return: whether the check module can run
+    """
+
+    if check['transform'] is None and not check['broken']:
         try:
-            result = check["transform"](inputfile, moduleName=etree.XSLT.strparam(check["name"]))
+            checkxml = etree.parse(check['checkfile'], parser)
+            check['transform'] = etree.XSLT(checkxml)
+            check['termfile'] = findtermfile(check['checkfile'], checkxml)
+            check['extracted'] = usesextraction(check['termfile'], checkxml)
         except Exception as error:
-            printcolor("! Broken check file or Python function (module {0!r})".format(check["name"]), 'error')
+            # Only complain once.
+            check['broken'] = True
+            printcolor("! Syntax error in check file.\n  " + check['checkfile'], 'error')
             printcolor("  " + str(error), 'error')
-            sys.exit(1)
 
-        result = result.getroot()
+    return check['transform'] is not None
+
+
+def loadtermfiles(checks=None):
+    """Loads the term sets of check modules that use a terminology file
+    before a document is checked, such that extractedtermcheck() can run all
+    of them together from the start. Check modules still call
+    buildtermdata() themselves and then get the same term set back.
+
+    :param list checks: entries of prepared_checks (default: all)
+    :return: IDs of the term sets of the check modules
+    """
+
+    termsetids = []
+    for check in (prepared_checks if checks is None else checks):
+        if not compilecheck(check):
+            continue
+        termfile = check['termfile']
+        if not termfile:
+            continue
+
+        loaded = loadedtermfiles.get(termfile)
+        if loaded is None or termsets.get(loaded[0]) is not loaded[1]:
+            try:
+                terminology = etree.parse(termfile).getroot()
+            except (OSError, etree.XMLSyntaxError):
+                # The check module itself will complain.
+                continue
+            termdataid = buildtermdata(None, terminology.xpath('term'),
+                                       terminology.xpath('@ignoredwords'), None)
+            loaded = (termdataid, termsets[termdataid])
+            loadedtermfiles[termfile] = loaded
+        profiling.termsetnames[loaded[0]] = check['name']
+        termsetids.append(loaded[0])
+
+    return termsetids
+
+
+def selectchecks(modules=None, skipmodules=None):
+    """Returns the entries of prepared_checks for the given check modules.
+    The check modules are not compiled yet.
+
+    :param list modules: names of check modules to run or None
+        (=selectedmodules, or all if that is None as well)
+    :param list skipmodules: names of check modules not to run or None
+        (=skippedmodules)
+    :return: entries of prepared_checks, in the usual order
+    :raises ValueError: if a check module does not exist
+    """
+
+    if modules is None:
+        modules = selectedmodules
+    if skipmodules is None:
+        skipmodules = skippedmodules
+
+    names = [check['name'] for check in prepared_checks]
+    unknown = [module for module in (modules or []) + list(skipmodules)
+               if module not in names]
+    if unknown:
+        raise ValueError("Unknown check module(s): {0}".format(", ".join(unknown)))
+    return [check for check in prepared_checks
+            if (modules is None or check['name'] in modules) and
+            check['name'] not in skipmodules]
+
+
+# Global parser instance. Initialized by initialize()
+parser = None
+
+# Transform that fills paragraphs, see extractparagraphs(). Initialized by
+# initialize()
+extraction = None
+
+
+def preparedocument(inputfilepath, checks, inputfile=None):
+    """Parses a document and creates everything that all check modules share
+    for it.
+
+    :param str inputfilepath: path to the document
+    :param list checks: entries of prepared_checks that will run
+    :param inputfile: the document or a piece of it, if it is parsed already
+    :return: parsed document
+    """
+
+    if inputfile is None:
+        inputfile = etree.parse(inputfilepath, parser)
+
+    global currentdocument
+    currentdocument = os.path.abspath(inputfilepath)
+    if os.path.basename(os.path.dirname(currentdocument)).startswith(
+            REQUESTDIRPREFIX):
+        currentdocument = None
+
+    if profiling.profile is not None:
+        timestart = (time.perf_counter(), time.process_time())
+
+    try:
+        activetermsetids[:] = loadtermfiles(checks)
+        # Without a check module that reads them, the paragraph records
+        # would only cost time, see isextracted().
+        if any(check['extracted'] for check in checks):
+            extractparagraphs(inputfile)
+        else:
+            paragraphs.clear()
+            termmatches.clear()
+    except Exception as error:
+        printcolor("! Broken extraction stylesheet or Python function", 'error')
+        printcolor("  " + str(error), 'error')
+        sys.exit(1)
+
+    if profiling.profile is not None:
+        profiling.addmodule("(preparing the document)",
+                            time.perf_counter() - timestart[0],
+                            time.process_time() - timestart[1])
+
+    return inputfile
+
+
+def forgetdocument():
+    """Drops everything that preparedocument() created."""
+
+    global currentdocument
+    if cachedir and currentdocument is not None:
+        savefindings()
+    paragraphcache.clear()
+    currentdocument = None
+
+    # Do not keep the document alive.
+    paragraphs.clear()
+    termmatches.clear()
+
+
+def runcheck(check, inputfile):
+    """Runs one check module on a parsed document.
+
+    :param dict check: entry of prepared_checks
+    :param inputfile: parsed document
+    :return: <part/> element or None if the module found nothing
+    """
+
+    if not compilecheck(check):
+        return None
+
+    if profiling.profile is not None:
+        timestart = (time.perf_counter(), time.process_time())
+
+    try:
+        result = check["transform"](inputfile, moduleName=etree.XSLT.strparam(check["name"]))
+    except Exception as error:
+        printcolor("! Broken check file or Python function (module {0!r})".format(
+            check["name"]), 'error')
+        printcolor("  " + str(error), 'error')
+        sys.exit(1)
+
+    if profiling.profile is not None:
+        profiling.addmodule(check["name"], time.perf_counter() - timestart[0],
+                            time.process_time() - timestart[1])
+
+    result = result.getroot()
+
+    if result.xpath('/part/result'):
+        return result
+    return None
+
+
+def checkparts(inputfilepath, checks):
+    """Runs check modules on a document, one after the other.
+
+    :param str inputfilepath: path to the document
+    :param list checks: entries of prepared_checks to run
+    :return: generator of <part/> elements or None, in module order, each
+        as soon as its module has finished
+    """
+
+    inputfile = preparedocument(inputfilepath, checks)
+    try:
+        for check in checks:
+            if flag_module or flag_performance:
+                print("Running module {0!r}...".format(check["name"]))
+            yield runcheck(check, inputfile)
+    finally:
+        forgetdocument()
+
+
+def checkchapters(inputfilepath, checks):
+    """Runs check modules on a document piece by piece, so only one piece at
+    a time is in memory, see iterpieces().
+
+    :param str inputfilepath: path to the document
+    :param list checks: entries of prepared_checks to run
+    :return: generator of <part/> elements or None, in module order; they
+        are only complete after the last piece
+    """
+
+    parts = [None] * len(checks)
+    try:
+        for piece, repeated in iterpieces(inputfilepath):
+            # Findings for the sets, books, and parts around the piece were
+            # already there in an earlier piece, linenumber() marks them.
+            generic.repeatedelements = repeated
+            preparedocument(inputfilepath, checks, piece)
+            for index, check in enumerate(checks):
+                if flag_module or flag_performance:
+                    print("Running module {0!r}...".format(check["name"]))
+                part = runcheck(check, piece)
+                if part is None:
+                    continue
+
+                for result in part.xpath('result[location/line = $line]',
+                                         line=generic.REPEATEDLINE):
+                    part.remove(result)
+
+                if parts[index] is None:
+                    if part.xpath('result'):
+                        parts[index] = part
+                else:
+                    parts[index].extend(part.xpath('result'))
+    finally:
+        generic.repeatedelements = set()
+        forgetdocument()
+
+    for part in parts:
+        yield part
+
+
+# Number of processes to run check modules in, set by main()
+jobs = 1
+
+# Process pool used when jobs is larger than 1, see getpool()
+pool = None
+
+# Whether extractedtermcheck() runs all loaded term sets at once. Worker
+# processes that only run some of the term modules do not.
+fuseterms = True
+
+# Document that a worker process has prepared last:
+# ( ( path, modification time, size ), <parsed document> )
+workerdocument = None
+
+
+def getpool():
+    """Returns the process pool, starting it if necessary."""
+
+    global pool
+    if pool is None:
+        pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=initworker,
+            initargs=(flag_performance, flag_checkpatterns, flag_module,
+                      flag_chapters, cachedir, selectedmodules,
+                      skippedmodules))
+    return pool
+
+
+def shutdownpool():
+    """Stops the process pool, if it was started."""
+
+    global pool
+    if pool is not None:
+        pool.shutdown()
+        pool = None
+
+
+def initworker(performance, checkpatterns, module, chapters, workercachedir,
+               modules, skipmodules):
+    """Sets up a worker process of the process pool.
+
+    :param bool performance: value of flag_performance
+    :param bool checkpatterns: value of flag_checkpatterns
+    :param bool module: value of flag_module
+    :param bool chapters: value of flag_chapters
+    :param str workercachedir: value of cachedir
+    :param list modules: value of selectedmodules
+    :param list skipmodules: value of skippedmodules
+    """
+
+    global flag_performance, flag_checkpatterns, flag_module, flag_chapters
+    global cachedir, jobs, selectedmodules, skippedmodules
+    flag_performance = performance
+    flag_checkpatterns = checkpatterns
+    flag_module = module
+    flag_chapters = chapters
+    cachedir = workercachedir
+    jobs = 1
+    selectedmodules = modules
+    skippedmodules = skipmodules
+
+    initialize()
+    if performance:
+        profiling.startprofile(etree.FunctionNamespace(FUNCTIONNAMESPACE))
+
+
+def workertask(function, *args):
+    """Runs a task in a worker process.
+
+    :param function: function to run
+    :param args: arguments of the function
+    :return: tuple of the result of the function and the measurements of
+        the worker since its last task (or None if it measures nothing)
+    """
+
+    result = function(*args)
+    if profiling.profile is None:
+        return (result, None)
+    return (result, profiling.takeprofile())
+
+
+def fromworker(response):
+    """Adds the measurements that a worker process sent along with the
+    result of a task to our own ones.
+
+    :param tuple response: return value of workertask()
+    :return: result of the task
+    """
+
+    result, measurements = response
+    profiling.mergeprofile(measurements)
+    return result
+
+
+def workercheck(inputfilepath, checkname):
+    """Runs one check module in a worker process. The document is only
+    parsed and prepared once per worker, for the first check module that the
+    worker runs on it.
+
+    :param str inputfilepath: path to the document
+    :param str checkname: name of the check module
+    :return: tuple of the part as serialized XML (or None if the module found
+        nothing) and None, or of None and the arguments of an
+        etree.XMLSyntaxError if the document could not be parsed
+    """
+
+    global workerdocument
 
-        if result.xpath('/part/result'):
-            output.append(result)
+    # The term modules are spread over all workers.
+    global fuseterms
+    fuseterms = False
 
-    if not output.xpath('/results/part'):
-        output.append(etree.XML(
-             """<result type="info">
+    filestat = os.stat(inputfilepath)
+    documentkey = (inputfilepath, filestat.st_mtime_ns, filestat.st_size)
+    if workerdocument is None or workerdocument[0] != documentkey:
+        workerdocument = None
+        forgetdocument()
+        try:
+            workerdocument = (documentkey,
+                              preparedocument(inputfilepath,
+                                              selectchecks([checkname], [])))
+        except etree.XMLSyntaxError as error:
+            # lxml's exceptions cannot be sent back to the main process.
+            return (None, (error.msg, error.code, error.lineno,
+                           error.offset, error.filename))
+
+    check = selectchecks([checkname], [])[0]
+    part = runcheck(check, workerdocument[1])
+    # The worker may not get another task for this document.
+    if cachedir:
+        savefindings()
+    if part is None:
+        return (None, None)
+    return (etree.tostring(part), None)
+
+
+def checkpartsinpool(inputfilepath, checks):
+    """Runs check modules on a document in the process pool.
+
+    :param str inputfilepath: path to the document
+    :param list checks: entries of prepared_checks to run
+    :return: generator of <part/> elements or None, in module order, each
+        as soon as its module has finished
+    """
+
+    inputfilepath = os.path.abspath(inputfilepath)
+    futures = [getpool().submit(workertask, workercheck, inputfilepath,
+                                check["name"])
+               for check in checks]
+
+    try:
+        for check, future in zip(checks, futures):
+            if flag_module or flag_performance:
+                print("Running module {0!r}...".format(check["name"]))
+            part, error = fromworker(future.result())
+            if error:
+                raise etree.XMLSyntaxError(*error)
+            yield etree.fromstring(part) if part else None
+    finally:
+        # Nobody is waiting for the rest anymore.
+        for future in futures:
+            future.cancel()
+
+
+def indentresult(element, level=1):
+    """Adds the same whitespace to an element of the result that
+    pretty-printing the whole result would add, so the element can be
+    written on its own.
+
+    :param element: element of the result
+    :param int level: depth of the element within the result
+    """
+
+    children = list(element)
+    # Like libxml2, leave alone anything that contains text.
+    if not children or element.text is not None or \
+            any(child.tail is not None for child in children):
+        return
+
+    element.text = "\n" + "  " * (level + 1)
+    for child in children:
+        child.tail = "\n" + "  " * (level + 1)
+        indentresult(child, level + 1)
+    children[-1].tail = "\n" + "  " * level
+
+
+def writereport(inputfilepath, outputfile, modules=None, skipmodules=None):
+    """Checks one XML file and writes the result as XML. Each part of the
+    result is written as soon as its check module has finished, so the
+    whole result never has to be kept in memory.
+
+    :param str inputfilepath: path to the XML file
+    :param outputfile: path or file object (opened in binary mode) to write
+        the result to
+    :param list modules: names of the check modules to run or None (=all,
+        unless main() was told otherwise)
+    :param list skipmodules: names of the check modules not to run
+    :raises ValueError: if a check module does not exist
+    """
+
+    checks = selectchecks(modules, skipmodules)
+
+    location = os.path.dirname(os.path.realpath(__file__))
+    inputfilename = os.path.basename(inputfilepath)
+
+    # Checking via XSLT
+    if flag_chapters:
+        parts = checkchapters(inputfilepath, checks)
+    elif jobs > 1 and len(checks) > 1:
+        parts = checkpartsinpool(inputfilepath, checks)
+    else:
+        parts = checkparts(inputfilepath, checks)
+
+    # Syntax errors in the document show up with the first part, make sure
+    # they do before anything is written.
+    parts = itertools.chain([next(parts, None)], parts)
+
+    with contextlib.ExitStack() as stack:
+        if isinstance(outputfile, str):
+            outputfile = stack.enter_context(open(outputfile, 'wb'))
+
+        with etree.xmlfile(outputfile, encoding='utf-8') as xf:
+            xf.write(etree.ProcessingInstruction(
+                'xml-stylesheet', 'type="text/css" href="%s"'
+                % os.path.join(location, 'check.css')), pretty_print=True)
+            with xf.element('results'):
+                resultstitle = etree.Element('results-title')
+                resultstitle.text = "Style Checker Results for %s" % inputfilename
+                xf.write("\n  ", resultstitle)
+
+                foundparts = False
+                for part in parts:
+                    if part is not None:
+                        foundparts = True
+                        indentresult(part)
+                        xf.write("\n  ", part, with_tail=False)
+                        xf.flush()
+
+                if not foundparts:
+                    xf.write("\n  ", etree.XML(
+                         """<result type="info">
                     <message>No problems detected.</message>
                     <suggestion>Celebrate!</suggestion>
                 </result>"""))
+                xf.write("\n")
+
+        outputfile.write(b"\n")
 
-    return etree.tostring(output.getroottree(),
-                          encoding='unicode',
-                          pretty_print=True)
+
+def checkOneFile(inputfilepath, modules=None, skipmodules=None):
+    """Checks one XML file and returns the result as XML.
+
+    :param str inputfilepath: path to the XML file
+    :param list modules: names of the check modules to run or None (=all,
+        unless main() was told otherwise)
+    :param list skipmodules: names of the check modules not to run
+    :raises ValueError: if a check module does not exist
+    """
+
+    output = io.BytesIO()
+    writereport(inputfilepath, output, modules, skipmodules)
+    return output.getvalue().decode('utf-8')
 
 # Flag to avoid multiple initialization
 sdsc_initialized = False
 
+# Namespace of the Python extension functions (prefix py:)
+FUNCTIONNAMESPACE = 'https://www.github.com/openSUSE/suse-doc-style-checker'
+
 
 def initialize():
     """ Initializes global values such as prepared_checks and parser
@@ -1048,17 +2272,22 @@ def initialize():
         return True
 
     # Prepare parser (add py: namespace)
-    ns = etree.FunctionNamespace('https://www.github.com/openSUSE/suse-doc-style-checker')
+    ns = etree.FunctionNamespace(FUNCTIONNAMESPACE)
     ns.prefix = 'py'
     ns.update(dict(
         buildtermdata=buildtermdata,
         counttokens=counttokens,
         dupecheck=dupecheck,
+        extracteddupecheck=extracteddupecheck,
+        extractedsentencelengthcheck=extractedsentencelengthcheck,
+        extractedtermcheck=extractedtermcheck,
+        isextracted=isextracted,
         linenumber=linenumber,
         sentencelengthcheck=sentencelengthcheck,
         sentencesegmenter=sentencesegmenter,
         splitpath=splitpath,
         splitvalueunit=splitvalueunit,
+        storeparagraph=storeparagraph,
         termcheck=termcheck,
         tokenizer=tokenizer,
     ))
@@ -1078,31 +2307,455 @@ def initialize():
         printcolor("! No check files found.\n  Add check files to " + os.path.join(location, 'xsl-checks'), 'error')
         return False
 
+    global extraction
+    extractfile = os.path.join(location, 'xsl-checks', 'extract.xsl')
+    try:
+        extraction = etree.XSLT(etree.parse(extractfile, parser))
+    except Exception as error:
+        # Not fatal: all checks can create paragraph content themselves.
+        extraction = None
+        printcolor("! Syntax error in extraction stylesheet.\n  " + extractfile, 'error')
+        printcolor("  " + str(error), 'error')
+
+    # Check files are compiled when they are used, see compilecheck().
     for checkfile in checkfiles:
-        try:
-            checkmodule = os.path.splitext(os.path.basename(checkfile))[0]
-            transform = etree.XSLT(etree.parse(checkfile, parser))
-            prepared_checks.append({'name': checkmodule, 'transform': transform})
-        except Exception as error:
-            printcolor("! Syntax error in check file.\n  " + checkfile, 'error')
-            printcolor("  " + str(error), 'error')
+        checkmodule = os.path.splitext(os.path.basename(checkfile))[0]
+        prepared_checks.append({'name': checkmodule, 'checkfile': checkfile,
+                                'transform': None, 'termfile': None,
+                                'extracted': False, 'broken': False})
 
     sdsc_initialized = True
     return True
 
 
-def main(cliargs=None):
-    """Entry point for the application script
+def findresultfile(inputfilepath, outputfile=None):
+    """Returns the path of the result file for an input file.
 
-    :param list cliargs: Arguments to parse or None (=use sys.argv)
+    :param str inputfilepath: path to the input file
+    :param str outputfile: path given by the user or None (=create
+        <name>-stylecheck.xml next to the input file)
     """
 
-    if not initialize():
-        return 1
+    if outputfile:
+        resultfilename = outputfile
+        resultpath = os.path.dirname(os.path.realpath(outputfile))
+    else:
+        resultfilename = re.sub(r'(_bigfile)?\.xml', r'', os.path.basename(inputfilepath))
+        resultfilename = '%s-stylecheck.xml' % resultfilename
+        resultpath = os.path.dirname(os.path.realpath(inputfilepath))
+
+    return os.path.join(resultpath, resultfilename)
+
+
+def findbatchfiles(patterns, filesfrom=None):
+    """Expands the files and glob patterns given for batch mode.
+
+    :param list patterns: files or glob patterns
+    :param str filesfrom: file with one file or glob pattern per line (or -
+        for standard input) or None
+    :return: list of files, in the order given, without duplicates
+    """
+
+    patterns = list(patterns)
+    if filesfrom:
+        if filesfrom == '-':
+            lines = sys.stdin.readlines()
+        else:
+            with open(filesfrom) as filesfromfh:
+                lines = filesfromfh.readlines()
+        patterns += [line.strip() for line in lines
+                     if line.strip() and not line.startswith('#')]
+
+    inputfilepaths = []
+    for pattern in patterns:
+        # Do not check results of earlier runs again.
+        matches = [match for match in sorted(glob.glob(pattern, recursive=True))
+                   if match == pattern or not match.endswith('-stylecheck.xml')]
+        # Files that do not exist are kept, so they are reported as errors.
+        for inputfilepath in matches or [pattern]:
+            if inputfilepath not in inputfilepaths:
+                inputfilepaths.append(inputfilepath)
+
+    return inputfilepaths
+
+
+def batchcheck(inputfilepath):
+    """Checks one file of a batch and writes its result file.
+
+    :param str inputfilepath: path to the input file
+    :return: tuple of input file, result file, time taken in seconds, error
+        message (or None)
+    """
 
     timestart = time.time()
+    resultfile = findresultfile(inputfilepath)
+    error = None
+    try:
+        writereport(inputfilepath, resultfile)
+    except etree.Error as exc:
+        error = "Syntax error in input: {0}!".format(exc.msg)
+    except OSError as exc:
+        error = str(exc)
 
-    location = os.path.dirname(os.path.realpath(__file__))
+    return (inputfilepath, resultfile, time.time() - timestart, error)
+
+
+def workerbatchcheck(inputfilepath):
+    """Checks one file of a batch in a worker process, see batchcheck()."""
+
+    # A worker checks the whole file, so it runs all term modules itself.
+    global fuseterms
+    fuseterms = True
+    return batchcheck(inputfilepath)
+
+
+def checkbatch(inputfilepaths):
+    """Checks several files, writes a result file for each of them, and
+    shows a summary of timings.
+
+    :param list inputfilepaths: paths to the input files
+    :return: exit code
+    """
+
+    timestart = time.time()
+
+    if not inputfilepaths:
+        printcolor("No input files found.", 'error')
+        return 1
+
+    if jobs > 1:
+        futures = [getpool().submit(workertask, workerbatchcheck, inputfilepath)
+                   for inputfilepath in inputfilepaths]
+        results = (fromworker(future.result()) for future in futures)
+    else:
+        results = (batchcheck(inputfilepath) for inputfilepath in inputfilepaths)
+
+    timings = []
+    failed = 0
+    for inputfilepath, resultfile, timetaken, error in results:
+        if error:
+            failed += 1
+            printcolor("{0}: {1}".format(inputfilepath, error), 'error')
+        else:
+            printcolor(resultfile)
+        timings.append((inputfilepath, timetaken, error))
+
+    printcolor("Timings:", 'debug')
+    for inputfilepath, timetaken, error in timings:
+        printcolor("{0:10.2f}s  {1}{2}".format(timetaken, inputfilepath,
+                                               " (failed)" if error else ""),
+                   'debug')
+    printcolor("Checked {0} files ({1} failed) in {2:.2f}s".format(
+        len(timings), failed, time.time() - timestart), 'debug')
+
+    return 1 if failed else 0
+
+
+def runserver(socketpath):
+    """Checks files for sdsc --client until interrupted.
+
+    :param str socketpath: path to the socket to listen on
+    :return: exit code
+    """
+
+    # Have the check modules (loadtermfiles() compiles them) and their term
+    # sets ready before the first request.
+    loadtermfiles(selectchecks())
+
+    try:
+        serve(socketpath, handlerequest,
+              ready=lambda: printcolor("Listening on {0}".format(socketpath)))
+    except OSError as error:
+        printcolor("! Cannot listen on {0}: {1}".format(socketpath, error), 'error')
+        return 1
+    finally:
+        shutdownpool()
+    return 0
+
+
+# Fields of requests to sdsc --serve and what they have to be, see
+# handlerequest()
+REQUESTFIELDS = {
+    'ping': (bool, "true or false"),
+    'args': (list, "a list of strings"),
+    'cwd': (str, "a string"),
+    'path': (str, "a string"),
+    'xml': (str, "a string"),
+    'name': (str, "a string"),
+    'modules': (list, "a list of strings"),
+    'skipmodules': (list, "a list of strings"),
+}
+
+
+def requesterror(request):
+    """Returns what is wrong with the shape of a request to sdsc --serve, or
+    None if nothing is. Fields that are null count as missing.
+
+    :param request: request, as decoded from JSON
+    """
+
+    if not isinstance(request, dict):
+        return "A request must be a JSON object."
+    for field, (fieldtype, description) in REQUESTFIELDS.items():
+        value = request.get(field)
+        if value is None:
+            continue
+        if not isinstance(value, fieldtype) or (
+                fieldtype is list and
+                not all(isinstance(item, str) for item in value)):
+            return "{0!r} must be {1}.".format(field, description)
+    return None
+
+
+def handlerequest(request):
+    """Answers a request in sdsc --serve. A request is a dict with one of:
+
+    * 'args': command line arguments for main() and 'cwd': the directory to
+      run in (sent by sdsc --client)
+    * 'path': path to a file to check (relative to 'cwd', if given)
+    * 'xml': content of a file to check and 'name': its file name
+
+    and, for 'path' and 'xml', optionally 'modules' and 'skipmodules': the
+    names of the check modules to run and not to run.
+
+    The response is a dict with 'status': exit code, 'stdout' and 'stderr':
+    messages, and, for 'path' and 'xml', 'result': the result as XML.
+
+    :param dict request: request
+    :return: response
+    """
+
+    error = requesterror(request)
+    if error is not None:
+        return {'status': 1, 'stdout': '',
+                'stderr': "! Invalid request: {0}\n".format(error)}
+
+    if request.get('ping'):
+        return {'status': 0}
+
+    response = {'status': 1}
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            if 'args' in request:
+                response['status'] = clientmain(request['args'],
+                                                request.get('cwd'))
+            elif 'path' in request:
+                path = os.path.join(request.get('cwd') or '', request['path'])
+                response['result'] = checkOneFile(path, request.get('modules'),
+                                                  request.get('skipmodules'))
+                response['status'] = 0
+            elif 'xml' in request:
+                with tempfile.TemporaryDirectory(
+                        prefix=REQUESTDIRPREFIX) as tempdir:
+                    path = os.path.join(tempdir, os.path.basename(
+                        request.get('name') or 'input.xml'))
+                    with open(path, 'w', encoding='utf-8') as inputfh:
+                        inputfh.write(request['xml'])
+                    response['result'] = checkOneFile(
+                        path, request.get('modules'), request.get('skipmodules'))
+                response['status'] = 0
+            else:
+                printcolor("! Invalid request.", 'error')
+        except SystemExit as exc:
+            response['status'] = exc.code if isinstance(exc.code, int) else 1
+        except etree.Error as error:
+            printcolor("Syntax error in input: {0}!".format(error.msg), 'error')
+        except (OSError, ValueError) as error:
+            printcolor("! " + str(error), 'error')
+
+    response['stdout'] = stdout.getvalue()
+    response['stderr'] = stderr.getvalue()
+    return response
+
+
+def clientmain(cliargs, cwd=None):
+    """Runs main() for sdsc --client within sdsc --serve, without changing
+    the settings of the server.
+
+    :param list cliargs: command line arguments of the client
+    :param str cwd: working directory of the client
+    :return: exit code
+    """
+
+    if '--serve' in cliargs or '--client' in cliargs:
+        printcolor("! --serve and --client cannot be forwarded.", 'error')
+        return 1
+
+    settings = (flag_checkpatterns, flag_performance, flag_module,
+                flag_chapters, cachedir, jobs, selectedmodules, skippedmodules)
+    previouscwd = os.getcwd()
+    try:
+        if cwd:
+            os.chdir(cwd)
+        return main(cliargs)
+    finally:
+        os.chdir(previouscwd)
+        restoresettings(*settings)
+
+
+def restoresettings(checkpatterns, performance, module, chapters,
+                    previouscachedir, previousjobs, modules, skipmodules):
+    """Sets the global settings that main() changes."""
+
+    global flag_checkpatterns, flag_performance, flag_module, flag_chapters
+    global cachedir, jobs, selectedmodules, skippedmodules
+    flag_checkpatterns = checkpatterns
+    flag_performance = performance
+    flag_module = module
+    flag_chapters = chapters
+    cachedir = previouscachedir
+    jobs = previousjobs
+    selectedmodules = modules
+    skippedmodules = skipmodules
+
+
+def runclient(cliargs, socketpath):
+    """Forwards command line arguments to sdsc --serve and shows its
+    response.
+
+    :param list cliargs: command line arguments, including --client
+    :param str socketpath: path to the socket of the server
+    :return: exit code
+    """
+
+    forwardedargs = []
+    skipnext = False
+    for arg in cliargs:
+        if skipnext:
+            skipnext = False
+        elif arg == '--socket':
+            skipnext = True
+        elif arg != '--client' and not arg.startswith('--socket='):
+            forwardedargs.append(arg)
+
+    try:
+        response = sendrequest(socketpath, {'args': forwardedargs,
+                                            'cwd': os.getcwd()})
+    except OSError as error:
+        printcolor("! Cannot connect to sdsc --serve on {0}: {1}".format(
+            socketpath, error), 'error')
+        return 1
+
+    sys.stdout.write(response.get('stdout', ''))
+    sys.stderr.write(response.get('stderr', ''))
+    return response.get('status', 1)
+
+
+def linttermfiles(termfiles, samplefiles=None, budget=0.01):
+    """Checks the regular expression patterns of term files for
+    constructs and timings that can make them slow, see patternlint.
+
+    :param list termfiles: paths to term files
+    :param list samplefiles: paths to documents (XML or plain text) whose
+        words the patterns are timed on as well
+    :param float budget: maximum time per call of a pattern in seconds
+    :return: exit code, 1 if there are slow patterns
+    """
+
+    texts = []
+    for samplefile in samplefiles or []:
+        try:
+            texts.append(etree.parse(samplefile, parser).xpath('string()'))
+        except etree.XMLSyntaxError:
+            with open(samplefile, encoding='utf-8') as samplefh:
+                texts.append(samplefh.read())
+    tokens = sampletokens(texts)
+
+    patterns = 0
+    problems = 0
+    for termfile in termfiles:
+        try:
+            terms = etree.parse(termfile).getroot().xpath('term')
+        except (OSError, etree.XMLSyntaxError) as error:
+            printcolor("! {0}: {1}".format(termfile, error), 'error')
+            problems += 1
+            continue
+
+        for termposition, term in enumerate(terms, start=1):
+            proposal = prepareaccept(term)[0]
+            for patterngroupposition, patterngroup in \
+                    enumerate(term.xpath('patterngroup'), start=1):
+                for element in patterngroup.xpath('pattern|contextpattern'):
+                    if not element.text:
+                        continue
+                    context = element.tag == 'contextpattern'
+                    pattern = manglepattern(element.text,
+                                            'context' if context else 'default')
+                    flags = 0 if element.get('case') == 'keep' else re.I
+                    patterns += 1
+                    for problem in lintpattern(pattern, flags, context,
+                                               tokens, budget):
+                        problems += 1
+                        printcolor(
+                            "{0}: term {1} ({2}), patterngroup {3}, {4} {5!r}:\n"
+                            "  {6}".format(
+                                os.path.basename(termfile), termposition,
+                                proposal or 'no proposal', patterngroupposition,
+                                element.tag, element.text, problem),
+                            'error')
+
+    printcolor("Checked {0} patterns in {1} term files, found {2} problems.".format(
+        patterns, len(termfiles), problems), 'error' if problems else None)
+    return 1 if problems else 0
+
+
+def compileterms(termfiles, outputfile):
+    """Generates a Python module with match functions for the term sets of
+    term files, see termcompiler.
+
+    :param list termfiles: paths to term files
+    :param str outputfile: path of the module to write
+    :return: exit code
+    """
+
+    compiled = []
+    for termfile in termfiles:
+        try:
+            terminology = etree.parse(termfile).getroot()
+        except (OSError, etree.XMLSyntaxError) as error:
+            printcolor("! {0}: {1}".format(termfile, error), 'error')
+            return 1
+        terms = terminology.xpath('term')
+        ignoredwords = terminology.xpath('@ignoredwords')
+        compiled.append((os.path.basename(termfile),
+                         termdatakey(terms, ignoredwords),
+                         preparetermdata(terms, ignoredwords)))
+
+    with open(outputfile, 'w', encoding='utf-8') as outputfh:
+        outputfh.write(generatemodule(compiled, __version__))
+
+    printcolor("Compiled {0} term files into {1}.".format(
+        len(compiled), outputfile))
+    return 0
+
+
+def writeperformancereport(total):
+    """Stops measuring and writes the report of --performance to the file
+    given with --performance-report or to stderr.
+
+    :param float total: total time of the run in seconds
+    """
+
+    measurements = profiling.stopprofile(
+        etree.FunctionNamespace(FUNCTIONNAMESPACE))
+    if measurements is None:
+        return
+    if args.performancereport:
+        with open(args.performancereport, 'w') as reportfh:
+            profiling.writeprofile(measurements, reportfh,
+                                   args.performanceformat, total)
+    else:
+        profiling.writeprofile(measurements, sys.stderr,
+                               args.performanceformat, total)
+
+
+def main(cliargs=None):
+    """Entry point for the application script
+
+    :param list cliargs: Arguments to parse or None (=use sys.argv)
+    """
 
     global args
     try:
@@ -1110,12 +2763,55 @@ def main(cliargs=None):
     except SystemExit as exc:
         return exc.code
 
+    # The client does not need any checks of its own.
+    if args.client:
+        return runclient(sys.argv[1:] if cliargs is None else cliargs,
+                         args.socket or defaultsocketpath())
+
+    if not initialize():
+        return 1
+
+    timestart = time.time()
+
+    location = os.path.dirname(os.path.realpath(__file__))
+
     global flag_checkpatterns
     global flag_performance
     global flag_module
+    global flag_chapters
     flag_checkpatterns = args.checkpatterns
     flag_performance = args.performance
     flag_module = args.module
+    flag_chapters = args.chapters
+
+    global cachedir
+    cachedir = None if args.nocache else (args.cachedir or defaultcachedir())
+
+    global jobs
+    jobs = max(1, args.jobs)
+
+    global selectedmodules, skippedmodules
+    selectedmodules = args.checks
+    skippedmodules = args.skipchecks or []
+    try:
+        selectchecks()
+    except ValueError as error:
+        printcolor("! " + str(error), 'error')
+        return 1
+
+    if args.serve:
+        return runserver(args.socket or defaultsocketpath())
+
+    if args.lintpatterns is not None:
+        termfiles = args.lintpatterns or \
+            [check['termfile'] for check in selectchecks()
+             if compilecheck(check) and check['termfile']]
+        return linttermfiles(termfiles, args.lintsamples, args.lintbudget / 1000)
+
+    if args.compileterms is not None:
+        return compileterms([check['termfile'] for check in selectchecks()
+                             if compilecheck(check) and check['termfile']],
+                            args.compileterms or COMPILEDTERMSFILE)
 
     if args.bookmarklet:
         webbrowser.open(
@@ -1123,32 +2819,36 @@ def main(cliargs=None):
             new=0, autoraise=True)
         return 0
 
-    if args.outputfile:
-        resultfilename = args.outputfile
-        resultpath = os.path.dirname(os.path.realpath(args.outputfile))
-    else:
-        resultfilename = re.sub(r'(_bigfile)?\.xml', r'', os.path.basename(args.inputfile.name))
-        resultfilename = '%s-stylecheck.xml' % resultfilename
-        resultpath = os.path.dirname(os.path.realpath(args.inputfile.name))
-
-    resultfile = os.path.join(resultpath, resultfilename)
-    with open(resultfile, 'w') as resultfh:
+    if flag_performance:
+        profiling.startprofile(etree.FunctionNamespace(FUNCTIONNAMESPACE))
+    try:
+        if args.batch is not None or args.filesfrom:
+            try:
+                return checkbatch(findbatchfiles(args.batch or [], args.filesfrom))
+            except KeyboardInterrupt:
+                printcolor("Operation cancelled!", 'error')
+                return 1
+            finally:
+                shutdownpool()
+
+        resultfile = findresultfile(args.inputfile.name, args.outputfile)
         try:
-            result = checkOneFile(args.inputfile.name)
+            writereport(args.inputfile.name, resultfile)
         except KeyboardInterrupt:
             printcolor("Operation cancelled!", 'error')
             return 1
         except etree.Error as error:
             printcolor("Syntax error in input: {0}!".format(error.msg), 'error')
             return 1
-
-        resultfh.write(str(result))
+        finally:
+            shutdownpool()
+    finally:
+        if flag_performance:
+            writeperformancereport(time.time() - timestart)
 
     if args.show:
         webbrowser.open(resultfile, new=0, autoraise=True)
 
     printcolor(resultfile)
-    if flag_performance:
-        printcolor("Total: " + str(time.time() - timestart), 'debug')
 
     return 0
@@ -0,0 +1,182 @@
+#
+# Copyright (c) 2017 SUSE Linux GmbH
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+
+"""SDSC Module that splits the content of paragraphs into sentences and
+tokens once and remembers the result.
+
+The term modules, the sentence length check, and the duplicate check all look
+at the same paragraphs. analyzecontent() keeps the analysis of the most
+recently used contents, so each content is only split and searched for tag
+replacements once per run.
+"""
+
+from collections import OrderedDict
+
+from .termindex import foldcase
+from .textutil import (findtagreplacements,
+                       removepunctuation,
+                       sentencesegmenter,
+                       tokenizer,
+                       xmlescape,
+                       )
+
+# Maximum number of analyzed contents (and, separately, of analyzed pretty
+# contents) to keep
+ANALYSISCACHESIZE = 4096
+
+# Analyses by content, least recently used first, see analyzecontent()
+analysiscache = OrderedDict()
+
+# Analyses by pretty content, least recently used first, see analyzepretty().
+# They are only needed for messages, so they get their own cache and do not
+# push the analyses of contents out of analysiscache.
+prettycache = OrderedDict()
+
+# How often an analysis was found in analysiscache or prettycache or not
+analysisstats = {'hits': 0, 'misses': 0}
+
+
+def analyzecontent(content):
+    """Returns the analysis of the content of a paragraph. The result is
+    shared between all callers and must not be changed.
+
+    :param str content: content, as formatted for text-level checks
+    :return: dict with
+        'tokens': tokens of the whole content,
+        'tagtokens': number of tokens of the pretty content each token stands
+            for (more than 1 for tag replacements like ##@key-2##),
+        'prettypositions': position of the first pretty token of each token,
+        'folded': content after foldcase(),
+        'sentences': list of sentences, each of them a tuple of the tokens,
+            the position of each token within the pretty content of the
+            paragraph, the tokens without leading punctuation, those again
+            after foldcase(), and the number of pretty tokens per token
+    """
+    return cachedanalysis(analysiscache, makeanalysis, content)
+
+
+def analyzepretty(contentpretty):
+    """Returns the analysis of the pretty content of a paragraph, which
+    messages quote. The result is shared between all callers and must not be
+    changed.
+
+    :param str contentpretty: content, as formatted for display in a message
+    :return: dict with
+        'text': the escaped tokens, joined by single spaces,
+        'starts', 'ends': offsets of the beginning and the end of each token
+            in 'text'
+    """
+    return cachedanalysis(prettycache, makeprettyanalysis, contentpretty)
+
+
+def cachedanalysis(cache, make, text):
+    """Returns the analysis of a text from a cache, or makes it and adds it
+    to the cache.
+
+    :param OrderedDict cache: analysiscache or prettycache
+    :param make: function that analyzes text
+    :param str text: text to analyze
+    """
+    analysis = cache.get(text)
+    if analysis is not None:
+        analysisstats['hits'] += 1
+        cache.move_to_end(text)
+        return analysis
+
+    analysisstats['misses'] += 1
+    analysis = make(text)
+    cache[text] = analysis
+    if len(cache) > ANALYSISCACHESIZE:
+        cache.popitem(last=False)
+    return analysis
+
+
+def makeanalysis(content):
+    """Analyzes the content of a paragraph, see analyzecontent()."""
+
+    tokens = tokenizer(content)
+    sentences = []
+
+    # HACK: the counter goes up for the first word already, i.e. token[0],
+    # thus we just start at -1, so the first word gets to be 0.
+    currenttokeninparagraph = -1
+
+    # This should get us far enough for now
+    for sentence in sentencesegmenter(content):
+        # FIXME: Get something better than s.split. Some
+        # existing tokenisers are overzealous, such as the default one from
+        # NLTK.
+        words = tokenizer(sentence)
+
+        # If we hit a placeholder, e.g. ##@key-1##, the number
+        # (here: 1) signifies the number of tokens this placeholder
+        # replaces. If no placeholder found, it is 1.
+        tagtokens = [replacement[2]
+                     for replacement in findtagreplacements(words)]
+        positions = []
+        for count in tagtokens:
+            currenttokeninparagraph += count
+            positions.append(currenttokeninparagraph)
+
+        strippedwords = [removepunctuation(word, start=True) for word in words]
+        sentences.append((words, positions, strippedwords,
+                          [foldcase(word) for word in strippedwords],
+                          tagtokens))
+
+    tagtokens = [replacement[2] for replacement in findtagreplacements(tokens)]
+    prettypositions = []
+    position = 0
+    for count in tagtokens:
+        prettypositions.append(position)
+        position += count
+
+    return {'tokens': tokens,
+            'tagtokens': tagtokens,
+            'prettypositions': prettypositions,
+            'folded': foldcase(content),
+            'sentences': sentences}
+
+
+def makeprettyanalysis(contentpretty):
+    """Analyzes the pretty content of a paragraph, see analyzepretty()."""
+
+    tokens = tokenizer(xmlescape(contentpretty))
+    starts = []
+    ends = []
+    offset = 0
+    for token in tokens:
+        starts.append(offset)
+        offset += len(token)
+        ends.append(offset)
+        offset += 1
+
+    return {'text': " ".join(tokens), 'starts': starts, 'ends': ends}
+
+
+def analysiscacheinfo():
+    """Returns the hits, misses, and the current and maximum size of the
+    cache of analyzecontent() as a dict. Hits and misses include
+    analyzepretty()."""
+    return dict(analysisstats, size=len(analysiscache),
+                maxsize=ANALYSISCACHESIZE)
+
+
+def clearanalysiscache():
+    """Forgets all analyses. The counters keep counting."""
+    analysiscache.clear()
+    prettycache.clear()
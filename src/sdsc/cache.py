@@ -0,0 +1,205 @@
+#
+# Copyright (c) 2017 SUSE Linux GmbH
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+
+"""SDSC Module that handles the on-disk cache
+"""
+
+import hashlib
+import json
+import os
+import os.path
+import re
+import sys
+import tempfile
+
+from . import __version__
+
+# Directory of the sdsc package, see sourcedigest()
+PACKAGEDIR = os.path.dirname(os.path.realpath(__file__))
+
+# Files within PACKAGEDIR that are not part of sdsc itself: the module
+# generated by sdsc --compile-terms
+GENERATEDFILES = ('compiledterms.py',)
+
+# Result of sourcedigest(), once it was calculated
+sourcedigestvalue = None
+
+
+def defaultcachedir():
+    """Returns the cache directory to use if none was given on the command
+    line: $SDSC_CACHE_DIR, or sdsc/ within $XDG_CACHE_HOME or ~/.cache
+    """
+    if os.environ.get('SDSC_CACHE_DIR'):
+        return os.environ['SDSC_CACHE_DIR']
+    cachehome = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cachehome, 'sdsc')
+
+
+def cachekey(*parts):
+    """Creates a cache key from the given parts. The version of sdsc and of
+    Python's re module are always part of the key, as cached data may depend
+    on both.
+
+    :param parts: strings or bytes that identify the cached data
+    """
+    digest = hashlib.sha256()
+    for part in (__version__, getattr(re, '__version__', ''),
+                 '%s.%s' % sys.version_info[:2]) + parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(part)
+        # Separator, so ('ab', 'c') and ('a', 'bc') do not end up the same
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def sourcedigest():
+    """Returns a hash of the Python modules and check files of sdsc. Cached
+    data that depends on what the code does (not only on its input) needs
+    this in its key, as __version__ does not change with every change of the
+    code.
+    """
+    global sourcedigestvalue
+    if sourcedigestvalue is None:
+        digest = hashlib.sha256()
+        paths = [os.path.join(PACKAGEDIR, name) for name in os.listdir(PACKAGEDIR)
+                 if name.endswith('.py') and name not in GENERATEDFILES]
+        checkdir = os.path.join(PACKAGEDIR, 'xsl-checks')
+        paths += [os.path.join(checkdir, name) for name in os.listdir(checkdir)]
+        for path in sorted(paths):
+            digest.update(os.path.relpath(path, PACKAGEDIR).encode('utf-8'))
+            digest.update(b'\0')
+            with open(path, 'rb') as sourcefh:
+                digest.update(sourcefh.read())
+            digest.update(b'\0')
+        sourcedigestvalue = digest.hexdigest()
+    return sourcedigestvalue
+
+
+def contentkey(*parts):
+    """Creates a short key for content within a cache file. Unlike cachekey(),
+    this does not include any versions, the key of the cache file itself
+    takes care of that.
+
+    :param parts: values that identify the content, converted with str()
+    """
+    return hashlib.blake2b('\0'.join(map(str, parts)).encode('utf-8'),
+                           digest_size=16).hexdigest()
+
+
+def cachefile(cachedir, kind, key):
+    """Returns the path of a cache file
+
+    :param str cachedir: cache directory
+    :param str kind: kind of cached data, used as subdirectory
+    :param str key: key created with cachekey()
+    """
+    return os.path.join(cachedir, kind, key + '.json')
+
+
+def readcache(cachedir, kind, key):
+    """Reads data from the cache. Returns None if there is no (usable) data.
+
+    :param str cachedir: cache directory
+    :param str kind: kind of cached data
+    :param str key: key created with cachekey()
+    """
+    try:
+        with open(cachefile(cachedir, kind, key), encoding='utf-8') as cachefh:
+            return json.load(cachefh)
+    except (OSError, ValueError):
+        return None
+
+
+def writecache(cachedir, kind, key, data):
+    """Writes data to the cache. Failing to write is not an error, we just
+    will not have cached data next time.
+
+    :param str cachedir: cache directory
+    :param str kind: kind of cached data
+    :param str key: key created with cachekey()
+    :param data: data that can be serialized as JSON
+    """
+    path = cachefile(cachedir, kind, key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first, so concurrent runs never see
+        # half-written data.
+        fd, temppath = tempfile.mkstemp(dir=os.path.dirname(path),
+                                        suffix='.tmp')
+    except OSError:
+        return False
+
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as cachefh:
+            json.dump(data, cachefh)
+        os.replace(temppath, path)
+    except BaseException as error:
+        # Also for errors that are not ours to handle (like data that cannot
+        # be serialized), do not leave the temporary file behind.
+        try:
+            os.remove(temppath)
+        except OSError:
+            pass
+        if isinstance(error, OSError):
+            return False
+        raise
+    return True
+
+
+def touchcache(cachedir, kind, key):
+    """Marks a cache file as used, so prunecache() keeps it longer.
+
+    :param str cachedir: cache directory
+    :param str kind: kind of cached data
+    :param str key: key created with cachekey()
+    """
+    try:
+        os.utime(cachefile(cachedir, kind, key))
+    except OSError:
+        pass
+
+
+def prunecache(cachedir, kind, maxfiles):
+    """Removes the cache files of a kind of cached data that were used least
+    recently, so at most maxfiles of them are left.
+
+    :param str cachedir: cache directory
+    :param str kind: kind of cached data
+    :param int maxfiles: maximum number of files to keep
+    :return: number of removed files
+    """
+    try:
+        entries = [(entry.stat().st_mtime, entry.path)
+                   for entry in os.scandir(os.path.join(cachedir, kind))
+                   if entry.name.endswith('.json')]
+    except OSError:
+        return 0
+    if len(entries) <= maxfiles:
+        return 0
+
+    entries.sort(reverse=True)
+    removed = 0
+    for _, path in entries[maxfiles:]:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
@@ -0,0 +1,193 @@
+#
+# Copyright (c) 2017 SUSE Linux GmbH
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+
+"""SDSC Module that reads a large document in pieces, so it never has to be
+in memory as a whole.
+
+The document is split below sets, books, and parts: their children
+(chapters, appendices, and so on) are collected into pieces. Each piece is a
+tree of its own that contains copies of the sets, books, and parts around
+it (with all their attributes, but without any other children), so checks
+still see IDs, xml:base, and roles of the elements around the content. Once
+a piece is checked and dropped, its memory is freed.
+
+Titles and info elements always end up in the same piece as the content
+that follows them, so checks of a set, book, or part that look at these
+find them in the first piece that contains the set, book, or part.
+
+A set, book, or part without an ID or title is named after the beginning
+of its text in some messages. Piece by piece, that text ends with the
+first piece, so very short first pieces can change such names.
+
+A document that does not start with a set, book, or part is a single
+piece.
+"""
+
+from lxml import etree
+
+
+# Elements that are split into pieces. Apart from their titles and info
+# elements, none of the checks look at the children of these elements.
+CONTAINERS = ('set', 'book', 'part')
+
+# Children of containers that a piece never ends with
+METADATA = ('title', 'subtitle', 'titleabbrev', 'info')
+
+# Pieces are cut after the first child that makes them contain at least
+# this many elements.
+MAXPIECESIZE = 20000
+
+
+def localname(element):
+    """Returns the tag of an element without the namespace."""
+    return etree.QName(element).localname
+
+
+def ismetadata(element):
+    """Returns whether an element is a title or info element (DocBook 4
+    info elements are called bookinfo, setinfo, and so on).
+    """
+    name = localname(element)
+    return name in METADATA or name.endswith('info')
+
+
+def copycontainer(element):
+    """Returns a copy of an element with its attributes, but without any
+    children. The copy keeps the line number of the original.
+    """
+    copy = etree.Element(element.tag, dict(element.attrib),
+                         nsmap=element.nsmap)
+    copy.sourceline = element.sourceline
+    return copy
+
+
+def buildpiece(containers, last=None):
+    """Creates a piece from the open containers and everything that waits in
+    them. Waiting children are moved from the document into the piece, open
+    containers stay.
+
+    :param list containers: open containers, outermost first
+    :param last: last child of the innermost container to move (default:
+        all of them). The parser may already have added elements after it
+        that we have not seen the events of yet.
+    :return: tuple of the piece as etree.ElementTree and the copies of the
+        containers in it, outermost first
+    """
+    root = parent = None
+    copies = []
+    for level, container in enumerate(containers):
+        copy = copycontainer(container)
+        copies.append(copy)
+        if parent is None:
+            root = copy
+
+        if level + 1 < len(containers):
+            stop = containers[level + 1]
+        else:
+            stop = None
+        children = []
+        for child in container:
+            if child is stop:
+                break
+            children.append(child)
+            if child is last:
+                break
+        for child in children:
+            copy.append(child)
+
+        if parent is not None:
+            # After the children that come before it
+            parent.append(copy)
+        parent = copy
+    return (etree.ElementTree(root), copies)
+
+
+def iterpieces(source, maxpiecesize=None):
+    """Reads a document and yields it piece by piece, in document order.
+
+    Checks on the containers themselves (for example, of their IDs) would
+    find the same problems in each piece that contains a copy of the
+    container. Only the first piece contains the container for real, for
+    all later pieces, the copies are returned, so these findings can be
+    left out. Line numbers would not do for that, other elements can be on
+    the same line.
+
+    :param source: path or file object of the document
+    :param int maxpiecesize: number of elements after which a piece is cut
+        (default: MAXPIECESIZE)
+    :return: generator of tuples of a piece (etree.ElementTree) and a set
+        of the copies of containers in it that earlier pieces already
+        contained
+    :raises etree.XMLSyntaxError: if the document is not well-formed
+    """
+
+    if maxpiecesize is None:
+        maxpiecesize = MAXPIECESIZE
+
+    # Open containers, outermost first, and whether an earlier piece has
+    # contained them already
+    containers = []
+    contained = []
+    # Depth of the element of the current event, the root element is 1
+    depth = 0
+    # Number of elements waiting in the open containers
+    size = 0
+
+    def flush(last=None):
+        """Returns the piece of everything that waits."""
+        piece, copies = buildpiece(containers, last)
+        repeated = {copy for copy, seen in zip(copies, contained) if seen}
+        contained[:] = [True] * len(contained)
+        return (piece, repeated)
+
+    for event, element in etree.iterparse(source, events=('start', 'end'),
+                                          remove_pis=False):
+        if event == 'start':
+            depth += 1
+            if depth == len(containers) + 1 and \
+                    localname(element) in CONTAINERS:
+                # The root element or a container directly within a
+                # container
+                containers.append(element)
+                contained.append(False)
+            continue
+
+        depth -= 1
+        if not containers:
+            if depth == 0:
+                # No containers at all, the whole document is one piece.
+                yield (etree.ElementTree(element), set())
+            continue
+
+        if depth < len(containers):
+            # A container is closed.
+            if size or not contained[-1]:
+                yield flush()
+                size = 0
+            containers.pop()
+            contained.pop()
+            if containers:
+                containers[-1].remove(element)
+            continue
+
+        size += 1
+        if depth == len(containers) and size >= maxpiecesize and \
+                not ismetadata(element):
+            # A child of the innermost container is closed.
+            yield flush(element)
+            size = 0
@@ -32,6 +32,15 @@ from . import __description__, __programname__, __version__
 # liked being able to use sentences in the parameter descriptions.
 
 
+def modulelist(value):
+    """Splits a comma-separated list of check module names
+
+    :param str value: value of the option
+    :return: list of module names
+    """
+    return [module.strip() for module in value.split(',') if module.strip()]
+
+
 def parseargs(cliargs=None):
     """Parse command line arguments
 
@@ -40,7 +49,12 @@ def parseargs(cliargs=None):
     :rtype: argparse.Namespace
     """
     parser = argparse.ArgumentParser(
-        usage="%(prog)s [options] inputfile [outputfile]",
+        usage="""%(prog)s [options] inputfile [outputfile]
+       %(prog)s [options] --batch inputfile [inputfile ...]
+       %(prog)s [options] --files-from LIST
+       %(prog)s [options] --serve
+       %(prog)s [options] --lint-patterns [termfile ...]
+       %(prog)s [options] --compile-terms [FILE]""",
         description=__description__)
     fileorbookmark = parser.add_mutually_exclusive_group(required=True)
     parser.add_argument('-v', '--version',
@@ -67,12 +81,135 @@ def parseargs(cliargs=None):
     parser.add_argument('--performance',
                         action='store_true',
                         default=False,
-                        help="write performance measurements to stdout")
+                        help="""measure where time is spent and write a report at the
+            end: time per check module and Python extension function, and
+            the slowest terms, patterns, and paragraphs; with --no-cache,
+            results cached by earlier runs are not used""")
+    parser.add_argument('--performance-report',
+                        dest='performancereport',
+                        metavar='FILE',
+                        default=None,
+                        help="write the report of --performance to FILE instead of stderr")
+    parser.add_argument('--performance-format',
+                        dest='performanceformat',
+                        choices=('text', 'json'),
+                        default='text',
+                        help="format of the report of --performance (default: %(default)s)")
     parser.add_argument('--checkpatterns',
                         action='store_true',
                         default=False,
                         help="""check formal validity of built-in regular expression
             patterns""")
+    parser.add_argument('--chapters',
+                        action='store_true',
+                        default=False,
+                        help="""read and check the document piece by piece (chapters
+            and other children of sets, books, and parts), so very large
+            documents need much less memory; check modules then do not run
+            in parallel for a single file""")
+    parser.add_argument('--checks',
+                        type=modulelist,
+                        metavar='MODULES',
+                        default=None,
+                        help="""only run these check modules (comma-separated list of
+            names like terminology,typos); other modules are not even
+            loaded""")
+    parser.add_argument('--skip-checks',
+                        dest='skipchecks',
+                        type=modulelist,
+                        metavar='MODULES',
+                        default=None,
+                        help="""do not run these check modules (comma-separated list
+            of names like figures,links)""")
+    parser.add_argument('--cache-dir',
+                        dest='cachedir',
+                        metavar='DIR',
+                        default=None,
+                        help="""directory to cache prepared terminology data and
+            results of text-level checks per paragraph in, to speed up later
+            runs (default: $SDSC_CACHE_DIR, or $XDG_CACHE_HOME/sdsc, or
+            ~/.cache/sdsc)""")
+    parser.add_argument('--no-cache',
+                        dest='nocache',
+                        action='store_true',
+                        default=False,
+                        help="do not read or write any cached data")
+    parser.add_argument('-j', '--jobs',
+                        type=int,
+                        metavar='N',
+                        default=1,
+                        help="""run check modules (or, with --batch or
+            --files-from, files) in N processes at the same time
+            (default: 1)""")
+    fileorbookmark.add_argument('--batch',
+                                nargs='+',
+                                metavar='inputfile',
+                                default=None,
+                                help="""check several files, each of them can also be a
+            glob pattern like 'xml/*.xml'; results are written next to each
+            input file and a summary of timings is shown at the end; with
+            --jobs, files are checked in parallel""")
+    fileorbookmark.add_argument('--files-from',
+                                dest='filesfrom',
+                                metavar='LIST',
+                                default=None,
+                                help="""like --batch, but read the files to check from
+            LIST (one file or glob pattern per line, - for standard
+            input)""")
+    fileorbookmark.add_argument('--serve',
+                                action='store_true',
+                                default=False,
+                                help="""keep running and check files for sdsc --client, to
+            avoid the startup time of sdsc for each file""")
+    fileorbookmark.add_argument('--lint-patterns',
+                                dest='lintpatterns',
+                                nargs='*',
+                                metavar='termfile',
+                                default=None,
+                                help="""check the regular expression patterns of term
+            files (default: those of all check modules, or of --checks) for
+            nested quantifiers and overlapping alternatives, and time them
+            on tokens that are hard for them; exits with 1 if any pattern
+            has problems""")
+    parser.add_argument('--lint-budget',
+                        dest='lintbudget',
+                        type=float,
+                        metavar='MS',
+                        default=10.0,
+                        help="""with --lint-patterns, the time in milliseconds that a
+            single call of a pattern may take (default: %(default)s)""")
+    parser.add_argument('--lint-sample',
+                        dest='lintsamples',
+                        action='append',
+                        metavar='FILE',
+                        default=None,
+                        help="""with --lint-patterns, also time the patterns on the
+            words of FILE (a document or plain text; can be given several
+            times)""")
+    fileorbookmark.add_argument('--compile-terms',
+                                dest='compileterms',
+                                nargs='?',
+                                const='',
+                                metavar='FILE',
+                                default=None,
+                                help="""generate a Python module with specialized match
+            functions for the term files of all check modules (or of
+            --checks) and write it to FILE (default: compiledterms.py next to
+            the sdsc modules, where the term check picks it up
+            automatically)""")
+    parser.add_argument('--client',
+                        action='store_true',
+                        default=False,
+                        help="""let a running sdsc --serve do the checking; all
+            other options work as usual, files are relative to the current
+            directory""")
+    parser.add_argument('--socket',
+                        metavar='PATH',
+                        default=None,
+                        help="""socket that sdsc --serve listens on and sdsc --client
+            connects to (default: $SDSC_SOCKET, or sdsc.sock in
+            $XDG_RUNTIME_DIR, or sdsc.sock in a private directory sdsc-<uid>
+            in the temporary directory)""")
     fileorbookmark.add_argument('inputfile', type=argparse.FileType('r'),
                                 nargs="?")
     parser.add_argument('outputfile', nargs="?")
@@ -26,6 +26,15 @@ import re
 PARENTHESES = re.compile(r'(?<!\\)\((?![\?|\:])')
 
 
+# manglepattern() only puts a pattern into the result once if it does not
+# refer to groups: backreferences (\1, (?P=name)) and conditionals
+# ((?(1)...)) would refer to other groups than in the version that has the
+# pattern three times.
+# This also catches escaped backslashes like \\1, such patterns just keep the
+# longer version.
+GROUPREFERENCE = re.compile(r'\\[1-9]|\(\?P=|\(\?\(')
+
+
 # Sentence end characters.
 # FIXME: English hardcoded
 # Lookbehinds need to have a fixed length... thus .ca
@@ -47,3 +56,16 @@ EMPTYSUBPATTERN = re.compile(r'(?<!\\)(\|\)|\(\||\|\|)')
 
 STARTPUNCTUATION = '([{"\'¡¿<“„‟‘‚‛「『【〚〖〘〔〈《'
 ENDPUNCTUATION = '〉》〕〙〗〛】”’‛」』>)]}/\\"\',:;!?.‥…‼‽⁇⁈⁉'
+
+
+# With re.IGNORECASE, the re module lets some non-ASCII characters match ASCII
+# letters, even though str.lower() does not map them to these letters. To
+# compare tokens against ASCII literals taken from patterns, these characters
+# need to be folded manually first. (The test suite makes sure this list is
+# complete for the running Python version.)
+CASEFOLDEXTRA = {
+    'İ': 'i',  # LATIN CAPITAL LETTER I WITH DOT ABOVE
+    'ı': 'i',  # LATIN SMALL LETTER DOTLESS I
+    'ſ': 's',  # LATIN SMALL LETTER LONG S
+    'K': 'k',  # KELVIN SIGN
+}
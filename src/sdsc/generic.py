@@ -20,6 +20,12 @@ import re
 
 RE_CACHE = {}
 
+# Line number that linenumber() returns for the elements in
+# repeatedelements: copies of sets, books, and parts that an earlier piece of
+# the document already contained, see sdsc.checkchapters()
+REPEATEDLINE = 'repeated'
+repeatedelements = set()
+
 def re_compile(pattern, flags=0):
     """re.compile caches only a small number of regular expressions. Our
     version can cache a much larger number of them which increases speed
@@ -47,4 +53,7 @@ def linenumber(context):
     via CSS.
     """
 
-    return context.context_node.sourceline
+    node = context.context_node
+    if node in repeatedelements:
+        return REPEATEDLINE
+    return node.sourceline
@@ -0,0 +1,427 @@
+#
+# Copyright (c) 2017 SUSE Linux GmbH
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+
+"""SDSC Module that finds regular expression patterns of term files that can
+be slow (--lint-patterns).
+
+Patterns are checked in two ways, both after manglepattern():
+
+* Statically: a repetition within a repetition where the inner one can
+  match a different number of characters each time, like (a+)+, and
+  alternatives within a repetition that can start with the same character,
+  like (a|ab)+. With these, the re module may try exponentially many ways
+  to match a string before it gives up.
+* By timing: each pattern is run on tokens that are made to be hard for
+  it (long runs of the characters it matches, followed by one it does not
+  match) and on tokens of sample documents, with a time budget per call.
+  Tokens get longer step by step, so a pattern that blows up does not take
+  forever.
+"""
+
+import re
+import string
+import time
+
+from .termindex import sre_parse
+
+# Characters that the static checks know apart. Everything else counts as
+# one of NONASCII.
+NONASCII = -1
+ALLCHARS = frozenset(range(128)) | {NONASCII}
+
+CATEGORIES = {
+    sre_parse.CATEGORY_DIGIT: frozenset(ord(char) for char in string.digits),
+    sre_parse.CATEGORY_SPACE: frozenset(ord(char) for char in ' \t\n\r\f\v'),
+    sre_parse.CATEGORY_WORD: frozenset(
+        ord(char) for char in string.ascii_letters + string.digits + '_') |
+    {NONASCII},
+}
+CATEGORIES[sre_parse.CATEGORY_NOT_DIGIT] = \
+    ALLCHARS - CATEGORIES[sre_parse.CATEGORY_DIGIT]
+CATEGORIES[sre_parse.CATEGORY_NOT_SPACE] = \
+    ALLCHARS - CATEGORIES[sre_parse.CATEGORY_SPACE]
+CATEGORIES[sre_parse.CATEGORY_NOT_WORD] = \
+    ALLCHARS - CATEGORIES[sre_parse.CATEGORY_WORD] | {NONASCII}
+
+REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+# Possessive repetitions (Python 3.11+) never backtrack.
+POSSESSIVEREPEATS = tuple(getattr(sre_parse, name)
+                          for name in ('POSSESSIVE_REPEAT',)
+                          if hasattr(sre_parse, name))
+ASSERTS = (sre_parse.ASSERT, sre_parse.ASSERT_NOT)
+ATOMICGROUPS = tuple(getattr(sre_parse, name) for name in ('ATOMIC_GROUP',)
+                     if hasattr(sre_parse, name))
+
+# Repetitions with a higher maximum than this count as unbounded.
+MAXBOUNDED = 16
+
+# Lengths of the hard tokens, in the order they are tried. The steps are
+# small enough that a pattern whose time grows exponentially with the length
+# of the token exceeds the budget by a bearable factor at most.
+TOKENLENGTHS = (8, 10, 12, 14, 16, 20, 24, 28, 32, 40, 48, 64, 96, 128)
+
+# Ends of the hard tokens: a word character that \w matches but a pattern
+# for ASCII words does not, and punctuation that is not at the end of the
+# token, so the lookahead that manglepattern() adds fails
+ENDINGS = ('\u00e9', '-x')
+
+# Maximum number of characters of a pattern that hard tokens are made of,
+# and of those that are combined in pairs
+MAXFUZZCHARS = 12
+MAXFUZZPAIRS = 4
+
+# Default time budget per call of a pattern, in seconds
+BUDGET = 0.01
+
+
+def foldchar(code):
+    """Returns the lowercase version of an ASCII character code."""
+    if 65 <= code <= 90:
+        return code + 32
+    return code if code < 128 else NONASCII
+
+
+def foldchars(codes):
+    """Returns a set of character codes with all ASCII letters in both
+    cases, as the static checks do not care about case."""
+    folded = {foldchar(code) for code in codes}
+    return frozenset(folded | {code - 32 for code in folded if 97 <= code <= 122})
+
+
+def classchars(items):
+    """Returns the characters of a character class ([...])."""
+    chars = set()
+    negate = False
+    for op, av in items:
+        if op is sre_parse.NEGATE:
+            negate = True
+        elif op is sre_parse.LITERAL:
+            chars.add(av)
+        elif op is sre_parse.RANGE:
+            low, high = av
+            chars.update(range(low, min(high, 127) + 1))
+            if high > 127:
+                chars.add(NONASCII)
+        elif op is sre_parse.CATEGORY:
+            chars |= CATEGORIES.get(av, ALLCHARS)
+        else:
+            chars |= ALLCHARS
+    chars = foldchars(chars)
+    return ALLCHARS - chars if negate else chars
+
+
+def itemchars(op, av):
+    """Returns the characters that a single-character item can match or
+    None if the item is not a single character."""
+    if op is sre_parse.LITERAL:
+        return foldchars({av})
+    if op is sre_parse.NOT_LITERAL:
+        return ALLCHARS - foldchars({av})
+    if op is sre_parse.IN:
+        return classchars(av)
+    if op is sre_parse.ANY:
+        return ALLCHARS
+    return None
+
+
+def subitems(op, av):
+    """Returns the lists of items within an item."""
+    if op is sre_parse.SUBPATTERN:
+        return [av[-1]]
+    if op is sre_parse.BRANCH:
+        return av[1]
+    if op in REPEATS or op in POSSESSIVEREPEATS:
+        return [av[2]]
+    if op in ASSERTS:
+        return [av[1]]
+    if op in ATOMICGROUPS:
+        return [av]
+    return []
+
+
+def allchars(items):
+    """Returns all characters that a parsed regular expression can match
+    anywhere."""
+    chars = set()
+    for op, av in items:
+        single = itemchars(op, av)
+        if single is not None:
+            chars |= single
+        elif op is sre_parse.AT:
+            continue
+        elif op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+            chars |= ALLCHARS
+        else:
+            for subitemlist in subitems(op, av):
+                chars |= allchars(subitemlist)
+    return frozenset(chars)
+
+
+def firstchars(items):
+    """Returns the characters that a match of a parsed regular expression
+    can start with, and whether it can match the empty string. Lookarounds
+    count with the characters they look at, so they are never overlooked.
+    """
+    chars = set()
+    for op, av in items:
+        single = itemchars(op, av)
+        if single is not None:
+            return (frozenset(chars | single), False)
+
+        if op is sre_parse.SUBPATTERN or op in ATOMICGROUPS:
+            itemfirst, nullable = firstchars(subitems(op, av)[0])
+        elif op is sre_parse.BRANCH:
+            itemfirst = set()
+            nullable = False
+            for branch in av[1]:
+                branchfirst, branchnullable = firstchars(branch)
+                itemfirst |= branchfirst
+                nullable = nullable or branchnullable
+        elif op in REPEATS or op in POSSESSIVEREPEATS:
+            itemfirst, nullable = firstchars(av[2])
+            nullable = nullable or av[0] == 0
+        elif op in ASSERTS:
+            itemfirst, nullable = firstchars(av[1])[0], True
+        elif op is sre_parse.AT:
+            itemfirst, nullable = set(), True
+        else:
+            itemfirst, nullable = ALLCHARS, True
+
+        chars |= itemfirst
+        if not nullable:
+            return (frozenset(chars), False)
+    return (frozenset(chars), True)
+
+
+def describe(items):
+    """Returns a parsed regular expression as text again, roughly."""
+    parts = []
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            parts.append(chr(av))
+        elif op is sre_parse.ANY:
+            parts.append('.')
+        elif op is sre_parse.IN:
+            parts.append('[...]')
+        elif op is sre_parse.SUBPATTERN:
+            parts.append('(' + describe(av[-1]) + ')')
+        elif op is sre_parse.BRANCH:
+            parts.append('|'.join(describe(branch) for branch in av[1]))
+        elif op in REPEATS or op in POSSESSIVEREPEATS:
+            low, high, body = av
+            body = describe(body)
+            if len(body) > 1 and not body.startswith(('(', '[')):
+                body = '(' + body + ')'
+            if (low, high) == (0, sre_parse.MAXREPEAT):
+                parts.append(body + '*')
+            elif (low, high) == (1, sre_parse.MAXREPEAT):
+                parts.append(body + '+')
+            elif (low, high) == (0, 1):
+                parts.append(body + '?')
+            else:
+                parts.append('%s{%d,%s}' % (
+                    body, low, '' if high is sre_parse.MAXREPEAT else high))
+        else:
+            parts.append('...')
+    return ''.join(parts)
+
+
+def findproblems(items, withinrepeat, follow, problems):
+    """Walks through a parsed regular expression and adds what can make it
+    slow to problems.
+
+    :param list items: parsed regular expression
+    :param withinrepeat: the innermost unbounded repetition around items
+        (as parsed) or None
+    :param frozenset follow: characters that can come after items
+    :param list problems: list of descriptions to add to
+    """
+    for position, (op, av) in enumerate(items):
+        rest, restnullable = firstchars(items[position + 1:])
+        after = rest | follow if restnullable else rest
+
+        if op in REPEATS:
+            low, high, body = av
+            unbounded = high is sre_parse.MAXREPEAT or high > MAXBOUNDED
+            variable = high > 1 and low != high
+            if withinrepeat is not None and variable and \
+                    allchars(body) & after:
+                problems.append(
+                    "nested quantifiers: {0} within {1}".format(
+                        describe([(op, av)]), describe(withinrepeat)))
+            bodyfollow = after
+            if high > 1:
+                bodyfollow = bodyfollow | firstchars(body)[0]
+            if unbounded and withinrepeat is None:
+                findproblems(body, [(op, av)], bodyfollow, problems)
+            else:
+                findproblems(body, withinrepeat, bodyfollow, problems)
+
+        elif op is sre_parse.BRANCH:
+            branches = av[1]
+            if withinrepeat is not None:
+                for first, second in ((first, second)
+                                      for index, first in enumerate(branches)
+                                      for second in branches[index + 1:]):
+                    if firstchars(first)[0] & firstchars(second)[0]:
+                        problems.append(
+                            "overlapping alternatives within {0}: {1} and {2}"
+                            .format(describe(withinrepeat), describe(first),
+                                    describe(second)))
+                        break
+            for branch in branches:
+                findproblems(branch, withinrepeat, after, problems)
+
+        elif op in ASSERTS:
+            findproblems(av[1], withinrepeat, ALLCHARS, problems)
+
+        elif op is sre_parse.SUBPATTERN:
+            findproblems(av[-1], withinrepeat, after, problems)
+
+        # Possessive repetitions and atomic groups do not backtrack, so
+        # nothing within them can be a problem.
+
+
+def staticproblems(pattern, flags=0):
+    """Finds constructs in a regular expression that can make the re module
+    backtrack a lot.
+
+    :param str pattern: regular expression (after manglepattern())
+    :param int flags: flags of the regular expression
+    :return: list of descriptions of problems
+    """
+    parsed = sre_parse.parse(pattern, flags)
+    problems = []
+    findproblems(list(parsed), None, frozenset(), problems)
+    # The same construct can show up several times after manglepattern().
+    return list(dict.fromkeys(problems))
+
+
+def repeatedchars(items):
+    """Returns the characters within unbounded repetitions of a parsed
+    regular expression, these are the ones that backtracking is about."""
+    chars = set()
+    for op, av in items:
+        if op in REPEATS and (av[1] is sre_parse.MAXREPEAT or av[1] > MAXBOUNDED):
+            chars |= allchars(av[2])
+        for subitemlist in subitems(op, av):
+            chars |= repeatedchars(subitemlist)
+    return chars
+
+
+def hardtokens(pattern, flags=0):
+    """Yields tokens that are hard for a regular expression: runs of the
+    characters it repeats (single ones and pairs) and of some others,
+    followed by a character that makes it fail. Shorter tokens come first.
+
+    :param str pattern: regular expression
+    :param int flags: flags of the regular expression
+    """
+
+    def printable(codes):
+        return sorted(chr(code) for code in codes
+                      if code != NONASCII and chr(code).isprintable() and
+                      not chr(code).isspace())
+
+    def spread(chars, count):
+        # Spread out over the whole set, not just digits and capitals
+        return chars[::len(chars) // count + 1] if len(chars) > count else chars
+
+    parsed = sre_parse.parse(pattern, flags)
+    repeated = spread(printable(foldchars(repeatedchars(parsed))), MAXFUZZCHARS)
+    others = spread(printable(allchars(parsed) - set(map(ord, repeated))),
+                    MAXFUZZCHARS - len(repeated) + 1)
+    pairs = [first + second
+             for first in repeated[:MAXFUZZPAIRS]
+             for second in repeated[:MAXFUZZPAIRS] if first != second]
+    units = repeated + pairs + others
+    for length in TOKENLENGTHS:
+        for unit in units:
+            for ending in ENDINGS:
+                yield (unit * length)[:length] + ending
+
+
+def timecall(method, text):
+    """Returns the time a call of a method of a compiled regular expression
+    takes, in seconds."""
+    start = time.perf_counter()
+    method(text)
+    return time.perf_counter() - start
+
+
+def fuzzpattern(compiled, tokens, search=False, budget=BUDGET):
+    """Runs a compiled regular expression on hard tokens and on the given
+    tokens, until one of them takes longer than the budget.
+
+    :param compiled: compiled regular expression
+    :param list tokens: tokens of sample documents
+    :param bool search: use search() on a few tokens instead of match() on
+        single tokens, like context patterns are used
+    :param float budget: maximum time per call in seconds
+    :return: tuple of the time and the token that took longer than the
+        budget, or None
+    """
+    method = compiled.search if search else compiled.match
+    for token in list(hardtokens(compiled.pattern, compiled.flags)) + tokens:
+        text = token + " " + token + " " if search else token
+        seconds = timecall(method, text)
+        # Try again to be sure it was not just a hiccup of the system.
+        if seconds > budget and timecall(method, text) > budget:
+            return (seconds, token)
+    return None
+
+
+def sampletokens(texts, count=1000):
+    """Returns the longest distinct tokens of some texts, as the time of a
+    pattern mostly depends on the length of the token.
+
+    :param list texts: texts of sample documents
+    :param int count: maximum number of tokens
+    """
+    tokens = {token for text in texts for token in text.split()}
+    return sorted(tokens, key=lambda token: (-len(token), token))[:count]
+
+
+def shorten(text, length=40):
+    """Returns the beginning of a long text."""
+    return text if len(text) <= length else text[:length] + "..."
+
+
+def lintpattern(pattern, flags=0, search=False, tokens=(), budget=BUDGET):
+    """Checks a regular expression for everything that can make it slow.
+
+    :param str pattern: regular expression (after manglepattern())
+    :param int flags: flags of the regular expression
+    :param bool search: whether the pattern is used with search(), like
+        context patterns, instead of match()
+    :param list tokens: tokens of sample documents to time the pattern on
+    :param float budget: maximum time per call in seconds
+    :return: list of descriptions of problems
+    """
+    try:
+        compiled = re.compile(pattern, flags)
+    except re.error as error:
+        return ["syntax error: {0}".format(error)]
+
+    problems = staticproblems(pattern, flags)
+    slow = fuzzpattern(compiled, list(tokens), search, budget)
+    if slow is not None:
+        seconds, token = slow
+        problems.append("slow: {0:.2f} ms for {1!r} ({2} characters)".format(
+            seconds * 1000, shorten(token), len(token)))
+    return problems
@@ -0,0 +1,257 @@
+#
+# Copyright (c) 2017 SUSE Linux GmbH
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+
+"""SDSC Module that finds out which patterngroups can possibly match
+anywhere in a paragraph, so termcheck() can skip all others.
+
+For each patterngroup, we extract literal strings of which at least one must
+appear in every match. An Aho-Corasick automaton then finds all of these
+strings in a paragraph in a single pass.
+"""
+
+from .termindex import classliterals, foldcase, sre_parse
+
+
+# Maximum number of alternative literal strings per pattern.
+MAXLITERALS = 64
+
+# Repetitions like x{2} are expanded into literal strings as long as they
+# are not longer than this.
+MAXREPEAT = 4
+
+REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+ZEROWIDTH = (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT)
+
+
+def product(first, second):
+    """Returns all concatenations of a string from first with one from
+    second or None if there would be too many of them.
+    """
+    if first is None or second is None or \
+            len(first) * len(second) > MAXLITERALS:
+        return None
+    return {a + b for a in first for b in second}
+
+
+def finitestrings(items):
+    """Returns the set of all (case-folded) strings a parsed regular
+    expression can match or None if that set is unknown or too large.
+
+    :param list items: parsed regular expression (sre_parse output)
+    """
+    strings = {''}
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            itemstrings = {chr(av).lower()} if av < 128 else None
+        elif op is sre_parse.IN:
+            itemstrings = classliterals(av)
+        elif op is sre_parse.SUBPATTERN:
+            itemstrings = finitestrings(av[-1])
+        elif op is sre_parse.BRANCH:
+            itemstrings = set()
+            for branch in av[1]:
+                branchstrings = finitestrings(branch)
+                if branchstrings is None:
+                    itemstrings = None
+                    break
+                itemstrings |= branchstrings
+        elif op in REPEATS and av[1] <= MAXREPEAT:
+            itemstrings = set()
+            repeatstrings = finitestrings(av[2])
+            power = {''}
+            for count in range(av[1] + 1):
+                if count >= av[0]:
+                    itemstrings |= power
+                power = product(power, repeatstrings)
+                if power is None and count < av[1]:
+                    itemstrings = None
+                    break
+        elif op in ZEROWIDTH:
+            itemstrings = {''}
+        else:
+            itemstrings = None
+
+        strings = product(strings, itemstrings)
+        if strings is None:
+            return None
+    return strings
+
+
+def score(literals):
+    """Rates how selective a set of alternative literal strings is. Longer
+    strings are better, fewer alternatives are better.
+    """
+    return (min(len(literal) for literal in literals), -len(literals))
+
+
+def requiredliteralsofitems(items):
+    """Finds alternative literal strings of which at least one appears in
+    every match of a parsed regular expression.
+
+    :param list items: parsed regular expression (sre_parse output)
+    :return: set of strings or None if no such strings were found
+    """
+    candidates = []
+    # Literal strings matched by the items we have seen since the last
+    # item we could not turn into literal strings.
+    current = {''}
+    for item in items:
+        op, av = item
+        itemstrings = finitestrings([item])
+        combined = product(current, itemstrings)
+        if combined is not None:
+            current = combined
+            continue
+
+        candidates.append(current)
+        current = {''}
+        if itemstrings is not None:
+            # Too many combinations, but the item on its own is usable.
+            current = itemstrings
+            continue
+
+        # We cannot use the item as a whole, but maybe something inside it
+        # is required.
+        if op is sre_parse.SUBPATTERN:
+            candidates.append(requiredliteralsofitems(av[-1]))
+        elif op is sre_parse.BRANCH:
+            branchliterals = set()
+            for branch in av[1]:
+                literals = requiredliteralsofitems(branch)
+                if literals is None:
+                    branchliterals = None
+                    break
+                branchliterals |= literals
+            candidates.append(branchliterals)
+        elif op in REPEATS and av[0] > 0:
+            candidates.append(requiredliteralsofitems(av[2]))
+    candidates.append(current)
+
+    candidates = [literals for literals in candidates
+                  if literals and '' not in literals and
+                  len(literals) <= MAXLITERALS]
+    if not candidates:
+        return None
+    return max(candidates, key=score)
+
+
+def requiredliterals(pattern):
+    """Finds alternative literal strings of which at least one appears in
+    every match of a compiled regular expression, after applying foldcase()
+    to the matched string.
+
+    :param pattern: compiled regular expression
+    :return: set of strings or None if no such strings were found
+    """
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return None
+    return requiredliteralsofitems(parsed)
+
+
+def patterngroupliterals(patterns):
+    """Finds alternative literal strings of which at least one appears in
+    the text whenever a patterngroup matches. As all patterns of the
+    patterngroup have to match, the literal strings of any single pattern
+    are enough, we use the most selective ones.
+
+    :param list patterns: compiled patterns of the patterngroup
+    :return: set of strings or None if no such strings were found
+    """
+    candidates = [literals for literals in map(requiredliterals, patterns)
+                  if literals is not None]
+    if not candidates:
+        return None
+    return max(candidates, key=score)
+
+
+def buildautomaton(literalsofpatterngroups):
+    """Creates an Aho-Corasick automaton that finds the patterngroups which
+    can match within a text.
+
+    The automaton is a tuple of transitions (per state: dict mapping a
+    character to the next state), fallback states (per state: the state to
+    continue with when there is no transition for a character), outputs (per
+    state: IDs of patterngroups found when reaching the state), and the IDs of
+    patterngroups without any literal strings that always need to be tried.
+
+    :param list literalsofpatterngroups: literal strings per patterngroup (or
+        None), the position in the list is the ID of the patterngroup
+    """
+    transitions = [{}]
+    outputs = [set()]
+    always = set()
+
+    for patterngroupid, literals in enumerate(literalsofpatterngroups):
+        if literals is None:
+            always.add(patterngroupid)
+            continue
+        for literal in literals:
+            state = 0
+            for char in literal:
+                if char not in transitions[state]:
+                    transitions.append({})
+                    outputs.append(set())
+                    transitions[state][char] = len(transitions) - 1
+                state = transitions[state][char]
+            outputs[state].add(patterngroupid)
+
+    # Breadth-first, so fallback states are always complete before they are
+    # used.
+    fallbacks = [0] * len(transitions)
+    queue = list(transitions[0].values())
+    for state in queue:
+        for char, nextstate in transitions[state].items():
+            queue.append(nextstate)
+            fallback = fallbacks[state]
+            while fallback and char not in transitions[fallback]:
+                fallback = fallbacks[fallback]
+            fallback = transitions[fallback].get(char, 0)
+            fallbacks[nextstate] = fallback
+            outputs[nextstate] |= outputs[fallback]
+
+    return (transitions, fallbacks, [frozenset(output) for output in outputs],
+            frozenset(always))
+
+
+def scan(automaton, text, folded=False):
+    """Returns the IDs of all patterngroups that can match within a text.
+
+    :param tuple automaton: automaton created with buildautomaton()
+    :param str text: text to scan
+    :param bool folded: whether foldcase() was already applied to text
+    """
+    transitions, fallbacks, outputs, always = automaton
+    found = set(always)
+    state = 0
+    for char in (text if folded else foldcase(text)):
+        nextstate = transitions[state].get(char)
+        if nextstate is None:
+            fallback = state
+            while fallback and char not in transitions[fallback]:
+                fallback = fallbacks[fallback]
+            nextstate = transitions[fallback].get(char, 0)
+            # Remember where we ended up, so next time, this is a single
+            # lookup. (This does not change the result of following the
+            # fallback states, so it is safe to store in the same place.)
+            transitions[state][char] = nextstate
+        state = nextstate
+        if outputs[state]:
+            found |= outputs[state]
+    return found
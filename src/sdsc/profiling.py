@@ -0,0 +1,382 @@
+#
+# Copyright (c) 2017 SUSE Linux GmbH
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+
+"""SDSC Module that collects performance measurements of a run (--performance)
+and writes them as one report at the end.
+
+Measurements are only collected while a profile is running, see
+startprofile(). Otherwise, nothing here is called at all: Python extension
+functions are only wrapped and term sets only get instrumented copies while
+profiling.
+"""
+
+import json
+import re
+import time
+import types
+
+from . import analysis
+
+# Measurements of the current run or None if nothing is measured:
+# profile = {
+#   'modules': { <module>: { 'wall': <s>, 'cpu': <s>, 'runs': <n> }, ... },
+#   'functions': { <function>: { 'calls': <n>, 'time': <s> }, ... },
+#   'terms': { <term>: { 'attempts': <n>, 'matches': <n>, 'time': <s> }, ... },
+#   'patterns': { <pattern>: { 'calls': <n>, 'memohits': <n>, 'time': <s> },
+#                 ... },
+#   'paragraphs': [ [ <s>, <words>, <check>, <location> ], ... ],
+#   'caches': { <cache>: { 'hits': <n>, 'misses': <n> }, ... },
+# }
+# Only the slowest paragraphs are kept, slowest first.
+profile = None
+
+# Number of slowest paragraphs, terms, and patterns in the report
+TOPN = 10
+
+# Instrumented copies of term sets, see instrumenttermset():
+# instrumentedtermsets = { <term set ID>: ( <term set>, <copy> ), ... }
+instrumentedtermsets = {}
+
+# Names of term sets (usually the check module), by term set ID
+termsetnames = {}
+
+# Counters of caches to report, with 'hits' and 'misses', by name of the cache
+cachestats = {'paragraph analysis': analysis.analysisstats}
+
+# Values of cachestats that are already in the profile, by name of the cache
+cachesrecorded = {}
+
+# What manglepattern() adds to all patterns, and to context patterns (with
+# the pattern once, or three times for patterns that refer to groups)
+MANGLEDSUFFIX = re.compile(r'^\(\?:(.*)\)\(\?=\\W\{0,5\}\(\?:\\s\|\$\)\)$',
+                           re.DOTALL)
+MANGLEDCONTEXT = re.compile(r'^(?:\(\(\?:\(\?<=\^\)\|\(\?<=\\s\|\^\\W\)\|\(\?<=\\s\\W\)\)'
+                            r'\(\?:(.*)\)\)'
+                            r'|\(\(\?<=\^\)\(\?:(.*)\)\|\(\?<=\\s\|\^\\W\)\(\?:\2\)'
+                            r'\|\(\?<=\\s\\W\)\(\?:\2\)\))$', re.DOTALL)
+
+
+def emptyprofile():
+    """Returns a profile without measurements."""
+    return {'modules': {}, 'functions': {}, 'terms': {}, 'patterns': {},
+            'paragraphs': [], 'caches': {}}
+
+
+def startprofile(namespace=None):
+    """Starts collecting measurements.
+
+    :param namespace: etree.FunctionNamespace whose functions are timed
+    """
+    global profile
+    profile = emptyprofile()
+    instrumentedtermsets.clear()
+    for name, stats in cachestats.items():
+        cachesrecorded[name] = dict(stats)
+    if namespace is not None:
+        for name, function in list(namespace.items()):
+            if not hasattr(function, 'profiled'):
+                namespace[name] = profiledfunction(name, function)
+
+
+def stopprofile(namespace=None):
+    """Stops collecting measurements.
+
+    :param namespace: etree.FunctionNamespace given to startprofile()
+    :return: the measurements, see profile
+    """
+    global profile
+    if namespace is not None:
+        for name, function in list(namespace.items()):
+            if hasattr(function, 'profiled'):
+                namespace[name] = function.profiled
+    instrumentedtermsets.clear()
+    addcaches()
+    result, profile = profile, None
+    return result
+
+
+def takeprofile():
+    """Returns the measurements so far and starts over, so a worker process
+    can send them to the main process.
+    """
+    global profile
+    addcaches()
+    result, profile = profile, emptyprofile()
+    return result
+
+
+def addcounts(counts, name, **values):
+    """Adds values to the counters of name in a dict of counters."""
+    entry = counts.get(name)
+    if entry is None:
+        counts[name] = dict(values)
+    else:
+        for key, value in values.items():
+            entry[key] += value
+
+
+def mergeprofile(other):
+    """Adds the measurements of another process to the current profile.
+
+    :param dict other: measurements, see profile
+    """
+    if profile is None or not other:
+        return
+    for kind in ('modules', 'functions', 'terms', 'patterns', 'caches'):
+        for name, values in other[kind].items():
+            addcounts(profile[kind], name, **values)
+    for paragraph in other['paragraphs']:
+        addparagraph(*paragraph)
+
+
+def addmodule(name, wall, cpu):
+    """Records a run of a check module.
+
+    :param str name: name of the check module
+    :param float wall: wall-clock time in seconds
+    :param float cpu: CPU time of this process in seconds
+    """
+    addcounts(profile['modules'], name, wall=wall, cpu=cpu, runs=1)
+
+
+def addparagraph(seconds, words, check, location):
+    """Records the time a check took for a paragraph, if it is among the
+    slowest.
+
+    :param float seconds: time in seconds
+    :param int words: number of words in the paragraph
+    :param str check: what was checked, like 'terms'
+    :param str location: file, line, and beginning of the paragraph
+    """
+    paragraphs = profile['paragraphs']
+    if len(paragraphs) >= TOPN and seconds <= paragraphs[-1][0]:
+        return
+    paragraphs.append([seconds, words, check, location])
+    paragraphs.sort(key=lambda paragraph: -paragraph[0])
+    del paragraphs[TOPN:]
+
+
+def addcaches():
+    """Records how often the caches in cachestats could reuse a result
+    since the last time."""
+    for name, stats in cachestats.items():
+        recorded = cachesrecorded.get(name, {})
+        addcounts(profile['caches'], name,
+                  hits=stats['hits'] - recorded.get('hits', 0),
+                  misses=stats['misses'] - recorded.get('misses', 0))
+        cachesrecorded[name] = dict(stats)
+
+
+def paragraphlocation(paragraph):
+    """Returns a short description of where a paragraph record comes from.
+
+    :param tuple paragraph: paragraph record, see makeparagraph()
+    """
+    content, _, _, basefile, line = paragraph
+    beginning = " ".join(content.split()[:8])
+    return "{0}line {1}: {2}".format(basefile + ", " if basefile else "",
+                                     line, beginning)
+
+
+def profiledfunction(name, function):
+    """Returns a wrapper of a Python extension function that times it."""
+
+    # lxml has the names of registered functions as bytes.
+    if isinstance(name, bytes):
+        name = name.decode('utf-8')
+
+    def wrapper(*args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            addcounts(profile['functions'], name, calls=1,
+                      time=time.perf_counter() - start)
+
+    wrapper.profiled = function
+    return wrapper
+
+
+def patternlabel(pattern):
+    """Returns a regular expression without what manglepattern() added."""
+    label = pattern.pattern
+    for mangled in (MANGLEDSUFFIX, MANGLEDCONTEXT):
+        match = mangled.match(label)
+        if match:
+            label = match.group(match.lastindex)
+    return label
+
+
+def profiledpattern(pattern, term, attempts=False):
+    """Returns an object that works like a compiled regular expression for
+    matchtermset() but records the time of each call for the term and the
+    pattern. matchtermset() calls its memohit() instead when it reuses an
+    earlier result of the pattern.
+
+    :param pattern: compiled regular expression
+    :param str term: name of the term that the pattern belongs to
+    :param bool attempts: whether each call counts as an attempt to match
+        the term
+    """
+    label = patternlabel(pattern)
+    attempt = 1 if attempts else 0
+
+    def timed(method):
+        def call(text):
+            start = time.perf_counter()
+            result = method(text)
+            seconds = time.perf_counter() - start
+            addcounts(profile['terms'], term, attempts=attempt, matches=0,
+                      time=seconds)
+            addcounts(profile['patterns'], label, calls=1, memohits=0,
+                      time=seconds)
+            return result
+        return call
+
+    def memohit():
+        addcounts(profile['terms'], term, attempts=attempt, matches=0, time=0.0)
+        addcounts(profile['patterns'], label, calls=0, memohits=1, time=0.0)
+
+    return types.SimpleNamespace(match=timed(pattern.match),
+                                 search=timed(pattern.search),
+                                 memohit=memohit, pattern=pattern.pattern)
+
+
+def termlabels(termset, termsetid):
+    """Returns the names of the terms of a term set in the report: the
+    first pattern of each term and the accepted term.
+    """
+    firstpatterns = {}
+    for patterns, termposition in zip(termset['patterngroups'],
+                                      termset['patterngroupterms']):
+        firstpatterns.setdefault(termposition, patternlabel(patterns[0]))
+    name = termsetnames.get(termsetid, 'term set {0}'.format(termsetid))
+    return ["{0}: {1} -> {2}".format(name, firstpatterns.get(termposition, ''),
+                                     accept[0] or '(none)')
+            for termposition, accept in enumerate(termset['accepts'])]
+
+
+def instrumenttermset(termsetid, termset):
+    """Returns a copy of a term set whose regular expressions are timed.
+
+    :param int termsetid: ID of the term set in termsets
+    :param dict termset: term set, see loadtermdata()
+    :return: copy of the term set with an additional list 'terms' of the
+        names of its terms
+    """
+    instrumented = instrumentedtermsets.get(termsetid)
+    if instrumented is not None and instrumented[0] is termset:
+        return instrumented[1]
+
+    copy = dict(termset)
+    # Generated match functions cannot be timed.
+    copy.pop('matchers', None)
+    copy['terms'] = termlabels(termset, termsetid)
+    copy['patterngroups'] = tuple(
+        tuple(profiledpattern(pattern, copy['terms'][termposition],
+                              attempts=(patternposition == 0))
+              for patternposition, pattern in enumerate(patterns))
+        for patterns, termposition in zip(termset['patterngroups'],
+                                          termset['patterngroupterms']))
+    copy['contextpatterns'] = tuple(
+        tuple((profiledpattern(pattern, copy['terms'][termposition]),
+               locations, positive)
+              for pattern, locations, positive in contextpatterns)
+        for contextpatterns, termposition in zip(termset['contextpatterns'],
+                                                 termset['patterngroupterms']))
+    instrumentedtermsets[termsetid] = (termset, copy)
+    return copy
+
+
+def addmatches(termset, matches):
+    """Records the matches of an instrumented term set in a paragraph.
+
+    :param dict termset: term set from instrumenttermset()
+    :param list matches: matches, see matchtermset()
+    """
+    for match in matches:
+        addcounts(profile['terms'], termset['terms'][match[0]], attempts=0,
+                  matches=1, time=0.0)
+
+
+def slowest(counts, key='time'):
+    """Returns the names and counters of a dict of counters, slowest
+    first."""
+    return sorted(counts.items(), key=lambda item: (-item[1][key], item[0]))
+
+
+def formatprofile(measurements, total=None):
+    """Returns measurements as a text report.
+
+    :param dict measurements: see profile
+    :param float total: total time of the run in seconds or None
+    """
+
+    def table(title, columns, rows):
+        lines.append("")
+        lines.append("{0:42}".format(title) +
+                     "".join("{0:>11}".format(column) for column in columns))
+        for name, values in rows:
+            # Long names get a line of their own.
+            if len(name) > 40:
+                lines.append("  " + name)
+                name = ""
+            lines.append("  {0:40}".format(name) + "".join(
+                "{0:10.4f}s".format(value) if isinstance(value, float) else
+                "{0:11}".format(value) for value in values))
+
+    lines = []
+    if total is not None:
+        lines.append("Total: {0:.3f}s".format(total))
+
+    table("Check modules", ("wall", "CPU", "runs"),
+          [(name, (values['wall'], values['cpu'], values['runs']))
+           for name, values in slowest(measurements['modules'], 'wall')])
+    table("Python extension functions", ("time", "calls"),
+          [(name, (values['time'], values['calls']))
+           for name, values in slowest(measurements['functions'])])
+    table("Slowest terms", ("regex time", "attempts", "matches"),
+          [(name, (values['time'], values['attempts'], values['matches']))
+           for name, values in slowest(measurements['terms'])[:TOPN]])
+    table("Slowest patterns", ("time", "calls", "memo hits"),
+          [(name, (values['time'], values['calls'], values['memohits']))
+           for name, values in slowest(measurements['patterns'])[:TOPN]])
+    table("Slowest paragraphs", ("time", "words"),
+          [("{0} ({1})".format(location, check), (seconds, words))
+           for seconds, words, check, location in measurements['paragraphs']])
+    table("Caches", ("hits", "misses"),
+          [(name, (values['hits'], values['misses']))
+           for name, values in sorted(measurements['caches'].items())])
+
+    return "\n".join(lines) + "\n"
+
+
+def writeprofile(measurements, outputfile, reportformat='text', total=None):
+    """Writes a report of measurements.
+
+    :param dict measurements: see profile
+    :param outputfile: file object to write to
+    :param str reportformat: 'text' or 'json'
+    :param float total: total time of the run in seconds or None
+    """
+    if reportformat == 'json':
+        json.dump(dict(measurements, total=total), outputfile, indent=2,
+                  sort_keys=True)
+        outputfile.write("\n")
+    else:
+        outputfile.write(formatprofile(measurements, total))
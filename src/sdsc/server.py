@@ -0,0 +1,184 @@
+#
+# Copyright (c) 2017 SUSE Linux GmbH
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+
+"""SDSC Module that passes check requests between sdsc --client and a
+running sdsc --serve over a Unix domain socket.
+
+Each connection carries exactly one request and one response, both of them
+a JSON object. The client closes its side of the connection after sending
+the request, the server closes the connection after sending the response.
+"""
+
+import json
+import os
+import os.path
+import signal
+import socket
+import stat
+import tempfile
+
+
+def defaultsocketpath():
+    """Returns the socket to use if none was given on the command line:
+    $SDSC_SOCKET, or sdsc.sock within $XDG_RUNTIME_DIR or
+    defaultsocketdir()
+    """
+    if os.environ.get('SDSC_SOCKET'):
+        return os.environ['SDSC_SOCKET']
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return os.path.join(os.environ['XDG_RUNTIME_DIR'], 'sdsc.sock')
+    return os.path.join(defaultsocketdir(), 'sdsc.sock')
+
+
+def defaultsocketdir():
+    """Returns the directory for the socket if there is no $XDG_RUNTIME_DIR:
+    a directory of the user within the directory for temporary files. Names
+    there are easy to guess, so serve() makes sure that only the user can
+    access it.
+    """
+    return os.path.join(tempfile.gettempdir(), 'sdsc-%d' % os.getuid())
+
+
+def privatedir(directory):
+    """Creates a directory that only the current user can access, or checks
+    that an existing one is like that.
+
+    :param str directory: path to the directory
+    :raises OSError: if the directory exists, but belongs to someone else or
+        others can access it
+    """
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    status = os.lstat(directory)
+    if not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid() or \
+            stat.S_IMODE(status.st_mode) & 0o077:
+        raise OSError("{0} is not a directory that only you can access.".format(
+            directory))
+
+
+def receive(connection):
+    """Reads a JSON object from a connection until the other side stops
+    sending.
+
+    :param connection: connected socket
+    """
+    chunks = []
+    while True:
+        chunk = connection.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return json.loads(b''.join(chunks).decode('utf-8'))
+
+
+def sendrequest(socketpath, request):
+    """Sends a request to a running server and returns its response.
+
+    :param str socketpath: path to the socket of the server
+    :param dict request: request, see serve()
+    :return: response (dict)
+    :raises OSError: if there is no server listening on the socket
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socketpath)
+        connection.sendall(json.dumps(request).encode('utf-8'))
+        connection.shutdown(socket.SHUT_WR)
+        return receive(connection)
+
+
+# Set when the server was asked to stop while it was answering a request,
+# which may have caught the KeyboardInterrupt itself.
+stopping = False
+
+
+def stopserving(signum, frame):
+    """Signal handler that lets serve() clean up on SIGTERM."""
+    global stopping
+    stopping = True
+    raise KeyboardInterrupt()
+
+
+def serve(socketpath, handlerequest, ready=None):
+    """Answers requests on a Unix domain socket, one after the other, until
+    interrupted (Ctrl+C or SIGTERM).
+
+    :param str socketpath: path to the socket to create
+    :param handlerequest: function that takes a request (dict) and returns
+        the response (dict); if it fails, the response has status 1 and the
+        error, and the server goes on with the next request
+    :param ready: function to call once the socket accepts connections
+    """
+    if os.path.dirname(os.path.abspath(socketpath)) == defaultsocketdir():
+        privatedir(defaultsocketdir())
+
+    if os.path.exists(socketpath):
+        # Only replace the socket if no other server is using it.
+        try:
+            sendrequest(socketpath, {'ping': True})
+        except OSError:
+            os.unlink(socketpath)
+        else:
+            raise OSError("Another server is already listening on {0}.".format(socketpath))
+
+    global stopping
+    stopping = False
+    previoushandler = signal.signal(signal.SIGTERM, stopserving)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        # Only the user who runs the server may connect, also right after
+        # the socket is created.
+        previousumask = os.umask(0o077)
+        try:
+            server.bind(socketpath)
+        finally:
+            os.umask(previousumask)
+        server.listen()
+        if ready:
+            ready()
+
+        while True:
+            connection, _ = server.accept()
+            with connection:
+                try:
+                    request = receive(connection)
+                except ValueError:
+                    response = {'status': 1, 'stderr': "Invalid request.\n"}
+                else:
+                    try:
+                        response = handlerequest(request)
+                    except Exception as error:
+                        # One broken request must not stop the server for
+                        # everyone else.
+                        response = {'status': 1, 'stderr': "! {0}: {1}\n".format(
+                            type(error).__name__, error)}
+                try:
+                    connection.sendall(json.dumps(response).encode('utf-8'))
+                except OSError:
+                    # The client is gone, nobody is waiting for the answer.
+                    pass
+            if stopping:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        signal.signal(signal.SIGTERM, previoushandler)
+        if os.path.exists(socketpath):
+            os.unlink(socketpath)
@@ -0,0 +1,185 @@
+#
+# Copyright (c) 2017 SUSE Linux GmbH
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+
+"""SDSC Module that turns term sets into a generated Python module of match
+functions (sdsc --compile-terms).
+
+The generated module has one match function per patterngroup. It matches
+the patterns of the patterngroup one after the other without a loop and
+checks the contextpatterns with positions that were worked out when the
+module was generated. matchtermset() calls these functions instead of going
+through the patterns of the term set, but still uses the token index and
+the prefilter of the term set to find out which patterngroups to try.
+
+Match functions are looked up by the cache key of the term set (see
+buildtermdata()). That key changes with the term file, with the code of
+sdsc, and with the version of Python, so outdated match functions are never
+used.
+"""
+
+import importlib.util
+import os.path
+
+# Version of the generated code, increase whenever it changes
+COMPILEDFORMAT = 2
+
+# Where sdsc looks for the generated module by default
+COMPILEDTERMSFILE = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                 'compiledterms.py')
+
+
+def generatepatterngroup(lines, groupid, patterns, contextpatterns):
+    """Appends the code of the match function of a patterngroup.
+
+    The function gets the stripped current token, the tokens of the
+    sentence, the position of the current token, the number of tokens, and
+    the context of the sentence (see matchtermset()). It returns the
+    matched words or None. Like matchtermset(), it keeps the results of
+    patterns in the memo of the context.
+
+    :param list lines: lines of code to append to
+    :param int groupid: ID of the patterngroup in the term set
+    :param list patterns: patterns of the patterngroup, see preparetermdata()
+    :param list contextpatterns: contextpatterns of the patterngroup, see
+        preparetermdata()
+    """
+
+    indent = "    "
+    for position, (pattern, flags) in enumerate(patterns):
+        lines.append("{0}p{1}_{2} = re_compile({3!r}, {4!r})".format(
+            indent, groupid, position, pattern, int(flags)))
+        lines.append("{0}i{1}_{2} = internpattern(p{1}_{2})".format(
+            indent, groupid, position))
+        lines.append("{0}m{1}_{2} = p{1}_{2}.match".format(
+            indent, groupid, position))
+    contextpatterns = [contextpattern for contextpattern in contextpatterns
+                       if contextpattern[0] is not None]
+    for position, contextpattern in enumerate(contextpatterns):
+        lines.append("{0}c{1}_{2} = re_compile({3!r}, {4!r})".format(
+            indent, groupid, position, contextpattern[0],
+            int(contextpattern[1])))
+
+    lines.append("")
+    lines.append("{0}def group{1}(word, words, wordposition, totalwords, "
+                 "context):".format(indent, groupid))
+    body = indent * 2
+    lines.append("{0}memo = context[3]".format(body))
+    for position in range(len(patterns)):
+        token = "word" if position == 0 else \
+            "words[wordposition + {0}]".format(position)
+        lines.append("{0}key = (i{1}_{2}, {3})".format(
+            body, groupid, position, token))
+        lines.append("{0}match{1} = memo.get(key, False)".format(body, position))
+        lines.append("{0}if match{1} is False:".format(body, position))
+        lines.append("{0}    match{1} = memo[key] = m{2}_{1}(key[1])".format(
+            body, position, groupid))
+        lines.append("{0}else:".format(body))
+        lines.append("{0}    context[4][0] += 1".format(body))
+        lines.append("{0}if not match{1}:".format(body, position))
+        lines.append("{0}    return None".format(body))
+
+    for position, (_, _, locations, positive) in enumerate(contextpatterns):
+        # Positions after the match are relative to its last token.
+        offsets = [where if where <= 0 else where + len(patterns) - 1
+                   for where in locations]
+        candidates = ", ".join("wordposition {0} {1}".format(
+            '-' if offset < 0 else '+', abs(offset)) for offset in offsets)
+        lines.append("{0}if not searchcontext(context, c{1}_{2}, [".format(
+            body, groupid, position))
+        lines.append("{0}        position for position in ({1},)".format(
+            body, candidates))
+        lines.append("{0}        if 0 <= position < totalwords], {1!r}):".format(
+            body, bool(positive)))
+        lines.append("{0}    return None".format(body))
+
+    lines.append("{0}return {1}".format(body, ' + " " + '.join(
+        "match{0}.group(0)".format(position)
+        for position in range(len(patterns)))))
+    lines.append("")
+
+
+def generatetermset(lines, name, termdata):
+    """Appends the code of a function that returns the match functions of
+    all patterngroups of a term set.
+
+    :param list lines: lines of code to append to
+    :param str name: name of the function
+    :param dict termdata: data created by preparetermdata()
+    """
+
+    lines.append("def {0}():".format(name))
+    patterngroups = [patternsofpatterngroup
+                     for patternsofterm in termdata['patterns']
+                     for patternsofpatterngroup in patternsofterm]
+    for groupid, patterns in enumerate(patterngroups):
+        generatepatterngroup(lines, groupid, patterns,
+                             termdata['contextpatterns'][groupid])
+    lines.append("    return ({0})".format("".join(
+        "group{0}, ".format(groupid) for groupid in range(len(patterngroups)))))
+    lines.append("")
+    lines.append("")
+
+
+def generatemodule(termsets, version=''):
+    """Returns the code of a module with match functions for term sets.
+
+    :param list termsets: tuples of a description (like the name of the term
+        file), the cache key, and the data created by preparetermdata() of
+        each term set
+    :param str version: version of sdsc, for the header
+    :return: Python code
+    """
+
+    lines = ["# Match functions for the term sets of sdsc {0}, generated by".format(version),
+             "# sdsc --compile-terms. Do not edit, run sdsc --compile-terms again.",
+             "",
+             "from sdsc import internpattern, searchcontext",
+             "from sdsc.generic import re_compile",
+             "",
+             "FORMAT = {0}".format(COMPILEDFORMAT),
+             "",
+             ""]
+    for position, (_, _, termdata) in enumerate(termsets):
+        generatetermset(lines, "termset{0}".format(position), termdata)
+
+    lines.append("# Functions that return the match functions, by cache key of the term set")
+    lines.append("TERMSETS = {")
+    for position, (description, key, _) in enumerate(termsets):
+        lines.append("    # {0}".format(description))
+        lines.append("    {0!r}: termset{1},".format(key, position))
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def loadcompiledterms(path=COMPILEDTERMSFILE):
+    """Loads a module generated by generatemodule().
+
+    :param str path: path to the module
+    :return: dict of functions that return the match functions of a term
+        set, by cache key of the term set; empty if there is no module or
+        it was generated by another version of this module
+    """
+
+    if not os.path.exists(path):
+        return {}
+    spec = importlib.util.spec_from_file_location('sdsc.compiledterms', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if getattr(module, 'FORMAT', None) != COMPILEDFORMAT:
+        return {}
+    return module.TERMSETS
@@ -0,0 +1,203 @@
+#
+# Copyright (c) 2017 SUSE Linux GmbH
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+#
+
+"""SDSC Module that finds out which patterngroups can possibly match a token,
+so termcheck() does not have to try all of them.
+"""
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    # Python < 3.11
+    import sre_parse
+
+from .const import CASEFOLDEXTRA
+
+
+# Above this number of alternative prefixes per pattern, we stop making the
+# prefixes longer. Shorter prefixes are less selective but still correct.
+MAXPREFIXES = 64
+
+# Character class ranges such as [0-9] are expanded into single characters
+# as long as they are no longer than this.
+MAXRANGE = 16
+
+CASEFOLDTABLE = str.maketrans(CASEFOLDEXTRA)
+
+
+def foldcase(text):
+    """Lowercases a string such that every character the re module would
+    consider equal to an ASCII letter with re.IGNORECASE ends up as that
+    lowercase ASCII letter.
+
+    :param str text: text to fold
+    """
+    return text.translate(CASEFOLDTABLE).lower()
+
+
+def classliterals(items):
+    """Returns the set of (lowercased, ASCII) characters a character class
+    can match or None if that set is unknown or too large.
+
+    :param list items: contents of a parsed character class
+    """
+    chars = set()
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            chars.add(chr(av))
+        elif op is sre_parse.RANGE and av[1] - av[0] < MAXRANGE:
+            chars.update(chr(char) for char in range(av[0], av[1] + 1))
+        else:
+            return None
+
+    if any(ord(char) > 127 for char in chars):
+        return None
+    return {char.lower() for char in chars}
+
+
+def extendprefixes(items, openprefixes, closedprefixes):
+    """Extends prefixes by walking through a parsed regular expression.
+
+    Open prefixes still cover everything matched so far and can therefore be
+    extended further. Closed prefixes were cut off because we did not know
+    how to extend them. Every match of the expression starts with at least
+    one of the open or closed prefixes.
+
+    :param list items: parsed regular expression (sre_parse output)
+    :param set openprefixes: prefixes that can be extended
+    :param set closedprefixes: prefixes that can not be extended
+    :return: tuple of (open prefixes, closed prefixes)
+    """
+    for op, av in items:
+        if not openprefixes:
+            break
+
+        newopen = None
+        newclosed = closedprefixes
+
+        if op is sre_parse.LITERAL:
+            if av < 128:
+                newopen = {prefix + chr(av).lower() for prefix in openprefixes}
+        elif op is sre_parse.IN:
+            chars = classliterals(av)
+            if chars:
+                newopen = {prefix + char
+                           for prefix in openprefixes for char in chars}
+        elif op is sre_parse.SUBPATTERN:
+            newopen, newclosed = extendprefixes(av[-1], openprefixes,
+                                                closedprefixes)
+        elif op is sre_parse.BRANCH:
+            newopen = set()
+            newclosed = set(closedprefixes)
+            for branch in av[1]:
+                branchopen, branchclosed = extendprefixes(branch,
+                                                          openprefixes, set())
+                newopen |= branchopen
+                newclosed |= branchclosed
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] > 0:
+            newopen, newclosed = extendprefixes(av[2], openprefixes,
+                                                closedprefixes)
+            if av[0] != 1 or av[1] != 1:
+                # We only know what the first repetition looks like.
+                newclosed = newclosed | newopen
+                newopen = set()
+        elif op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            # Zero-width, these do not consume any characters.
+            continue
+
+        if newopen is None or len(newopen) + len(newclosed) > MAXPREFIXES:
+            return set(), closedprefixes | openprefixes
+
+        openprefixes, closedprefixes = newopen, newclosed
+
+    return openprefixes, closedprefixes
+
+
+def literalprefixes(pattern):
+    """Finds out with which literal strings a match of a compiled regular
+    expression must start, after applying foldcase() to the matched string.
+
+    :param pattern: compiled regular expression
+    :return: set of prefixes or None if a match could start with anything
+    """
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return None
+
+    openprefixes, closedprefixes = extendprefixes(parsed, {''}, set())
+    prefixes = openprefixes | closedprefixes
+    if not prefixes or '' in prefixes:
+        return None
+    return prefixes
+
+
+def buildtokenindex(prefixesofpatterngroups):
+    """Creates an index that finds patterngroups which can match a given
+    token, based on the literal prefixes of their first pattern.
+
+    The index is a tuple of a trie and a list of fallback patterngroups. Each
+    node of the trie is a dict mapping a character to the next node. The key
+    None holds the IDs of patterngroups whose prefix ends at that node.
+    Fallback patterngroups are those whose first pattern can start with
+    anything, they always need to be tried.
+
+    :param list prefixesofpatterngroups: result of literalprefixes() for the
+        first pattern of each patterngroup, the position in the list is the
+        ID of the patterngroup
+    """
+    trie = {}
+    fallback = []
+    for patterngroupid, prefixes in enumerate(prefixesofpatterngroups):
+        if prefixes is None:
+            fallback.append(patterngroupid)
+            continue
+        # Longer prefixes are redundant if a shorter one covers them
+        # already, leaving them out means we find every patterngroup only
+        # once per token.
+        prefixes = [prefix for prefix in prefixes
+                    if not any(prefix != other and prefix.startswith(other)
+                               for other in prefixes)]
+        for prefix in prefixes:
+            node = trie
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node.setdefault(None, []).append(patterngroupid)
+
+    return (trie, fallback)
+
+
+def indexcandidates(index, word, folded=False):
+    """Returns IDs of all patterngroups that could match a token, in
+    ascending order.
+
+    :param tuple index: index created with buildtokenindex()
+    :param str word: token to look up
+    :param bool folded: whether foldcase() was already applied to word
+    """
+    node, candidates = index
+    candidates = candidates[:]
+    for char in (word if folded else foldcase(word)):
+        node = node.get(char)
+        if node is None:
+            break
+        if None in node:
+            candidates.extend(node[None])
+
+    candidates.sort()
+    return candidates
@@ -16,9 +16,11 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
 #
 
+import bisect
 import re
 from .generic import re_compile
-from .const import STARTPUNCTUATION, ENDPUNCTUATION
+from .const import (STARTPUNCTUATION, ENDPUNCTUATION, SENTENCEENDS,
+                    LASTSENTENCEENDS)
 
 
 def removepunctuation(word, start=False, end=False):
@@ -78,6 +80,23 @@ def sanitizepunctuation(text, quotes=False, apostrophes=False):
     return text
 
 
+def sentencesegmenter(text):
+    """Splits a paragraph into a list of sentences. Removes
+    final punctuation from all sentences.
+
+    :param str text: text to split into sentences
+    """
+    sentences = SENTENCEENDS.split(text)
+    # The last sentence's final punctuation has not yet been cut off, do that
+    # now.
+    sentences[-1] = LASTSENTENCEENDS.sub('', sentences[-1])
+
+    # We also need to cut off parentheses etc. from the first word of the first
+    # sentence, as that has not been done so far either.
+    sentences[0] = removepunctuation(sentences[0], start=True)
+    return sentences
+
+
 def findtagreplacement(text):
     """Search through a token to see whether it contains a replaced tag.
     Allows finding a single tag replacement only.
@@ -100,6 +119,39 @@ def findtagreplacement(text):
     return (tagfound, tagtype, tokens)
 
 
+def findtagreplacements(tokens):
+    """Same as findtagreplacement() for each of a list of tokens, but with a
+    single search through all of them. Most paragraphs contain no tag
+    replacements at all, which takes only a substring search to find out.
+
+    :param list tokens: tokens of a paragraph (without whitespace)
+    :return: list of tuples, see findtagreplacement()
+    """
+
+    notfound = (False, None, 1)
+    replacements = [notfound] * len(tokens)
+    text = " ".join(tokens)
+    if "##@" not in text:
+        return replacements
+
+    starts = []
+    offset = 0
+    for token in tokens:
+        starts.append(offset)
+        offset += len(token) + 1
+
+    tagreplacement = re_compile(r'##@(\w+)-(\d+)##')
+    for match in tagreplacement.finditer(text):
+        # Tag replacements do not contain spaces, so each match lies within
+        # a single token. Like findtagreplacement(), only use the first one.
+        position = bisect.bisect_right(starts, match.start()) - 1
+        if replacements[position] is notfound:
+            replacements[position] = (True, str(match.group(1)),
+                                      int(match.group(2)))
+
+    return replacements
+
+
 def counttokens(context, text):
     """Counts the number of tokens in a given string. This
     is used to enable tag replacement for content that needs
@@ -0,0 +1,56 @@
+<?xml version="1.0" encoding="UTF-8"?>
+<!--
+  Creates the content of all paragraphs once per document, before the check
+  modules run. The text-level checks (terminology, duplicated words, sentence
+  length) then pick up the stored content instead of creating it again.
+-->
+<xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform"
+  xmlns:db5="http://docbook.org/ns/docbook"
+  xmlns:xlink="http://www.w3.org/1999/xlink"
+  xmlns:py="https://www.github.com/openSUSE/suse-doc-style-checker"
+  xmlns:exslt="http://exslt.org/common"
+  exclude-result-prefixes="db5 xlink py exslt">
+  <xsl:import href="library.xsl"/>
+
+  <xsl:output method="xml" indent="yes" omit-xml-declaration="yes"/>
+
+  <xsl:template match="/">
+    <extracted>
+      <xsl:apply-templates mode="extract"/>
+    </extracted>
+  </xsl:template>
+
+  <xsl:template match="para|simpara|title|entry|db5:para|db5:simpara|db5:title|db5:entry" mode="extract">
+    <xsl:variable name="node" select="."/>
+    <xsl:variable name="withinid">
+      <xsl:call-template name="withinid-nomarkup"/>
+    </xsl:variable>
+    <xsl:variable name="file">
+      <xsl:call-template name="file-nomarkup"/>
+    </xsl:variable>
+    <xsl:variable name="content-candidate">
+      <xsl:apply-templates mode="terminology-content"/>
+    </xsl:variable>
+    <xsl:variable name="content-pretty-candidate">
+      <xsl:apply-templates mode="content-pretty"/>
+    </xsl:variable>
+    <xsl:variable name="content"><xsl:value-of
+      select="normalize-space($content-candidate)"/></xsl:variable>
+    <xsl:variable name="content-pretty"><xsl:value-of
+      select="normalize-space($content-pretty-candidate)"/></xsl:variable>
+
+    <xsl:value-of
+      select="py:storeparagraph($content, $content-pretty, $withinid, $file)"/>
+    <!-- Tables can contain paragraphs within entries. -->
+    <xsl:apply-templates mode="extract"/>
+  </xsl:template>
+
+  <xsl:template match="*|db5:*" mode="extract">
+    <xsl:apply-templates mode="extract"/>
+  </xsl:template>
+
+  <xsl:template match="*[@role='legal']|legalnotice|db5:*[@role='legal']|db5:legalnotice" mode="extract"/>
+
+  <xsl:template match="text()" mode="extract"/>
+
+</xsl:stylesheet>
@@ -303,34 +303,51 @@
         <xsl:apply-templates mode="terminology"/>
       </xsl:when>
       <xsl:otherwise>
-        <xsl:variable name="node" select="."/>
         <xsl:variable name="messagetype">
           <xsl:call-template name="messagetype"/>
         </xsl:variable>
-        <xsl:variable name="withinid">
-          <xsl:call-template name="withinid-nomarkup"/>
-        </xsl:variable>
-        <xsl:variable name="file">
-          <xsl:call-template name="file-nomarkup"/>
-        </xsl:variable>
-        <xsl:variable name="content-candidate">
-          <xsl:apply-templates mode="terminology-content"/>
-        </xsl:variable>
-        <xsl:variable name="content-pretty-candidate">
-          <xsl:apply-templates mode="content-pretty"/>
-        </xsl:variable>
-        <xsl:variable name="content"><xsl:value-of
-          select="normalize-space($content-candidate)"/></xsl:variable>
-        <xsl:variable name="content-pretty"><xsl:value-of
-          select="normalize-space($content-pretty-candidate)"/></xsl:variable>
-
-        <xsl:copy-of
-          select="py:termcheck($termdataid, $content, $content-pretty, $withinid,
-                               $file, normalize-space($messagetype))"/>
+        <xsl:choose>
+          <xsl:when test="py:isextracted()">
+            <xsl:copy-of
+              select="py:extractedtermcheck($termdataid, normalize-space($messagetype))"/>
+          </xsl:when>
+          <xsl:otherwise>
+            <xsl:call-template name="terminology-check">
+              <xsl:with-param name="messagetype" select="$messagetype"/>
+            </xsl:call-template>
+          </xsl:otherwise>
+        </xsl:choose>
       </xsl:otherwise>
     </xsl:choose>
   </xsl:template>
 
+  <!-- Creates the content of a paragraph and starts the terminology check,
+       if the paragraph has not been extracted before. -->
+  <xsl:template name="terminology-check">
+    <xsl:param name="messagetype"/>
+    <xsl:variable name="node" select="."/>
+    <xsl:variable name="withinid">
+      <xsl:call-template name="withinid-nomarkup"/>
+    </xsl:variable>
+    <xsl:variable name="file">
+      <xsl:call-template name="file-nomarkup"/>
+    </xsl:variable>
+    <xsl:variable name="content-candidate">
+      <xsl:apply-templates mode="terminology-content"/>
+    </xsl:variable>
+    <xsl:variable name="content-pretty-candidate">
+      <xsl:apply-templates mode="content-pretty"/>
+    </xsl:variable>
+    <xsl:variable name="content"><xsl:value-of
+      select="normalize-space($content-candidate)"/></xsl:variable>
+    <xsl:variable name="content-pretty"><xsl:value-of
+      select="normalize-space($content-pretty-candidate)"/></xsl:variable>
+
+    <xsl:copy-of
+      select="py:termcheck($termdataid, $content, $content-pretty, $withinid,
+                           $file, normalize-space($messagetype))"/>
+  </xsl:template>
+
   <xsl:template match="*|db5:*" mode="terminology">
     <xsl:apply-templates mode="terminology"/>
   </xsl:template>
@@ -8,6 +8,13 @@ from lxml import etree
 def initialize_sdsc():
     sdsc.initialize()
 
+
+@pytest.fixture(autouse=True)
+def restore_cachedir(monkeypatch):
+    """Fixture: sets sdsc.cachedir back after each test, as sdsc.main() sets
+    it for the rest of the process"""
+    monkeypatch.setattr(sdsc, 'cachedir', sdsc.cachedir)
+
 def pytest_generate_tests(metafunc):
     """Replace the xmltestcases fixture by all files in tests/cases """
     if 'xmltestcase' in metafunc.fixturenames:
@@ -27,6 +34,13 @@ def terminologydtd():
     return dtd
 
 
+@pytest.fixture(scope="session")
+def resultsdtd():
+    dtdfile = os.path.join(os.path.dirname(__file__), '../validation/results.dtd')
+    dtd = etree.DTD(file=dtdfile)
+    return dtd
+
+
 @pytest.fixture
 def casesdir():
     """Fixture: Path to cases directory"""
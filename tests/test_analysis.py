@@ -0,0 +1,50 @@
+#
+
+import pytest
+from sdsc import analysis
+
+
+@pytest.mark.parametrize("content,tokens,tagtokens,sentences",
+ (
+   # 0
+   ("One sentence. And ##@key-2## more.",
+    ["One", "sentence.", "And", "##@key-2##", "more."], [1, 1, 1, 2, 1],
+    [(["One", "sentence"], [0, 1], ["One", "sentence"], ["one", "sentence"],
+      [1, 1]),
+     (["And", "##@key-2##", "more"], [2, 4, 5],
+      ["And", "##@key-2##", "more"], ["and", "##@key-2##", "more"],
+      [1, 2, 1])]),
+   # 1
+   ("(Leading punctuation", ["(Leading", "punctuation"], [1, 1],
+    [(["Leading", "punctuation"], [0, 1], ["Leading", "punctuation"],
+      ["leading", "punctuation"], [1, 1])]),
+ )
+)
+def test_analyzecontent(monkeypatch, content, tokens, tagtokens, sentences):
+    """checks the breakdown of a paragraph"""
+    monkeypatch.setattr(analysis, 'analysiscache', analysis.OrderedDict())
+    result = analysis.analyzecontent(content)
+    assert result['tokens'] == tokens
+    assert result['tagtokens'] == tagtokens
+    assert result['sentences'] == sentences
+
+
+def test_analysiscache(monkeypatch):
+    """checks that analyses are reused and only the most recently used ones
+    are kept"""
+    monkeypatch.setattr(analysis, 'analysiscache', analysis.OrderedDict())
+    monkeypatch.setattr(analysis, 'analysisstats', {'hits': 0, 'misses': 0})
+    monkeypatch.setattr(analysis, 'ANALYSISCACHESIZE', 2)
+
+    first = analysis.analyzecontent("a b")
+    analysis.analyzecontent("c d")
+    assert analysis.analyzecontent("a b") is first
+    # "c d" is the least recently used one now.
+    analysis.analyzecontent("e f")
+    assert list(analysis.analysiscache) == ["a b", "e f"]
+    assert analysis.analyzecontent("c d") is not first
+    assert analysis.analysiscacheinfo() == {'hits': 1, 'misses': 4,
+                                            'size': 2, 'maxsize': 2}
+
+    analysis.clearanalysiscache()
+    assert analysis.analysiscacheinfo()['size'] == 0
@@ -0,0 +1,82 @@
+#
+
+import os
+import sys
+import pytest
+import sdsc
+from lxml import etree
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                '..', 'benchmarks'))
+
+from bench import compareresults, runbenchmarks  # noqa: E402
+from corpus import DEFAULTS, generatedocument  # noqa: E402
+
+SMALL = dict(DEFAULTS, chapters=1, sections=2, paragraphs=3)
+
+
+@pytest.mark.parametrize("docbook,roottag,sectiontag",
+ (
+   # 0
+   (4, 'book', 'sect1'),
+   # 1
+   (5, '{http://docbook.org/ns/docbook}book',
+    '{http://docbook.org/ns/docbook}section'),
+ )
+)
+def test_generatedocument(docbook, roottag, sectiontag):
+    """checks the structure of generated books"""
+    parameters = dict(SMALL, docbook=docbook)
+    document = generatedocument(**parameters)
+    root = etree.fromstring(document)
+    assert root.tag == roottag
+    assert len(root.findall('.//' + sectiontag)) == 2
+    # Same parameters, same book
+    assert generatedocument(**parameters) == document
+    assert generatedocument(**dict(parameters, seed=2)) != document
+
+
+def test_generatedocument_unknownversion():
+    """checks that only DocBook 4 and 5 are supported"""
+    with pytest.raises(ValueError):
+        generatedocument(docbook=3)
+
+
+def test_generatedocument_hitrate(tmpdir, monkeypatch):
+    """checks that the hit rate changes how much the checks find"""
+    monkeypatch.setattr(sdsc, 'cachedir', None)
+    counts = []
+    for hitrate in (0, 1):
+        path = tmpdir.join("book{0}.xml".format(hitrate))
+        path.write_binary(generatedocument(**dict(SMALL, hitrate=hitrate)))
+        result = sdsc.checkOneFile(str(path))
+        counts.append(result.count("<result"))
+    assert counts[0] < counts[1]
+
+
+def test_runbenchmarks(monkeypatch):
+    """checks the results of a benchmark run"""
+    monkeypatch.setattr(sdsc, 'jobs', sdsc.jobs)
+    results = runbenchmarks(SMALL, repeat=2, patterns=['helper/*'])
+    assert results['corpus'] == SMALL
+    assert sorted(results['benchmarks']) == [
+        'helper/dupecheck', 'helper/highlight', 'helper/sentencesegmenter',
+        'helper/termcheck']
+    for timing in results['benchmarks'].values():
+        assert timing['runs'] == 2
+        assert 0 <= timing['min'] <= timing['median']
+
+
+def test_compareresults():
+    """checks which benchmarks count as regressions"""
+    baseline = {'benchmarks': {'same': {'min': 1.0}, 'slower': {'min': 1.0},
+                               'faster': {'min': 1.0}, 'gone': {'min': 1.0}}}
+    results = {'benchmarks': {'same': {'min': 1.05}, 'slower': {'min': 1.5},
+                              'faster': {'min': 0.5}, 'new': {'min': 1.0}}}
+    assert compareresults(results, baseline, 0.1) == [
+        ('faster', 1.0, 0.5, 0.5, False),
+        ('gone', 1.0, None, None, False),
+        ('new', None, 1.0, None, False),
+        ('same', 1.0, 1.05, 1.05, False),
+        ('slower', 1.0, 1.5, 1.5, True),
+    ]
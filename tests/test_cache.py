@@ -0,0 +1,117 @@
+#
+
+import os
+import pytest
+import sdsc
+from lxml import etree
+from sdsc import cache
+from sdsc.cache import cachekey, prunecache, readcache, writecache
+
+
+def test_cachekey():
+    """checks that cache keys depend on all parts"""
+    assert cachekey('a', 'b') == cachekey('a', 'b')
+    assert cachekey('a', 'b') != cachekey('a', 'c')
+    assert cachekey('ab', 'c') != cachekey('a', 'bc')
+
+
+def test_readwritecache(tmpdir):
+    """checks that cached data can be read back"""
+    cachedir = str(tmpdir)
+    key = cachekey('test')
+    assert readcache(cachedir, 'test', key) is None
+    assert writecache(cachedir, 'test', key, {'data': [1, None]})
+    assert readcache(cachedir, 'test', key) == {'data': [1, None]}
+
+
+def test_cachedtermdata(tmpdir, monkeypatch, casesdir):
+    """checks that results with cached terminology data are the same as
+    without"""
+    path = "{}terminology.xml".format(casesdir)
+    expected = sdsc.checkOneFile(path)
+
+    monkeypatch.setattr(sdsc, 'cachedir', str(tmpdir))
+    # First run fills the cache, second one uses it. Term sets that are
+    # already loaded in this process would be reused without the cache.
+    for _ in range(2):
+        monkeypatch.setattr(sdsc, 'termsets', {})
+        monkeypatch.setattr(sdsc, 'termsetids', {})
+        assert sdsc.checkOneFile(path) == expected
+        assert os.listdir(os.path.join(str(tmpdir), 'termdata'))
+
+
+def test_paragraphcache(tmpdir, monkeypatch):
+    """checks that findings of unchanged paragraphs are reused from the
+    paragraph cache, with locations of the changed document"""
+    path = str(tmpdir.join("book.xml"))
+    paras = ['<para id="one">An user clicks the the button.</para>',
+             '<para id="two">This is a a test with an 32bit system and '
+             'many many words in one single sentence that goes on and on '
+             'without any end in sight for quite a while.</para>']
+
+    def check(paras):
+        with open(path, "w") as bookfh:
+            bookfh.write("<chapter>\n<title>Book</title>\n{}\n</chapter>"
+                         .format("\n".join(paras)))
+        monkeypatch.setattr(sdsc, 'cachedir', None)
+        expected = sdsc.checkOneFile(path)
+        monkeypatch.setattr(sdsc, 'cachedir', str(tmpdir.join("cache")))
+        assert sdsc.checkOneFile(path) == expected
+
+    check(paras)
+    assert os.listdir(str(tmpdir.join("cache", "paragraphs")))
+    # Moving paragraphs changes line numbers and IDs around them.
+    check(['<para>A new the the paragraph.</para>'] + paras[::-1])
+    check([paras[0].replace('id="one"', 'id="renamed"')])
+
+
+def test_paragraphcachekey(monkeypatch):
+    """checks that paragraph cache files are not shared between documents,
+    kinds of checks, and different code of sdsc"""
+    monkeypatch.setattr(sdsc, 'currentdocument', '/book.xml')
+    key = sdsc.paragraphcachekey('dupes')
+    assert sdsc.paragraphcachekey('sentencelength') != key
+    monkeypatch.setattr(sdsc, 'currentdocument', '/other.xml')
+    assert sdsc.paragraphcachekey('dupes') != key
+    monkeypatch.setattr(sdsc, 'currentdocument', '/book.xml')
+    assert sdsc.paragraphcachekey('dupes') == key
+    monkeypatch.setattr(cache, 'sourcedigestvalue', 'changed')
+    assert sdsc.paragraphcachekey('dupes') != key
+
+
+def test_termdatakey(monkeypatch):
+    """checks that cached term data is not shared between different code of
+    sdsc"""
+    terms = etree.XML("<terminology><term><accept><proposal>a</proposal>"
+                      "</accept></term></terminology>").xpath('term')
+    key = sdsc.termdatakey(terms, [])
+    assert sdsc.termdatakey(terms, []) == key
+    assert sdsc.termdatakey(terms, ['b']) != key
+    monkeypatch.setattr(cache, 'sourcedigestvalue', 'changed')
+    assert sdsc.termdatakey(terms, []) != key
+
+
+def test_writecachefailure(tmpdir):
+    """checks that no temporary file is left behind if the data cannot be
+    written"""
+    cachedir = str(tmpdir)
+    key = cachekey('test')
+    with pytest.raises(TypeError):
+        writecache(cachedir, 'test', key, {'data': object()})
+    assert os.listdir(os.path.join(cachedir, 'test')) == []
+    assert readcache(cachedir, 'test', key) is None
+
+
+def test_prunecache(tmpdir):
+    """checks that only the most recently used cache files are kept"""
+    cachedir = str(tmpdir)
+    keys = [cachekey('test', str(position)) for position in range(5)]
+    for position, key in enumerate(keys):
+        writecache(cachedir, 'test', key, position)
+        os.utime(cache.cachefile(cachedir, 'test', key), (position, position))
+    cache.touchcache(cachedir, 'test', keys[0])
+
+    assert prunecache(cachedir, 'test', 3) == 2
+    assert [readcache(cachedir, 'test', key) for key in keys] == \
+        [0, None, None, 3, 4]
+    assert prunecache(cachedir, 'test', 3) == 0
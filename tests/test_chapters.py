@@ -0,0 +1,126 @@
+#
+
+import pytest
+import sdsc
+import sdsc.chapters
+from lxml import etree
+from sdsc.chapters import iterpieces
+
+DOCUMENT = """<set xml:id="set.test">
+<title>Set</title>
+<book xml:id="book.one" xml:base="one.xml">
+<title>One</title>
+<bookinfo><productname>Product</productname></bookinfo>
+<chapter xml:id="cha.one"><para>Text</para></chapter>
+<chapter xml:id="cha.two"><para>Text</para></chapter>
+</book>
+<book xml:id="book.two">
+<chapter xml:id="cha.three"><para>Text</para></chapter>
+<part xml:id="part.one">
+<chapter xml:id="cha.four"><para>Text</para></chapter>
+</part>
+</book>
+</set>"""
+
+
+def describe(element):
+    """Returns the tags and IDs of an element and its children."""
+    xmlid = element.get('{http://www.w3.org/XML/1998/namespace}id')
+    children = [describe(child) for child in element
+                if child.tag in ('book', 'part', 'chapter')]
+    return (element.tag, xmlid, children) if children else (element.tag, xmlid)
+
+
+@pytest.mark.parametrize("maxpiecesize,result",
+ (
+   # 0 - everything in one piece
+   (100, [(('set', 'set.test', [('book', 'book.one', [
+              ('chapter', 'cha.one'), ('chapter', 'cha.two')])]), set()),
+          (('set', 'set.test', [('book', 'book.two', [
+              ('chapter', 'cha.three'),
+              ('part', 'part.one', [('chapter', 'cha.four')])])]), {1}),
+          ]),
+   # 1 - each chapter on its own, titles and info stay with the next one
+   (1, [(('set', 'set.test', [('book', 'book.one', [
+             ('chapter', 'cha.one')])]), set()),
+        (('set', 'set.test', [('book', 'book.one', [
+             ('chapter', 'cha.two')])]), {1, 3}),
+        (('set', 'set.test', [('book', 'book.two', [
+             ('chapter', 'cha.three')])]), {1}),
+        (('set', 'set.test', [('book', 'book.two', [
+             ('part', 'part.one', [('chapter', 'cha.four')])])]), {1, 9}),
+        ]),
+ )
+)
+def test_iterpieces(tmpdir, maxpiecesize, result):
+    """checks how a document is split into pieces"""
+    tmpdir.join("set.xml").write(DOCUMENT)
+    pieces = [(describe(piece.getroot()),
+               {element.sourceline for element in repeated})
+              for piece, repeated in
+              iterpieces(str(tmpdir.join("set.xml")), maxpiecesize)]
+    assert pieces == result
+
+
+def test_iterpieces_content(tmpdir):
+    """checks that pieces contain the content and attributes around it"""
+    tmpdir.join("set.xml").write(DOCUMENT)
+    piece, _ = next(iterpieces(str(tmpdir.join("set.xml")), 1))
+    assert piece.xpath('/set/title/text()') == ['Set']
+    assert piece.xpath('/set/book/@xml:base') == ['one.xml']
+    assert piece.xpath('/set/book/bookinfo/productname/text()') == ['Product']
+    assert piece.xpath('/set/book/chapter/para/text()') == ['Text']
+    # Line numbers are kept for copies and moved elements.
+    assert [element.sourceline for element in piece.iter()] == \
+        [1, 2, 3, 4, 5, 5, 6, 6]
+
+
+def test_iterpieces_nocontainers(tmpdir, casesdir):
+    """checks that documents without sets, books, and parts are not split"""
+    pieces = list(iterpieces(casesdir + "a-an.xml", 1))
+    assert len(pieces) == 1
+    assert etree.QName(pieces[0][0].getroot()).localname == 'chapter'
+
+
+@pytest.mark.parametrize("case,oneline",
+ (
+   # 0
+   ("a-an.xml", False),
+   # 1
+   ("ids.xml", False),
+   # 2
+   ("terminology.xml", False),
+   # 3
+   ("products1.xml", False),
+   # 4
+   ("sentencelength.xml", False),
+   # 5 - everything on one line, like minified documents
+   ("ids.xml", True),
+   # 6
+   ("terminology.xml", True),
+ )
+)
+def test_chapters(tmpdir, monkeypatch, casesdir, case, oneline):
+    """checks that results piece by piece are the same as with the whole
+    document"""
+    chapter = open(casesdir + case).read()
+    chapter = chapter[chapter.index('<', chapter.index('?>')):]
+    namespace = ' xmlns="http://docbook.org/ns/docbook"' \
+        if 'docbook.org/ns' in chapter.split('>')[0] else ''
+    book = """<book{0} xml:id="book.test"><title>Book</title>
+        <preface xml:id="pre.test"><para>An user the the book.</para></preface>
+        {1}
+        <part xml:id="part.test"><title>An user part</title>
+        <chapter xml:id="cha.test.last"><para>Some last chapter.</para></chapter>
+        </part>
+        </book>""".format(namespace, chapter)
+    if oneline:
+        book = " ".join(book.split())
+    tmpdir.join("book.xml").write(book)
+    path = str(tmpdir.join("book.xml"))
+
+    expected = sdsc.checkOneFile(path)
+    monkeypatch.setattr(sdsc, 'flag_chapters', True)
+    monkeypatch.setattr(sdsc.chapters, 'MAXPIECESIZE', 1)
+    assert sdsc.checkOneFile(path) == expected
+    assert not sdsc.paragraphs
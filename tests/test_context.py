@@ -28,3 +28,30 @@ def test_contextpatternlocations(params, result):
     """checks the contextpatternlocations function"""
     assert sdsc.contextpatternlocations(*params) == result
 
+
+
+@pytest.mark.parametrize("wordposition,patterncount,locations,positive,result",
+ (
+   # 1 - the two words before
+   (2, 1, (-2, -1), True, True),
+   # 2 - the same window, negative
+   (2, 1, (-2, -1), False, False),
+   # 3 - after the last matched word
+   (1, 2, (1,), True, False),
+   # 4 - not contiguous
+   (2, 1, (-2, 2), True, True),
+   # 5 - outside of the sentence, negative matches
+   (0, 1, (-1,), False, True),
+ )
+)
+def test_matchcontextpattern(wordposition, patterncount, locations, positive,
+                             result):
+    """checks contextpatterns on context windows of a sentence"""
+    pattern = sdsc.re_compile(sdsc.manglepattern("the", 'context'), 0)
+    context = [["the", "big", "box", "is", "the", "end"], None, {}]
+    contextpattern = (pattern, locations, positive)
+    assert sdsc.matchcontextpattern(context, wordposition, 6, patterncount,
+                                    contextpattern) == result
+    # Same result from the memo
+    assert sdsc.matchcontextpattern(context, wordposition, 6, patterncount,
+                                    contextpattern) == result
@@ -1,7 +1,8 @@
 #
 
 import pytest
-from sdsc import highlight
+from sdsc import analyzepretty, highlight, highlightpretty, prettyslice
+from sdsc.textutil import xmlescape
 
 
 @pytest.mark.parametrize("tokens,start,end,expected",
@@ -34,3 +35,26 @@ from sdsc import highlight
 def test_highlighter(tokens, start, end, expected):
     """checks whether the highlight function works"""
     assert highlight(tokens, start, end) == expected
+
+
+@pytest.mark.parametrize("text",
+ (
+   # 0
+   "highlight the next few of these superbly chosen and well-intentioned words",
+   # 1 - gets escaped
+   "Use <tags> & \"quotes\" like   this.",
+   # 2
+   "",
+ )
+)
+def test_highlightpretty(text):
+    """checks that highlighting analyzed pretty content works like
+    highlight()"""
+    pretty = analyzepretty(text)
+    escaped = xmlescape(text)
+    for start in range(-2, 12):
+        for end in range(-2, 12):
+            assert highlightpretty(pretty, start, end) == \
+                highlight(escaped, start, end)
+            assert prettyslice(pretty, max(start, 0), end) == \
+                " ".join(escaped.split()[max(start, 0):max(end, 0)])
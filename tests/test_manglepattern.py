@@ -0,0 +1,70 @@
+#
+
+import glob
+import os
+import re
+import pytest
+from lxml import etree
+from sdsc import manglepattern, tokenizer
+
+
+# Things that can be before and after a token in a sentence
+PREFIXES = ('', '(', '"(', 'x ', 'x (', 'x "(', 'x\t-', '- ')
+SUFFIXES = ('', '.', ').', ' x', '.) x', '-x', '......x')
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    """Fixture: sentences of the test cases and tokens of the term files,
+    with different things around them"""
+    location = os.path.dirname(os.path.realpath(__file__))
+    texts = [" ".join(tokenizer(" ".join(etree.parse(path).getroot().itertext())))
+             for path in sorted(glob.glob(location + "/cases/*.xml"))]
+    location = os.path.join(location, '../src/sdsc/xsl-checks')
+    words = set()
+    for path in glob.glob(location + "/*.xml"):
+        for text in etree.parse(path).xpath(
+                '/terminology/term/accept//text()|'
+                '/terminology/term/patterngroup/*/text()'):
+            words.update(tokenizer(text))
+    texts += [PREFIXES[position % len(PREFIXES)] + word +
+              SUFFIXES[position % len(SUFFIXES)]
+              for position, word in enumerate(sorted(words))]
+    return "\n".join(texts)
+
+
+@pytest.mark.parametrize("pattern,once",
+ (
+   # 0
+   ("the", True),
+   # 1
+   ("(a|b)c", True),
+   # 2 - backreferences and conditionals need the pattern three times
+   (r"(a)\1", False),
+   # 3
+   ("(?P<x>a)(?P=x)", False),
+   # 4
+   ("(a)?(?(1)b|c)", False),
+ )
+)
+def test_manglepatternonce(pattern, once):
+    """checks when the context version of a pattern has it only once"""
+    assert (manglepattern(pattern, 'context').count(pattern) == 1) == once
+    assert manglepattern(pattern, 'context', optimize=False).count(pattern) == 3
+
+
+def test_manglepatternequivalence(terminologyxml, corpus):
+    """checks that the contextpatterns of a term file find the same matches
+    on the corpus, whether they are in the mangled pattern once or three
+    times"""
+    doc = etree.parse(terminologyxml)
+    for element in doc.xpath('/terminology/term/patterngroup/contextpattern'):
+        if not element.text:
+            continue
+        flags = 0 if element.get('case') == 'keep' else re.I
+        optimized = re.compile(manglepattern(element.text, 'context'), flags)
+        original = re.compile(manglepattern(element.text, 'context',
+                                            optimize=False), flags)
+        assert [match.span() for match in optimized.finditer(corpus)] == \
+            [match.span() for match in original.finditer(corpus)], \
+            element.text
@@ -0,0 +1,81 @@
+#
+
+import re
+import pytest
+import sdsc
+from sdsc import manglepattern
+from sdsc.patternlint import fuzzpattern, staticproblems
+
+TERMFILE = """<?xml version="1.0" encoding="UTF-8"?>
+<terminology>
+  <term>
+    <accept><proposal>adapt</proposal></accept>
+    <patterngroup>
+      <pattern>ad[eo]pt(ed|s|ing)?</pattern>
+      <contextpattern look="before">(always|(automatical|easi|usual|general)ly)</contextpattern>
+    </patterngroup>
+  </term>
+  <term>
+    <accept><proposal>repeat</proposal></accept>
+    <patterngroup>
+      <pattern>{0}</pattern>
+    </patterngroup>
+  </term>
+</terminology>
+"""
+
+
+@pytest.mark.parametrize("pattern,problems",
+ (
+   # 0
+   (r'ad[eo]pt(ed|s|ing)?', []),
+   # 1
+   (r'(a+)+b', ['nested quantifiers: a+ within (a+)+']),
+   # 2 - the inner repetition always ends before a hyphen
+   (r'([a-z]+-)+', []),
+   # 3
+   (r'(\d+|x)*', ['nested quantifiers: [...]+ within ([...]+|x)*']),
+   # 4
+   (r'(ab|a[bc]d)+',
+    ['overlapping alternatives within (ab|[...]d)+: b and [...]d']),
+   # 5 - bounded repetitions are not a problem
+   (r'(.*a){3}', []),
+ )
+)
+def test_staticproblems(pattern, problems):
+    """checks which constructs are found in patterns after manglepattern()"""
+    assert staticproblems(manglepattern(pattern, 'default'), re.I) == problems
+
+
+@pytest.mark.parametrize("pattern,slow",
+ (
+   # 0
+   (r'ad[eo]pt(ed|s|ing)?', False),
+   # 1
+   (r'(a+)+b', True),
+   # 2
+   (r'(\w+|\d+)+', True),
+ )
+)
+def test_fuzzpattern(pattern, slow):
+    """checks that patterns that blow up on hard tokens are found"""
+    compiled = re.compile(manglepattern(pattern, 'default'), re.I)
+    assert (fuzzpattern(compiled, [], budget=0.005) is not None) == slow
+
+
+@pytest.mark.parametrize("pattern,status",
+ (
+   # 0
+   (r'repeat(ed|s|ing)?', 0),
+   # 1
+   (r'((re)+|peat)+x', 1),
+ )
+)
+def test_lintpatterns(capsys, tmpdir, pattern, status):
+    """checks the exit code and messages of sdsc --lint-patterns"""
+    tmpdir.join("terms.xml").write(TERMFILE.format(pattern))
+    assert sdsc.main(["--lint-patterns", str(tmpdir.join("terms.xml"))]) == status
+    out, err = capsys.readouterr()
+    assert "Checked 3 patterns in 1 term files" in out + err
+    assert ("terms.xml: term 2 (repeat), patterngroup 1, pattern" in err) == \
+        bool(status)
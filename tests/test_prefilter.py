@@ -0,0 +1,60 @@
+#
+
+import re
+import pytest
+from sdsc.prefilter import (buildautomaton,
+                            patterngroupliterals,
+                            requiredliterals,
+                            scan,
+                            )
+
+
+@pytest.mark.parametrize("pattern,result",
+ (
+   # 0 - literal
+   ('32bit', {'32bit'}),
+   # 1 - optional parts are expanded
+   ('e-?mail', {'email', 'e-mail'}),
+   # 2 - alternation
+   ('(three|3)', {'three', '3'}),
+   # 3 - the longest literal part wins
+   ('three[-.]*d', {'three'}),
+   ('\\w+ing', {'ing'}),
+   # 5 - nothing literal at all
+   ('\\w+', None),
+   # 6 - mangled pattern
+   ('(?:sub-?menu)(?=\\W{0,5}(?:\\s|$))', {'submenu', 'sub-menu'}),
+ )
+)
+def test_requiredliterals(pattern, result):
+    """checks which literal strings are required for a pattern to match"""
+    assert requiredliterals(re.compile(pattern, re.I)) == result
+
+
+def test_patterngroupliterals():
+    """checks that the most selective pattern of a patterngroup is used"""
+    patterns = [re.compile(pattern, re.I) for pattern in ('\\w+', 'a', 'web')]
+    assert patterngroupliterals(patterns) == {'web'}
+
+
+@pytest.mark.parametrize("text,result",
+ (
+   # 0 - nothing found
+   ("Nothing to see here.", {3}),
+   # 1 - overlapping literals
+   ("An unfortunate e-mail", {0, 1, 3}),
+   # 2 - case is folded
+   ("Send an EMAIL", {1, 3}),
+   # 3 - literal found after a fallback
+   ("emaiemail", {1, 3}),
+   # 4 - non-ASCII character that matches an ASCII letter
+   ("ſuse", {2, 3}),
+ )
+)
+def test_scan(text, result):
+    """checks that the automaton finds all patterngroups"""
+    automaton = buildautomaton([['fortunate'], ['email', 'e-mail'],
+                                ['suse'], None])
+    assert scan(automaton, text) == result
+    # Transitions remembered from the first scan do not change anything.
+    assert scan(automaton, text) == result
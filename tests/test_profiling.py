@@ -0,0 +1,121 @@
+#
+
+import json
+import re
+import pytest
+import sdsc
+from lxml import etree
+from sdsc import profiling
+
+
+def test_performancereport(tmpdir, monkeypatch, casesdir):
+    """checks the report of --performance"""
+    monkeypatch.setattr(sdsc, 'flag_performance', sdsc.flag_performance)
+    path = casesdir + "terminology.xml"
+    expected = sdsc.checkOneFile(path)
+    resultpath = str(tmpdir.join("result.xml"))
+    reportpath = str(tmpdir.join("report.json"))
+
+    assert sdsc.main(["--performance", "--no-cache",
+                      "--performance-format", "json",
+                      "--performance-report", reportpath,
+                      path, resultpath]) == 0
+    assert tmpdir.join("result.xml").read() == expected
+
+    report = json.loads(tmpdir.join("report.json").read())
+    assert report['total'] > 0
+    assert report['modules']['terminology']['runs'] == 1
+    assert report['functions']['extractedtermcheck']['calls'] > 0
+    assert any(name.startswith('terminology: ') and values['matches'] > 0
+               for name, values in report['terms'].items())
+    assert report['patterns']
+    assert 0 < len(report['paragraphs']) <= profiling.TOPN
+
+    # Nothing is measured anymore.
+    assert profiling.profile is None
+    namespace = etree.FunctionNamespace(sdsc.FUNCTIONNAMESPACE)
+    assert not any(hasattr(function, 'profiled')
+                   for _, function in namespace.items())
+
+
+def test_formatprofile():
+    """checks the text report"""
+    measurements = profiling.emptyprofile()
+    measurements['modules']['terminology'] = {'wall': 2.0, 'cpu': 1.5,
+                                              'runs': 1}
+    measurements['terms']['terminology: foo -> bar'] = {
+        'attempts': 3, 'matches': 1, 'time': 0.25}
+    report = profiling.formatprofile(measurements, 3.0)
+    assert report.startswith("Total: 3.000s\n")
+    assert "  terminology                                 2.0000s    1.5000s" \
+        "          1\n" in report
+    assert "  terminology: foo -> bar                     0.2500s" \
+        "          3          1\n" in report
+
+
+def test_memohits(monkeypatch):
+    """checks that results of patterns taken from the memo of matchtermset()
+    are counted as attempts and memo hits, such that the attempts do not
+    depend on which term sets share the memo"""
+    sdsc.loadtermfiles()
+    termsetids = list(sdsc.termsets)
+    paragraph = ("An user can't login in to the system. An user can't login "
+                 "in to the system.", None, None, None, 1)
+
+    attempts = []
+    for termsetgroups in ([termsetids], [[termsetid] for termsetid in termsetids]):
+        monkeypatch.setattr(profiling, 'profile', profiling.emptyprofile())
+        hits = sdsc.patternmatchstats['hits']
+        for group in termsetgroups:
+            sdsc.fusedtermcheck(paragraph, group)
+        hits = sdsc.patternmatchstats['hits'] - hits
+        assert hits > 0
+        assert sum(values['memohits'] for values in
+                   profiling.profile['patterns'].values()) == hits
+        attempts.append({term: values['attempts'] for term, values in
+                         profiling.profile['terms'].items()})
+    assert attempts[0] == attempts[1]
+
+
+@pytest.mark.parametrize("paragraphs,slowest",
+ (
+   # 0
+   ([1.0, 3.0, 2.0], [3.0, 2.0, 1.0]),
+   # 1 - only the slowest ones are kept
+   (list(range(profiling.TOPN * 2)),
+    list(range(profiling.TOPN * 2 - 1, profiling.TOPN - 1, -1))),
+ )
+)
+def test_mergeprofile(monkeypatch, paragraphs, slowest):
+    """checks that measurements of worker processes are added up"""
+    monkeypatch.setattr(profiling, 'profile', profiling.emptyprofile())
+    profiling.addmodule('terminology', 1.0, 0.5)
+    worker = profiling.takeprofile()
+    profiling.addmodule('terminology', 1.0, 0.5)
+    for seconds in paragraphs:
+        worker['paragraphs'].append([seconds, 10, 'terms', 'line 1'])
+
+    profiling.mergeprofile(worker)
+    assert profiling.profile['modules'] == {
+        'terminology': {'wall': 2.0, 'cpu': 1.0, 'runs': 2}}
+    assert [paragraph[0] for paragraph in profiling.profile['paragraphs']] \
+        == slowest
+
+
+@pytest.mark.parametrize("pattern,mode,optimize",
+ (
+   # 0
+   ("(always|usual(ly)?)", 'default', True),
+   # 1
+   ("(always|usual(ly)?)", 'context', True),
+   # 2
+   ("(always|usual(ly)?)", 'context', False),
+   # 3 - kept three times, as it looks like it has a backreference
+   (r"C:\\1", 'context', True),
+ )
+)
+def test_patternlabel(pattern, mode, optimize):
+    """checks that reports show patterns as they are in the term file"""
+    mangled = sdsc.re_compile(sdsc.manglepattern(pattern, mode, optimize),
+                              re.I)
+    assert profiling.patternlabel(mangled) == pattern
@@ -3,6 +3,7 @@
 import pytest
 import os
 import sdsc
+from lxml import etree
 
 
 def test_check_performance(capsys, casesdir):
@@ -31,6 +32,193 @@ def test_sdsc_version(capsys):
 def test_sdsc_output(capsys, casesdir):
     """checks whether output to files works"""
     path = "{}a-an.xml".format(casesdir)
-    sdsc.main([path, "/dev/null"])
+    sdsc.main(["--no-cache", path, "/dev/null"])
     out, _ = capsys.readouterr()
     assert out == "/dev/null\n"
+
+
+@pytest.mark.parametrize("case", ("terminology.xml", "sentencelength.xml",
+                                  "duplicatewords.xml", "wordyphrases.xml",
+                                  "a-an.xml"))
+def test_extractparagraphs(monkeypatch, casesdir, case):
+    """checks that results with extracted paragraphs are the same as with
+    paragraph content created by each check module"""
+    path = "{}{}".format(casesdir, case)
+    expected = sdsc.checkOneFile(path)
+
+    monkeypatch.setattr(sdsc, 'extraction', None)
+    assert sdsc.checkOneFile(path) == expected
+    assert not sdsc.paragraphs
+    assert not sdsc.termmatches
+
+
+@pytest.mark.parametrize("modules,extracted",
+ (
+   # 0 - no module reads the paragraph records
+   (['ids', 'figures'], False),
+   # 1 - a terminology module
+   (['ids', 'a-an'], True),
+   # 2 - modules that ask py:isextracted() themselves
+   (['sentencelength'], True),
+   (['duplicatewords'], True),
+ )
+)
+def test_preparedocument(casesdir, modules, extracted):
+    """checks that paragraph records are only created when a selected check
+    module reads them"""
+    path = "{}terminology.xml".format(casesdir)
+    checks = sdsc.selectchecks(modules, [])
+    sdsc.preparedocument(path, checks)
+    try:
+        assert bool(sdsc.paragraphs) == extracted
+        assert [check['extracted'] for check in checks] == \
+            [check['name'] not in ('ids', 'figures') for check in checks]
+    finally:
+        sdsc.forgetdocument()
+
+
+def test_fusedtermcheck():
+    """checks that running several term sets at once gives the same matches
+    as running each of them on its own"""
+    sdsc.loadtermfiles()
+    paragraph = ("An user can't login in to the the system, e.g. to adopt "
+                 "settings.", None, None, None, 1)
+    termsetids = list(sdsc.termsets)
+    fused = sdsc.fusedtermcheck(paragraph, termsetids)
+    assert sorted(fused) == termsetids
+    assert any(fused.values())
+    for termsetid in termsetids:
+        assert fused[termsetid] == \
+            sdsc.fusedtermcheck(paragraph, [termsetid])[termsetid]
+
+
+def test_jobs(monkeypatch, casesdir):
+    """checks that running check modules in a process pool gives the same
+    results in the same order"""
+    path = "{}terminology.xml".format(casesdir)
+    expected = sdsc.checkOneFile(path)
+
+    monkeypatch.setattr(sdsc, 'jobs', 2)
+    try:
+        assert sdsc.checkOneFile(path) == expected
+        # Workers keep their prepared document for the next module only
+        # as long as the file is the same.
+        assert sdsc.checkOneFile("{}a-an.xml".format(casesdir)) != expected
+        assert sdsc.checkOneFile(path) == expected
+    finally:
+        sdsc.shutdownpool()
+
+
+@pytest.mark.parametrize("jobs", ("1", "2"))
+def test_sdsc_batch(capsys, tmpdir, casesdir, jobs):
+    """checks that batch mode writes one result file per input file"""
+    for case in ("a-an.xml", "typos.xml"):
+        tmpdir.join(case).write(open(casesdir + case).read())
+        expected = sdsc.checkOneFile(casesdir + case)
+    tmpdir.join("typos-stylecheck.xml").write("<results/>")
+    tmpdir.join("broken.xml").write("<para>")
+
+    assert sdsc.main(["--no-cache", "--jobs", jobs, "--batch",
+                      str(tmpdir.join("*.xml"))]) == 1
+    out, err = capsys.readouterr()
+    assert out.split() == [str(tmpdir.join("a-an-stylecheck.xml")),
+                           str(tmpdir.join("typos-stylecheck.xml"))]
+    assert "broken.xml" in err
+    assert "Checked 3 files (1 failed)" in err
+    assert tmpdir.join("typos-stylecheck.xml").read() == expected
+
+
+def test_sdsc_filesfrom(capsys, tmpdir, casesdir):
+    """checks that batch mode reads files to check from a list"""
+    tmpdir.join("a-an.xml").write(open(casesdir + "a-an.xml").read())
+    tmpdir.join("list").write("# files to check\n\n{}\n".format(
+        tmpdir.join("a-an.xml")))
+
+    assert sdsc.main(["--no-cache", "--files-from",
+                      str(tmpdir.join("list"))]) == 0
+    out, _ = capsys.readouterr()
+    assert out == str(tmpdir.join("a-an-stylecheck.xml")) + "\n"
+
+
+@pytest.mark.parametrize("modules,skipmodules,result",
+ (
+   # 0 - everything
+   (None, None, None),
+   # 1 - only some modules
+   (['typos', 'a-an'], None, ['a-an', 'typos']),
+   # 2 - modules left out
+   (None, ['typos'], None),
+   # 3 - both
+   (['typos', 'a-an'], ['typos'], ['a-an']),
+   # 4 - unknown module
+   (['typo'], None, ValueError),
+   (None, ['typo'], ValueError),
+ )
+)
+def test_selectchecks(modules, skipmodules, result):
+    """checks which check modules are selected"""
+    allnames = [check['name'] for check in sdsc.prepared_checks]
+    if result is ValueError:
+        with pytest.raises(ValueError):
+            sdsc.selectchecks(modules, skipmodules)
+        return
+    if result is None:
+        result = [name for name in allnames if name not in (skipmodules or [])]
+    names = [check['name'] for check in sdsc.selectchecks(modules, skipmodules)]
+    assert sorted(names) == sorted(result)
+    # The usual order is kept.
+    assert names == [name for name in allnames if name in names]
+
+
+def test_sdsc_checks(capsys, monkeypatch, tmpdir, casesdir):
+    """checks that --checks and --skip-checks only load and run the selected
+    check modules"""
+    monkeypatch.setattr(sdsc, 'sdsc_initialized', False)
+    monkeypatch.setattr(sdsc, 'prepared_checks', [])
+    monkeypatch.setattr(sdsc, 'selectedmodules', None)
+    monkeypatch.setattr(sdsc, 'skippedmodules', [])
+    path = "{}a-an.xml".format(casesdir)
+    resultpath = str(tmpdir.join("result.xml"))
+
+    assert sdsc.main(["--no-cache", "--checks", "a-an,typos",
+                      "--skip-checks", "typos", path, resultpath]) == 0
+    result = tmpdir.join("result.xml").read()
+    assert 'source="a-an"' in result
+    assert result.count("<part ") == 1
+    assert [check['name'] for check in sdsc.prepared_checks
+            if check['transform'] is not None] == ['a-an']
+
+    assert sdsc.main(["--no-cache", "--skip-checks", "nonexistent",
+                      path, resultpath]) == 1
+    _, err = capsys.readouterr()
+    assert "nonexistent" in err
+
+
+@pytest.mark.parametrize("case", ("a-an.xml", "terminology.xml",
+                                  "<para>Nothing to see here.</para>"))
+def test_writereport(tmpdir, casesdir, resultsdtd, case):
+    """checks that a report written part by part is the same as the result
+    of checkOneFile() and valid"""
+    if case.startswith("<"):
+        tmpdir.join("book.xml").write(case)
+        path = str(tmpdir.join("book.xml"))
+    else:
+        path = casesdir + case
+    resultpath = str(tmpdir.join("result.xml"))
+
+    sdsc.writereport(path, resultpath)
+    result = tmpdir.join("result.xml").read()
+    assert result == sdsc.checkOneFile(path)
+    doc = etree.fromstring(result.encode('utf-8'))
+    if not resultsdtd.validate(doc):
+        raise AssertionError(resultsdtd.error_log.filter_from_errors()[0])
+
+
+def test_writereport_syntaxerror(tmpdir):
+    """checks that nothing is written for a broken document"""
+    tmpdir.join("broken.xml").write("<para>")
+    resultpath = str(tmpdir.join("result.xml"))
+
+    with pytest.raises(etree.XMLSyntaxError):
+        sdsc.writereport(str(tmpdir.join("broken.xml")), resultpath)
+    assert not os.path.exists(resultpath)
@@ -0,0 +1,97 @@
+#
+
+import os
+import stat
+import subprocess
+import sys
+import time
+import pytest
+import sdsc
+from sdsc.server import privatedir, sendrequest
+
+
+@pytest.fixture
+def server(tmpdir):
+    """Fixture: socket of an sdsc --serve running in the background"""
+    socketpath = str(tmpdir.join("sdsc.sock"))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(sdsc.__file__))] +
+        [path for path in [env.get('PYTHONPATH')] if path])
+    process = subprocess.Popen(
+        [sys.executable, "-m", "sdsc", "--serve", "--socket", socketpath,
+         "--cache-dir", str(tmpdir.join("cache"))],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(600):
+        if os.path.exists(socketpath) or process.poll() is not None:
+            break
+        time.sleep(0.1)
+    assert os.path.exists(socketpath)
+    yield socketpath
+    process.terminate()
+    process.wait(timeout=30)
+    assert not os.path.exists(socketpath)
+
+
+def test_client(capsys, tmpdir, casesdir, server):
+    """checks that sdsc --client gets the same result as a local run"""
+    path = casesdir + "a-an.xml"
+    expected = sdsc.checkOneFile(path)
+    resultpath = str(tmpdir.join("result.xml"))
+
+    assert sdsc.main(["--client", "--socket", server, "--no-cache",
+                      path, resultpath]) == 0
+    out, _ = capsys.readouterr()
+    assert out == resultpath + "\n"
+    assert tmpdir.join("result.xml").read() == expected
+
+
+def test_socketpermissions(server):
+    """checks that only the user who runs the server can connect"""
+    assert stat.S_IMODE(os.stat(server).st_mode) & 0o077 == 0
+
+
+@pytest.mark.parametrize("request_,status",
+ (
+   # 0 - document sent along
+   ({'xml': "<para>An user clicks the the button.</para>",
+     'name': "book.xml"}, 0),
+   # 1 - only some check modules
+   ({'xml': "<para>An user clicks the the button.</para>",
+     'modules': ['duplicatewords']}, 0),
+   # 2 - broken document
+   ({'xml': "<para>"}, 1),
+   # 3 - unknown request
+   ({'nothing': True}, 1),
+   # 4 - requests of the wrong shape
+   (['path', 'book.xml'], 1),
+   ({'path': 1}, 1),
+   ({'xml': "<para/>", 'modules': 'duplicatewords'}, 1),
+ )
+)
+def test_requests(tmpdir, server, request_, status):
+    """checks that requests from other programs are answered"""
+    response = sendrequest(server, request_)
+    assert response['status'] == status
+    if status == 0:
+        assert 'source="duplicatewords"' in response['result']
+        assert ('source="a-an"' in response['result']) == \
+            ('modules' not in request_)
+    # Documents sent along are gone after the request, so there is no point
+    # in caching their findings.
+    assert not tmpdir.join("cache", "paragraphs").check()
+    # Nothing stops the server.
+    assert sendrequest(server, {'ping': True}) == {'status': 0}
+
+
+def test_privatedir(tmpdir):
+    """checks that the directory of the socket is only accessible to the
+    user"""
+    directory = str(tmpdir.join("private"))
+    privatedir(directory)
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+    privatedir(directory)
+
+    os.chmod(directory, 0o755)
+    with pytest.raises(OSError):
+        privatedir(directory)
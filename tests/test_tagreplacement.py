@@ -1,7 +1,7 @@
 #
 
 import pytest
-from sdsc.textutil import findtagreplacement
+from sdsc.textutil import findtagreplacement, findtagreplacements
 
 
 #True
@@ -31,3 +31,22 @@ from sdsc.textutil import findtagreplacement
 def test_findtagreplacement(text,result):
     """checks whether placeholders for special tags are found"""
     assert findtagreplacement(text) == result
+
+
+@pytest.mark.parametrize("tokens",
+  (
+    # 0 - no tag replacements at all
+    ['noop', 'noop'],
+    # 1
+    ['Run', '##@mono-2##', 'and', '(##@key-1##),', '##@cool-tag-1##', ''],
+    # 2 - only the first replacement of a token counts
+    ['##@ui-1####@ui-3##', 'x##@file-0##'],
+    # 3
+    [],
+  )
+)
+def test_findtagreplacements(tokens):
+    """checks that finding placeholders in all tokens at once gives the same
+    results as token by token"""
+    assert findtagreplacements(tokens) == \
+        [findtagreplacement(token) for token in tokens]
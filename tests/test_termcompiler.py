@@ -0,0 +1,72 @@
+#
+
+import os
+import sys
+import pytest
+import sdsc
+from sdsc.termcompiler import generatemodule, loadcompiledterms
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                '..', 'benchmarks'))
+
+from corpus import DEFAULTS, generatedocument  # noqa: E402
+
+
+def checkwith(monkeypatch, compiledterms, paths):
+    """checks files with a fresh registry of term sets"""
+    monkeypatch.setattr(sdsc, 'compiledterms', compiledterms)
+    monkeypatch.setattr(sdsc, 'termsets', {})
+    monkeypatch.setattr(sdsc, 'termsetids', {})
+    monkeypatch.setattr(sdsc, 'loadedtermfiles', {})
+    return [sdsc.checkOneFile(path) for path in paths]
+
+
+def test_compiledterms(tmpdir, monkeypatch, casesdir):
+    """checks that the generated match functions find the same problems as
+    the term sets themselves"""
+    modulepath = str(tmpdir.join("compiledterms.py"))
+    assert sdsc.main(["--no-cache", "--compile-terms", modulepath]) == 0
+    compiledterms = loadcompiledterms(modulepath)
+    assert len(compiledterms) == len(
+        [check for check in sdsc.selectchecks(None, []) if check['termfile']])
+
+    bookpath = tmpdir.join("book.xml")
+    bookpath.write_binary(generatedocument(
+        **dict(DEFAULTS, chapters=1, sections=4, hitrate=1)))
+    paths = [casesdir + name for name in (
+        "a-an.xml", "abbreviations.xml", "contractions.xml",
+        "invariantplurals.xml", "terminology.xml", "typos.xml",
+        "verbagreement.xml", "wordyphrases.xml")] + [str(bookpath)]
+
+    expected = checkwith(monkeypatch, {}, paths)
+    assert checkwith(monkeypatch, compiledterms, paths) == expected
+    assert all('matchers' in termset for termset in sdsc.termsets.values())
+
+
+@pytest.mark.parametrize("patterns,contextpatterns,tokens,expected",
+ (
+   # 0
+   ([[['(?:a)', 2]]], [[[None]]], ["A", "b"], "A"),
+   # 1 - all patterns have to match
+   ([[['(?:a)', 2], ['(?:c)', 2]]], [[[None]]], ["a", "b"], None),
+   # 2
+   ([[['(?:a)', 2], ['(?:b)', 2]]], [[[None]]], ["a", "b"], "a b"),
+   # 3 - contextpattern after the last matched token
+   ([[['(?:a)', 0]]], [[['c', 0, [1], True]]], ["a", "c"], "a"),
+   # 4 - negative contextpattern
+   ([[['(?:a)', 0]]], [[['c', 0, [1], False]]], ["a", "c"], None),
+ )
+)
+def test_generatemodule(tmpdir, patterns, contextpatterns, tokens, expected):
+    """checks generated match functions"""
+    termdata = {'patterns': [patterns], 'contextpatterns': contextpatterns}
+    modulepath = tmpdir.join("compiledterms.py")
+    modulepath.write(generatemodule([("test", "key", termdata)]))
+    group, = loadcompiledterms(str(modulepath))['key']()
+    assert group(tokens[0], tokens, 0, len(tokens),
+                 [tokens, None, {}, {}, [0]]) == expected
+
+
+def test_loadcompiledterms_missing(tmpdir):
+    """checks that there are no match functions without a module"""
+    assert loadcompiledterms(str(tmpdir.join("missing.py"))) == {}
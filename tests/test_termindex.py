@@ -0,0 +1,57 @@
+#
+
+import re
+import pytest
+from sdsc.const import CASEFOLDEXTRA
+from sdsc.termindex import (buildtokenindex,
+                            foldcase,
+                            indexcandidates,
+                            literalprefixes,
+                            )
+
+
+@pytest.mark.parametrize("pattern,result",
+ (
+   # 0 - literal
+   ('32bit', {'32bit'}),
+   # 1 - case is folded
+   ('OpenSUSE', {'opensuse'}),
+   # 2 - character class
+   ('3[-.]d', {'3-d', '3.d'}),
+   # 3 - alternation
+   ('(three|3)', {'three', '3'}),
+   # 4 - repetition: only the first instance is certain
+   ('three[-.]*d', {'three'}),
+   ('a+b', {'a'}),
+   # 6 - optional start: anything goes
+   ('z?omg', None),
+   # 7 - character category at the start
+   ('\\w+ing', None),
+   # 8 - mangled pattern
+   ('(?:e-?mail)(?=\\W{0,5}(?:\\s|$))', {'e'}),
+ )
+)
+def test_literalprefixes(pattern, result):
+    """checks which literal prefixes are found for a pattern"""
+    assert literalprefixes(re.compile(pattern, re.I)) == result
+
+
+def test_casefoldextra():
+    """checks that CASEFOLDEXTRA contains all non-ASCII characters that
+    re.IGNORECASE lets match ASCII letters"""
+    nonascii = ''.join(map(chr, range(128, 0x110000)))
+    found = set(re.findall('[a-z]', nonascii, re.I))
+    assert found == set(CASEFOLDEXTRA)
+    for char, letter in CASEFOLDEXTRA.items():
+        assert re.match(letter, char, re.I)
+        assert foldcase(char) == letter
+
+
+def test_indexcandidates():
+    """checks that candidates are complete and in order"""
+    patterns = [re.compile(pattern, re.I)
+                for pattern in ('ab', 'a', '\\w+', 'b', 'abc')]
+    index = buildtokenindex([literalprefixes(pattern) for pattern in patterns])
+    assert indexcandidates(index, 'ABCD') == [0, 1, 2, 4]
+    assert indexcandidates(index, 'bob') == [2, 3]
+    assert indexcandidates(index, 'xyz') == [2]
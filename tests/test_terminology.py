@@ -17,3 +17,22 @@ def test_terminologydtd(terminologyxml, terminologydtd):
     doc = etree.parse(terminologyxml)
     if not terminologydtd.validate(doc):
         raise AssertionError(terminologydtd.error_log.filter_from_errors()[0])
+
+
+def test_termsets(terminologyxml):
+    """checks that each term file is registered as its own term set and
+    reused when it is built again"""
+    doc = etree.parse(terminologyxml)
+    terms = doc.xpath('/terminology/term')
+    ignoredwords = doc.xpath('/terminology/@ignoredwords')
+    termdataid = sdsc.buildtermdata(None, terms, ignoredwords, [])
+    assert sdsc.termsets[termdataid]
+    assert sdsc.buildtermdata(None, terms, ignoredwords, []) == termdataid
+    assert list(sdsc.termsetids.values()).count(termdataid) == 1
+
+
+def test_internpattern():
+    """checks that identical patterns share their ID across term sets"""
+    first = sdsc.internpattern(re.compile('foo', re.I))
+    assert sdsc.internpattern(re.compile('foo', re.I)) == first
+    assert sdsc.internpattern(re.compile('foo')) != first
@@ -1,7 +1,7 @@
 #
 
 import pytest
-from sdsc import isDupe
+from sdsc import dupefindings, isDupe
 from sdsc.textutil import tokenizer
 
 
@@ -30,8 +30,30 @@ def test_tokenizer(tokens, expected):
      (["this", "is", "this", "is", "a", "test"], 2),
      # 4
      (["this", "is", "(this", "is)", "a", "test"], 0),
+     # 5
+     (["(is", "a", "test", "is", "a", "test.)"], 0),
+     # 6
+     (["(is", "a", "is", "a.)", "test"], 2),
+     # 7 - numbers are no duplicates
+     (["this", "1", "1", "test"], 0),
  ],
 )
 def test_isDupe(tokens, result):
     """checks whether isDupe is correct"""
     assert isDupe(tokens, 2) == result
+
+
+@pytest.mark.parametrize("content,duplicates",
+ (
+   # 0
+   ("This is is a test.", ["is"]),
+   # 1
+   ("A test a test and and ##@key-2## ##@key-2## 3 3.", ["A test", "and"]),
+   # 2 - long paragraphs
+   ("the " + "word " * 500, ["word"] * 499),
+ )
+)
+def test_dupefindings(content, duplicates):
+    """checks which duplicates are found in a paragraph"""
+    assert [duplicate for _, duplicate in dupefindings(content, content)] \
+        == duplicates